@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#           http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+'''
+Check that analyses run at the same time in several threads of one
+process each get their own results.  Logs with different numbers of Java
+stack traces are analyzed serially, then by many threads at once, each
+going through the logs in its own order, and every threaded result is
+compared with the serial one for the same log.  The analyzer's result
+cache is disabled so that every analysis parses its log.
+
+Exits with status 1 if any result differs.
+
+Usage: python benchmarks/analyze_threads_check.py [-t THREADS] [-l LOGS]
+           [-r ROUNDS]
+'''
+
+from optparse import OptionParser
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src'))
+
+from redhat_support_tool.helpers.analyzer import Analyzer
+from token_benchmark import make_log
+import redhat_support_tool.helpers.confighelper as confighelper
+
+__author__ = 'Keith Robertson <kroberts@redhat.com>'
+
+
+def get_result(path):
+    '''
+    Returns what the analysis of path found, in a comparable form.
+    '''
+    return [(token.source, token.line_num, token.token_string)
+            for token in Analyzer.analyze(path)]
+
+
+class AnalysisThread(threading.Thread):
+    '''
+    Analyzes the logs, in its own order, once the start event is set.
+    '''
+
+    def __init__(self, index, paths, rounds, start):
+        threading.Thread.__init__(self, name='analysis-%d' % index)
+        self.setDaemon(True)
+        self.paths = list(paths) * rounds
+        random.Random(index).shuffle(self.paths)
+        self.start_event = start
+        self.results = []
+        self.exc_info = None
+
+    def run(self):
+        self.start_event.wait()
+        try:
+            for path in self.paths:
+                self.results.append((path, get_result(path)))
+        # pylint: disable=W0702
+        except:
+            self.exc_info = sys.exc_info()
+
+
+def main():
+    parser = OptionParser(usage='%prog [-t THREADS] [-l LOGS] [-r ROUNDS]')
+    parser.add_option('-t', '--threads', dest='threads', type='int',
+                      default=16,
+                      help='The number of analyses run at once.')
+    parser.add_option('-l', '--logs', dest='logs', type='int', default=8,
+                      help='The number of different logs analyzed.')
+    parser.add_option('-r', '--rounds', dest='rounds', type='int',
+                      default=1,
+                      help='The number of times each thread analyzes '
+                           'every log.')
+    options = parser.parse_args()[0]
+
+    # Only for this process, the config file isn't changed.
+    confighelper.get_config_helper().set(option='analyzer_cache_size',
+                                         value='0')
+    tmpdir = tempfile.mkdtemp(prefix='rhst-threads-')
+    try:
+        paths = []
+        for i in xrange(options.logs):
+            path = os.path.join(tmpdir, 'server-%d.log' % i)
+            logfile = open(path, 'w')
+            try:
+                logfile.write(make_log(20 + i * 7, seed=i))
+            finally:
+                logfile.close()
+            paths.append(path)
+
+        start = time.time()
+        expected = dict([(path, get_result(path)) for path in paths])
+        print 'Serial:   %d logs, %d symptoms in %.2fs' % \
+            (len(paths), sum([len(r) for r in expected.values()]),
+             time.time() - start)
+
+        start_event = threading.Event()
+        threads = [AnalysisThread(i, paths, options.rounds, start_event)
+                   for i in xrange(options.threads)]
+        for thread in threads:
+            thread.start()
+        start = time.time()
+        start_event.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+
+        analyses = 0
+        mismatches = 0
+        for thread in threads:
+            if thread.exc_info:
+                print '%s failed: %s' % (thread.getName(),
+                                         thread.exc_info[1])
+                mismatches += 1
+            for path, result in thread.results:
+                analyses += 1
+                if result != expected[path]:
+                    mismatches += 1
+                    print '%s: %s found %d symptoms, expected %d' % \
+                        (thread.getName(), os.path.basename(path),
+                         len(result), len(expected[path]))
+        print 'Threaded: %d threads, %d analyses in %.2fs, %d mismatches' % \
+            (options.threads, analyses, elapsed, mismatches)
+    finally:
+        shutil.rmtree(tmpdir)
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
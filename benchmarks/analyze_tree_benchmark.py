@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#           http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+'''
+Benchmark Analyzer.analyze on a directory of synthetic logs with an
+increasing number of worker processes, to show how it scales with CPUs.
+
+Usage: python benchmarks/analyze_tree_benchmark.py [-f FILES] [-n TRACES]
+'''
+
+from optparse import OptionParser
+from token_benchmark import make_log
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src'))
+
+from redhat_support_tool.helpers.analyzer import Analyzer
+
+__author__ = 'Keith Robertson <kroberts@redhat.com>'
+
+
+def main():
+    parser = OptionParser(usage='%prog [-f FILES] [-n TRACES]')
+    parser.add_option('-f', '--files', dest='files', type='int', default=32,
+                      help='The number of log files in the directory.')
+    parser.add_option('-n', '--traces', dest='traces', type='int',
+                      default=100,
+                      help='The number of stack traces in each log file.')
+    options = parser.parse_args()[0]
+
+    tmpdir = tempfile.mkdtemp(prefix='rhst-bench-')
+    try:
+        for i in xrange(options.files):
+            logdir = os.path.join(tmpdir, 'var', 'log', 'app%d' % (i % 4))
+            if not os.path.isdir(logdir):
+                os.makedirs(logdir)
+            logfile = open(os.path.join(logdir, 'server-%d.log' % i), 'w')
+            try:
+                logfile.write(make_log(options.traces, seed=i))
+            finally:
+                logfile.close()
+        print 'Directory of %d files with %d stack traces each' % \
+            (options.files, options.traces)
+
+        cpus = multiprocessing.cpu_count()
+        jobs = 1
+        baseline = None
+        while True:
+            start = time.time()
+            found = Analyzer.analyze(tmpdir, jobs=jobs,
+                                     window_size=16 * 1024 * 1024)
+            elapsed = time.time() - start
+            if baseline is None:
+                baseline = elapsed
+            print '%2d jobs: %d symptoms in %.2fs (%.1fx)' % \
+                (jobs, len(found), elapsed, baseline / elapsed)
+            if jobs >= cpus:
+                break
+            jobs = min(jobs * 2, cpus)
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#           http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+'''
+Benchmark the latency of non-interactive redhat-support-tool commands
+against a local stub API server, each starting up from scratch and
+forwarded to a session daemon.  The commands use a temporary config file,
+through RHST_CONFIG, whose url is the stub server's.
+
+The daemon's socket is in ~/.redhat-support-tool, so the benchmark won't
+run while a session daemon is already running, nor if the config file in
+~/.redhat-support-tool sets a url.
+
+Usage: python benchmarks/daemon_benchmark.py [-n COMMANDS] [-r RESPONSE]
+           [COMMAND ARGS...]
+'''
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from optparse import OptionParser
+from SocketServer import ThreadingMixIn
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                       'src')
+sys.path.insert(0, SRC_DIR)
+
+import redhat_support_tool.helpers.confighelper as confighelper
+import redhat_support_tool.helpers.daemonhelper as daemonhelper
+
+__author__ = 'Keith Robertson <kroberts@redhat.com>'
+
+MAIN = os.path.join(SRC_DIR, '__main__.py')
+USER = 'benchmark'
+PASSWORD = 'benchmark'
+
+# The response to every request, unless -r gives one.
+RESPONSE = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>' \
+    '<products xmlns="http://www.redhat.com/gss/strata">' \
+    '<product><code>Red Hat Enterprise Linux</code>' \
+    '<name>Red Hat Enterprise Linux</name></product></products>'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.server.count_request()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(self.server.response)))
+        self.end_headers()
+        self.wfile.write(self.server.response)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, response):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StubHandler)
+        self.response = response
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        self._lock.acquire()
+        try:
+            self.requests += 1
+        finally:
+            self._lock.release()
+
+
+def write_config(url, tmpdir):
+    '''
+    Writes a config file using the stub server to tmpdir and returns its
+    path.
+    '''
+    path = os.path.join(tmpdir, 'rhst.conf')
+    config = open(path, 'w')
+    try:
+        config.write('[RHHelp]\nuser = %s\nurl = %s\nkern_debug_dir = %s\n'
+                     % (USER, url, os.path.join(tmpdir, 'debugkernels')))
+    finally:
+        config.close()
+    os.environ['RHST_CONFIG'] = path
+
+    # ConfigHelper obfuscates the password, and adds its defaults.
+    cfg = confighelper.ConfigHelper()
+    if cfg.local_config.has_option('RHHelp', 'url'):
+        raise Exception('The url in %s would be used instead of the stub '
+                        'server\'s.' % cfg.dotfile)
+    cfg.set(option='password', value=cfg.pw_encode(PASSWORD, USER),
+            global_config=True, persist=True)
+    return path
+
+
+def time_commands(command, count):
+    '''
+    Runs the command count times, returning the seconds they took and the
+    number which failed.
+    '''
+    devnull = open(os.devnull, 'r+')
+    try:
+        failed = 0
+        start = time.time()
+        for i in xrange(count):
+            if subprocess.call([sys.executable, MAIN] + command,
+                               stdin=devnull, stdout=devnull,
+                               stderr=devnull):
+                failed += 1
+        return time.time() - start, failed
+    finally:
+        devnull.close()
+
+
+def start_daemon():
+    '''
+    Starts a session daemon and waits for it to listen.
+    '''
+    devnull = open(os.devnull, 'r+')
+    try:
+        daemon = subprocess.Popen([sys.executable, MAIN, '--daemon'],
+                                  stdin=devnull, stdout=devnull,
+                                  stderr=devnull)
+    finally:
+        devnull.close()
+    for i in xrange(300):
+        sock = daemonhelper._connect()
+        if sock:
+            sock.close()
+            return daemon
+        if daemon.poll() is not None:
+            break
+        time.sleep(0.1)
+    if daemon.poll() is None:
+        daemon.terminate()
+    raise Exception('The session daemon did not start.')
+
+
+def main():
+    parser = OptionParser(usage='%prog [-n COMMANDS] [-r RESPONSE] '
+                                '[COMMAND ARGS...]')
+    parser.add_option('-n', '--commands', dest='commands', type='int',
+                      default=20,
+                      help='The number of times the command is run.')
+    parser.add_option('-r', '--response', dest='response', default=None,
+                      help='A file holding the stub server\'s response.')
+    options, command = parser.parse_args()
+    if not command:
+        command = ['listproducts']
+
+    sock = daemonhelper._connect()
+    if sock:
+        sock.close()
+        print 'A session daemon is already running, stop it first.'
+        sys.exit(1)
+
+    response = RESPONSE
+    if options.response:
+        response = open(options.response).read()
+    server = StubServer(response)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.setDaemon(True)
+    thread.start()
+    tmpdir = tempfile.mkdtemp(prefix='rhst-benchmark-')
+    try:
+        write_config('http://127.0.0.1:%d' % server.server_address[1],
+                     tmpdir)
+        print '%d x %s against 127.0.0.1:%d' % \
+            (options.commands, ' '.join(command), server.server_address[1])
+        elapsed, failed = time_commands(command, options.commands)
+        print 'Started from scratch: %.1fms per command, %d requests, ' \
+            '%d failed' % (elapsed * 1000 / options.commands,
+                           server.requests, failed)
+
+        server.requests = 0
+        daemon = start_daemon()
+        try:
+            daemon_elapsed, failed = time_commands(command, options.commands)
+        finally:
+            # The daemon removes its socket when it's interrupted.
+            daemon.send_signal(signal.SIGINT)
+            daemon.wait()
+        print 'Session daemon:       %.1fms per command, %d requests, ' \
+            '%d failed (%.1fx)' % (daemon_elapsed * 1000 / options.commands,
+                                   server.requests, failed,
+                                   elapsed / daemon_elapsed)
+    finally:
+        server.shutdown()
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
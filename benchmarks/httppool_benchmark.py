@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#           http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+'''
+Benchmark the requests of a multi-request command against a local stub
+API server, with each request opening its own connection as
+redhat_support_lib does, and with its connections pooled by httppool.
+The server counts the connections, and so the handshakes, it accepts.
+With -c and -k the server speaks HTTPS with the given certificate.
+
+Usage: python benchmarks/httppool_benchmark.py [-n REQUESTS]
+           [-c CERT -k KEY]
+'''
+
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from optparse import OptionParser
+from SocketServer import ThreadingMixIn
+import httplib
+import os
+import ssl
+import sys
+import threading
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src'))
+
+import redhat_support_tool.helpers.httppool as httppool
+
+__author__ = 'Keith Robertson <kroberts@redhat.com>'
+
+# A case, about the size of the API's.
+BODY = '<case>%s</case>' % ('x' * 4096)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # The response is written a header at a time, delayed ACKs of a kept
+    # alive connection would stall it.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.count_connection()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, cert=None, key=None):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), StubHandler)
+        if cert:
+            self.socket = ssl.wrap_socket(self.socket, certfile=cert,
+                                          keyfile=key, server_side=True)
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # Clients closing their connections without a TLS shutdown.
+        pass
+
+    def count_connection(self):
+        self._lock.acquire()
+        try:
+            self.connections += 1
+        finally:
+            self._lock.release()
+
+
+def make_library(https):
+    '''
+    Returns a module standing in for redhat_support_lib's connection
+    module, which binds the httplib connection class it uses.
+    '''
+    library = types.ModuleType('stub_support_lib')
+    if https:
+        library.Connection = httplib.HTTPSConnection
+    else:
+        library.Connection = httplib.HTTPConnection
+    sys.modules[library.__name__] = library
+    return library
+
+
+def run_requests(library, port, https, requests):
+    '''
+    Makes the requests the way redhat_support_lib does, each with its own
+    connection object which is closed once the response is read.
+    '''
+    start = time.time()
+    for i in xrange(requests):
+        if https:
+            # The stub server's certificate is self signed.
+            conn = library.Connection(
+                        '127.0.0.1', port,
+                        context=ssl._create_unverified_context())
+        else:
+            conn = library.Connection('127.0.0.1', port)
+        try:
+            conn.request('GET', '/rs/cases/%08d' % i)
+            response = conn.getresponse()
+            if len(response.read()) != len(BODY):
+                raise Exception('Short response to request %d' % i)
+        finally:
+            conn.close()
+    return time.time() - start
+
+
+def main():
+    parser = OptionParser(usage='%prog [-n REQUESTS] [-c CERT -k KEY]')
+    parser.add_option('-n', '--requests', dest='requests', type='int',
+                      default=500,
+                      help='The number of requests the command makes.')
+    parser.add_option('-c', '--cert', dest='cert', default=None,
+                      help='A PEM certificate for the server to use HTTPS.')
+    parser.add_option('-k', '--key', dest='key', default=None,
+                      help='The PEM private key of the certificate.')
+    parser.add_option('-p', '--pool-size', dest='pool_size', type='int',
+                      default=4,
+                      help='The number of idle connections pooled.')
+    options = parser.parse_args()[0]
+
+    https = bool(options.cert)
+    server = StubServer(options.cert, options.key)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.setDaemon(True)
+    thread.start()
+    port = server.server_address[1]
+    try:
+        print '%d %s requests to 127.0.0.1:%d' % \
+            (options.requests, https and 'HTTPS' or 'HTTP', port)
+        library = make_library(https)
+        elapsed = run_requests(library, port, https, options.requests)
+        print 'A connection per request: %4d connections %.2fms per ' \
+            'request' % (server.connections,
+                         elapsed * 1000 / options.requests)
+
+        server.connections = 0
+        pool = httppool.ConnectionPool(options.pool_size)
+        httppool.install(pool, prefix=library.__name__)
+        pooled_elapsed = run_requests(library, port, https,
+                                      options.requests)
+        print 'Pooled connections:       %4d connections %.2fms per ' \
+            'request (%.1fx)' % (server.connections,
+                                 pooled_elapsed * 1000 / options.requests,
+                                 elapsed / pooled_elapsed)
+        print 'Pool: %s' % pool.get_stats()
+        pool.close()
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
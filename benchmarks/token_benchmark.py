@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#           http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+'''
+Benchmark the creation of symptom Tokens for a synthetic log containing
+Java stack traces, with and without a LineIndex, and optionally the
+analyzer as a whole on the same log.
+
+Usage: python benchmarks/token_benchmark.py [-n TRACES] [-a]
+'''
+
+from optparse import OptionParser
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src'))
+
+from redhat_support_tool.helpers.analyzer import Analyzer
+import redhat_support_tool.symptoms as symptoms
+
+__author__ = 'Keith Robertson <kroberts@redhat.com>'
+
+
+def make_log(traces, seed=0):
+    '''
+    Returns a log of ordinary lines with the given number of Java stack
+    traces scattered through it.
+    '''
+    rand = random.Random(seed)
+    lines = []
+    for i in xrange(traces):
+        for j in xrange(rand.randint(1, 20)):
+            lines.append('%d 12:00:%02d INFO [main] Request %d served' %
+                         (i, j % 60, rand.randint(0, 100000)))
+        lines.append('java.lang.IllegalStateException: failure %d' % i)
+        for j in xrange(rand.randint(3, 12)):
+            lines.append('\tat com.example.Service%d.call(Service.java:%d)' %
+                         (j, rand.randint(1, 999)))
+    lines.append('%d 12:00:00 INFO [main] Done' % traces)
+    return '\n'.join(lines) + '\n'
+
+
+def time_tokens(text, locations, line_index=None):
+    start = time.time()
+    for locn in locations:
+        symptoms.Token(text, locn, '', line_index=line_index)
+    return time.time() - start
+
+
+def main():
+    parser = OptionParser(usage='%prog [-n TRACES] [-a]')
+    parser.add_option('-n', '--traces', dest='traces', type='int',
+                      default=10000,
+                      help='The number of stack traces in the log.')
+    parser.add_option('-a', '--analyze', dest='analyze',
+                      action='store_true', default=False,
+                      help='Also time Analyzer.analyze on the log.')
+    options = parser.parse_args()[0]
+
+    text = make_log(options.traces).expandtabs()
+    locations = []
+    locn = text.find('java.lang.')
+    while locn != -1:
+        locations.append(locn)
+        locn = text.find('java.lang.', locn + 1)
+    print 'Log of %d bytes with %d stack traces' % (len(text), len(locations))
+
+    elapsed = time_tokens(text, locations)
+    print 'Tokens with pyparsing line/lineno/col: %.3fs' % elapsed
+    start = time.time()
+    line_index = symptoms.LineIndex(text)
+    index_time = time.time() - start
+    elapsed = time_tokens(text, locations, line_index)
+    print 'Tokens with a LineIndex:               %.3fs (index %.3fs)' % \
+        (elapsed, index_time)
+
+    if not options.analyze:
+        return
+    fd, path = tempfile.mkstemp(suffix='.log')
+    try:
+        os.write(fd, text)
+        os.close(fd)
+        start = time.time()
+        found = Analyzer.analyze(path, window_size=16 * 1024 * 1024)
+        print 'Analyzer.analyze found %d symptoms:  %.3fs' % \
+            (len(found), time.time() - start)
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
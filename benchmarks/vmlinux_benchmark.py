@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#           http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+'''
+Benchmark extracting the kernel version from a vmlinux with VMLinux,
+against the previous parser which read each ELF header field with its
+own read and unpack.  Without -f a sparse, vmlinux sized, 64-bit ELF file
+with as many sections as a RHEL kernel is made to parse.
+
+Usage: python benchmarks/vmlinux_benchmark.py [-f VMLINUX] [-n REPEAT]
+'''
+
+from optparse import OptionParser
+import os
+import struct
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'src'))
+
+from redhat_support_tool.helpers.vmcorehelper import VMLinux
+
+__author__ = 'Keith Robertson <kroberts@redhat.com>'
+
+
+def legacy_version(filename):
+    '''
+    The kernel version of a 64-bit vmlinux, found the way VMLinux used to.
+    '''
+    vmlinux = open(filename, 'rb')
+    try:
+        ident = vmlinux.read(16)
+        endianness = {'\x01': '<', '\x02': '>'}[ident[5]]
+
+        def read(fmt):
+            return struct.unpack(endianness + fmt,
+                                 vmlinux.read(struct.calcsize(fmt)))[0]
+
+        for fmt in ('H', 'H', 'I', 'Q', 'Q'):
+            read(fmt)
+        shoff = read('Q')
+        for fmt in ('I', 'H', 'H', 'H'):
+            read(fmt)
+        shentsize = read('H')
+        shnum = read('H')
+        shstrndx = read('H')
+
+        vmlinux.seek(shoff, 0)
+        sections = []
+        for i in range(shnum):
+            sect = []
+            for fmt in ('I', 'I', 'Q', 'Q', 'Q', 'Q', 'I', 'I', 'Q', 'Q'):
+                sect.append(read(fmt))
+            vmlinux.seek(shentsize - 64, 1)
+            sections.append(sect)
+
+        vmlinux.seek(sections[shstrndx][4], 0)
+        strings = vmlinux.read(sections[shstrndx][5])
+        ro_offset = strings.find('.rodata', 1)
+        for sect in sections:
+            if sect[0] == ro_offset:
+                vmlinux.seek(sect[4] + 32, 0)
+                id_string = vmlinux.read(192).split()
+                if id_string[0] == 'Linux' and id_string[1] == 'version':
+                    return id_string[2]
+    finally:
+        vmlinux.close()
+
+
+def make_vmlinux(filename, sections, size):
+    '''
+    Writes a sparse 64-bit ELF file of the given size with the given number
+    of sections, one of which is a .rodata holding a version banner.
+    '''
+    names = ['', '.shstrtab', '.rodata']
+    names.extend(['.debug_section_%d' % i for i in xrange(sections - 3)])
+    shstrtab = '\0'.join(names) + '\0'
+    banner = '\0' * 32 + 'Linux version 2.6.32-431.el6.x86_64 ' \
+        '(mockbuild@x86-023.build.eng.bos.redhat.com) #1 SMP\0'
+    shoff = size - sections * 64
+    hdr = '\x7fELF\x02\x01\x01' + '\0' * 9 + \
+        struct.pack('<HHIQQQIHHHHHH', 2, 62, 1, 0, 0, shoff, 0, 64, 0, 0,
+                    64, sections, 1)
+    sect = struct.Struct('<IIQQQQIIQQ')
+    table = []
+    name = 0
+    for i, section in enumerate(names):
+        if section == '.shstrtab':
+            table.append(sect.pack(name, 3, 0, 0, 64, len(shstrtab), 0, 0,
+                                   1, 0))
+        elif section == '.rodata':
+            table.append(sect.pack(name, 1, 2, 0, 4096, len(banner), 0, 0,
+                                   64, 0))
+        else:
+            table.append(sect.pack(name, 1, 0, 0, 8192 + i, 1, 0, 0, 1, 0))
+        name += len(section) + 1
+
+    vmlinux = open(filename, 'wb')
+    try:
+        vmlinux.write(hdr)
+        vmlinux.write(shstrtab)
+        vmlinux.seek(4096)
+        vmlinux.write(banner)
+        vmlinux.seek(shoff)
+        vmlinux.write(''.join(table))
+    finally:
+        vmlinux.close()
+
+
+def time_parser(parser, filename, repeat):
+    start = time.time()
+    for i in xrange(repeat):
+        version = parser(filename)
+    return version, time.time() - start
+
+
+def main():
+    parser = OptionParser(usage='%prog [-f VMLINUX] [-n REPEAT]')
+    parser.add_option('-f', '--file', dest='file', default=None,
+                      help='A 64-bit vmlinux to parse.')
+    parser.add_option('-n', '--repeat', dest='repeat', type='int',
+                      default=200,
+                      help='The number of times to parse the vmlinux.')
+    parser.add_option('-s', '--sections', dest='sections', type='int',
+                      default=80,
+                      help='The number of sections in the made vmlinux.')
+    options = parser.parse_args()[0]
+
+    filename = options.file
+    if not filename:
+        fd, filename = tempfile.mkstemp(suffix='-vmlinux')
+        os.close(fd)
+        make_vmlinux(filename, options.sections, 300 * 1024 * 1024)
+    try:
+        print '%s: %d bytes' % (filename, os.path.getsize(filename))
+        version, elapsed = time_parser(legacy_version, filename,
+                                       options.repeat)
+        print 'Field by field parser: %s %.2fms per file' % \
+            (version, elapsed * 1000 / options.repeat)
+        version, new_elapsed = time_parser(
+                        lambda path: VMLinux(path).get_version(), filename,
+                        options.repeat)
+        print 'VMLinux:               %s %.2fms per file (%.1fx)' % \
+            (version, new_elapsed * 1000 / options.repeat,
+             elapsed / new_elapsed)
+    finally:
+        if not options.file:
+            os.unlink(filename)
+
+
+if __name__ == '__main__':
+    main()
@@ -17,6 +17,15 @@
 # limitations under the License.
 #
 
+import redhat_support_tool.helpers.daemonhelper as daemonhelper
+import sys
+
+# If a session daemon is running, hand non-interactive commands to it
+# before paying for any of the imports below.
+if __name__ == '__main__':
+    _daemon_ret = daemonhelper.forward_command(sys.argv)
+    if _daemon_ret is not None:
+        sys.exit(_daemon_ret)
 
 from redhat_support_tool.helpers.common import set_docstring
 from redhat_support_tool.helpers.confighelper import _
@@ -25,17 +34,14 @@ from redhat_support_tool.helpers.launchhelper import LaunchHelper
 import redhat_support_tool.helpers.version as version
 import cmd
 import codecs
-import inspect
 import locale
 import logging.handlers
 import os
-import pkgutil
 import pwd
+import redhat_support_tool.helpers.apihelper as apihelper
 import redhat_support_tool.helpers.common as common
 import redhat_support_tool.helpers.confighelper as confighelper
-import redhat_support_tool.plugins
-import redhat_support_tool.vendors
-import sys
+import redhat_support_tool.helpers.pluginmanifest as pluginmanifest
 
 # This is a quite ugly hack, but appears to be the only way to make Python 2.x
 # handle utf-8 content/consoles correctly.  The UndefinedVariable @-tag
@@ -90,96 +96,29 @@ class RHHelp(cmd.Cmd):
         logger = logging.getLogger("redhat-support-tool.rhhelp")
         logger.setLevel(logging.root.getEffectiveLevel())
 
-    def _init_vendor_packages(self):
-        vendor_packages = []
-        vendor_plugins = []
-        vendor_ignorelist = []
-
-        # pkgutil.walk_packages is only in 2.6+ (maybe 2.5, but we don't use
-        # python 2.5)
-        # The problem is, for 2.4 (RHEL 5) plugins are forced to be in the
-        # same locations, 2.6+ we allow far more acceptable locations, which
-        # is anywhere defined in sys.path/PYTHONPATH=
-        if sys.version_info[:2] >= (2, 6):
-            for pkg in pkgutil.walk_packages(
-                                redhat_support_tool.vendors.__path__,
-                                redhat_support_tool.vendors.__name__ + '.'):
-                # pkg = (pkgutil object, package name, is a package?)
-                if pkg[2]:
-                    vendor_packages.append(pkg[1])
-        else:
-            for loc in os.listdir(redhat_support_tool.vendors.__path__[0]):
-                if (os.path.isdir(loc) and
-                    os.path.exists(os.path.join(loc, '__init__.py'))):
-                    vendor_packages.append('redhat_support_tool.vendors.%s' %
-                                           loc)
-
-        for package in vendor_packages:
-            try:
-                __import__(package)
-                mod = sys.modules[package]
-                if hasattr(mod, 'provided_module'):
-                    vendor_plugins.extend(mod.provided_modules)
-                if hasattr(mod, 'ignored_modules'):
-                    vendor_ignorelist.extend(mod.ignored_modules)
-            except AttributeError:
-                logger.error(_('Vendor plugin %s was not loaded due to missing'
-                               ' metadata'), package)
-            except ImportError:
-                logging.error(_('Unable to load vendor plugin %s,'
-                                ' skipping...'), package)
-        logger.log(31, "vendor_plugins(%s)" % (vendor_plugins))
-        logger.log(31, "vendor_ignorelist(%s)" % (vendor_ignorelist))
-        return vendor_plugins, vendor_ignorelist
-
     def _get_plugins(self):
-        plugin_dict = {}
-
-        package = redhat_support_tool.plugins
-        prefix = package.__name__ + "."
-        modnames = []
-        for filename in os.listdir(package.__path__[0]):
-            if (filename.endswith('.py') or filename.endswith('.pyc') and
-                filename != '__init__.py'):
-                modnames.append(prefix + filename.rsplit('.', 1)[0])
-#        for importer, modname, ispkg in pkgutil.iter_modules(package.__path__,
-#                                                             prefix):
-
-        # Filter functions for vendor overrides and plugins
-        vendor_plugins, ignore_list = self._init_vendor_packages()
-        modnames = list(set(modnames) - set(ignore_list))
-        modnames.extend(vendor_plugins)
-        logger.debug(modnames)
-
-        for modname in modnames:
-            logger.log(31, "Found submodule %s" % (modname))
-            __import__(modname)
-            mod = sys.modules[modname]
-            objectAry = inspect.getmembers(mod, inspect.isclass)
-            for o in objectAry:
-                if (issubclass(o[1], redhat_support_tool.plugins.Plugin) and
-                    (o[0] != 'InteractivePlugin' and o[0] != 'Plugin') and
-                    not issubclass(o[1],
-                                redhat_support_tool.plugins.HiddenCommand) and
-                    o[1].__module__ not in ignore_list):
-                    # Add import to list
-                    logger.log(31, "Adding import %s to"
-                    " plugin dictionary" % o[0])
-                    plugin_dict[o[1].get_name()] = o[1]
-        return plugin_dict
+        return pluginmanifest.get_plugin_dict()
 
     def _load_plugins(self, plugin_dict):
-        for plugin in plugin_dict:
+        for plugin in plugin_dict.keys():
             logger.log(31, "Loading plugin %s" % plugin)
-            lh = LaunchHelper(plugin_dict[plugin])
-            setattr(self,
-                    'do_%s' % plugin,
-                    getattr(lh,
-                            'run'))
-            setattr(self,
-                    'help_%s' % plugin,
-                    getattr(lh,
-                            'help'))
+            run, show_help = self._make_plugin_stubs(plugin_dict, plugin)
+            setattr(self, 'do_%s' % plugin, run)
+            setattr(self, 'help_%s' % plugin, show_help)
+
+    def _make_plugin_stubs(self, plugin_dict, plugin):
+        '''
+        Create do_/help_ stubs for a command which only import the
+        plug-in module when the command is actually used.
+        '''
+        def run(line, *args, **kwargs):
+            return LaunchHelper(plugin_dict[plugin]).run(line, *args,
+                                                         **kwargs)
+
+        def show_help():
+            return LaunchHelper(plugin_dict[plugin]).help()
+
+        return run, show_help
 
 #    def do_makeconfig(self, line):
 #        confighelper.get_config_helper()
@@ -275,6 +214,73 @@ and create it if necessary.
         return ary
 
 
+def _compose_command(args, data=None):
+    '''
+    Compose the command line passed to RHHelp.onecmd from the program
+    arguments and any piped input.
+    '''
+    var = u' '.join([unicode(i, 'utf8') for i in args])
+    if data is not None:
+        var = u'%s %s' % (var, unicode(data, 'utf8'))
+        var = var.strip()
+    return var
+
+
+def _parse_global_options(args):
+    '''
+    Set the output format from a leading --format FORMAT, or
+    --format=FORMAT, in the program arguments and return the rest of them.
+    '''
+    output_format = 'text'
+    if args and str(args[0]).lower().startswith('--format'):
+        if '=' in args[0]:
+            output_format = args[0].split('=', 1)[1]
+            args = args[1:]
+        else:
+            output_format = ' '.join(args[1:2])
+            args = args[2:]
+        if output_format not in common.OUTPUT_FORMATS:
+            raise Exception(_('--format must be one of: %s') %
+                            ', '.join(common.OUTPUT_FORMATS))
+        if not args:
+            raise Exception(_('--format must be followed by a command.'))
+    common.set_output_format(output_format)
+    return args
+
+
+def _run_daemon():
+    '''
+    Start a session daemon which keeps RHHelp, the plugins and the API
+    connection loaded and runs the commands forwarded to it by other
+    redhat-support-tool invocations.
+    '''
+    rhhelp = RHHelp()
+    # Connect now so that any credential prompts happen here, rather than
+    # failing in a forwarded command which has no terminal.
+    apihelper.get_api()
+    bold = Constants.BOLD
+    end = Constants.END
+
+    def run_command(args, data):
+        if sys.stdout.isatty():
+            Constants.BOLD = bold
+            Constants.END = end
+        else:
+            Constants.BOLD = ''
+            Constants.END = ''
+        # cmd.Cmd keeps its own reference to stdout.
+        rhhelp.stdout = sys.stdout
+        args = _parse_global_options(args)
+        # The plugins read their arguments from sys.argv.
+        sys.argv[1:] = args
+        return rhhelp.onecmd(_compose_command(args, data))
+
+    try:
+        daemonhelper.SessionDaemon(run_command).serve_forever()
+    finally:
+        apihelper.disconnect_api()
+
+
 def main():
     try:
         if len(sys.argv) > 1:
@@ -285,13 +291,18 @@ def main():
             if str(sys.argv[1]).lower() == '-v' or str(sys.argv[1]).lower() == '--version':
                 print 'redhat-support-tool %s' % (version.version)
                 sys.exit(0)
-            # Compose input string.
-            var = u' '.join([unicode(i, 'utf8') for i in sys.argv[1:]])
+            if str(sys.argv[1]).lower() == '--daemon':
+                _run_daemon()
+                sys.exit(0)
+            args = _parse_global_options(sys.argv[1:])
+            # The plugins read their arguments from sys.argv.
+            sys.argv[1:] = args
+            # Do we have piped input?
+            data = None
             if not sys.stdin.isatty():
-                # Do we have piped input?
-                data = unicode(sys.stdin.read(), 'utf8')
-                var = u'%s %s' % (var, data)
-                var = var.strip()
+                data = sys.stdin.read()
+            # Compose input string.
+            var = _compose_command(args, data)
             # Set the locale for cases where the user pipes to
             # a file or grep.  Without this 'print' will throw
             # an exception on unicode chars.
@@ -15,11 +15,37 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+from redhat_support_tool.helpers.confighelper import _
 import redhat_support_tool.symptoms as symptoms
+try:
+    from pyparsing import And, Combine, Group, ParseException, \
+        ParserElement, Regex
+except ImportError:
+    from redhat_support_tool.tools.pyparsing import And, Combine, Group, \
+        ParseException, ParserElement, Regex
+import heapq
 import logging
+import marshal
+import mmap
 import os
+import redhat_support_tool.helpers.confighelper as confighelper
+import redhat_support_tool.helpers.diskcache as diskcache
+import shutil
+import subprocess
 import sys
+import tarfile
+import tempfile
+import zlib
 import inspect
+try:
+    from hashlib import sha1
+except ImportError:
+    from sha import new as sha1
+try:
+    import multiprocessing
+except ImportError:
+    # python 2.4 and 2.5
+    multiprocessing = None
 
 __author__ = 'Dan Varga <dvarga@redhat.com>'
 __author__ = 'Keith Robertson <kroberts@redhat.com>'
@@ -97,57 +123,799 @@ class Analyzer(object):
         return cls.plugin_dict.values()
 
     @classmethod
-    def analyze(cls, filename, symptom_list=None):
+    def get_window_size(cls):
+        '''
+        Returns the configured size, in bytes, of the window through which
+        files are read for analysis.
+        '''
+        window_size = confighelper.get_config_helper().get(
+                                                option='analyzer_window_size')
+        try:
+            if window_size:
+                return max(int(window_size),
+                           confighelper.ConfigHelper.MIN_ANALYZER_WINDOW_SIZE)
+        except ValueError:
+            logger.log(logging.WARNING, 'Invalid analyzer_window_size %s' %
+                       window_size)
+        return confighelper.ConfigHelper.DEFAULT_ANALYZER_WINDOW_SIZE
+
+    @classmethod
+    def get_jobs(cls):
+        '''
+        Returns the configured number of processes used to analyze the
+        files of a directory or archive, by default the number of CPUs.
+        '''
+        jobs = confighelper.get_config_helper().get(option='analyzer_jobs')
+        try:
+            if jobs:
+                return int(jobs)
+        except ValueError:
+            logger.log(logging.WARNING, 'Invalid analyzer_jobs %s' % jobs)
+        try:
+            return multiprocessing.cpu_count()
+        except (AttributeError, NotImplementedError):
+            return 1
+
+    @classmethod
+    def is_archive(cls, filename):
+        '''
+        Returns True if filename names a tar archive, such as a sosreport,
+        which analyze will extract and analyze the files of.
+        '''
+        if not os.path.isfile(filename):
+            return False
+        for suffix in ARCHIVE_SUFFIXES:
+            if filename.endswith(suffix):
+                return True
+        return False
+
+    @classmethod
+    def analyze(cls, filename, symptom_list=None, window_size=None,
+                jobs=None):
         '''
         Analyze the contents of the specified file against a list
         of supplied symptoms, or against all symptoms by default
         see symptoms/__init__.py Token class for more information
+
+        Files are memory mapped and parsed through a window of window_size
+        bytes (see get_window_size) so that memory use doesn't grow with
+        the size of the file.
+
+        filename may also be a directory or a tar archive, in which case
+        every file beneath it is analyzed, spread across a pool of jobs
+        processes (see get_jobs).  The Tokens of each file are returned in
+        file name order, with duplicates removed across all of the files.
+        Each Token's source is the path of the file it was found in.
+
+        The results for files, archives and text are cached (see
+        get_cache) by a digest of their content and the versions of the
+        symptoms, so analyzing the same content again skips parsing.
+
         Returns: array of symptom tokens found
         '''
         if not cls.plugin_dict:
             cls.load_plugins()
 
-        # Clear out the deduper, not sure if there is a cleaner way to do this
-        del symptoms.AnalyzerPlugin.deduper
-        symptoms.AnalyzerPlugin.symptoms = []
-        symptoms.AnalyzerPlugin.deduper = None
+        plugins = cls._get_plugin_list(symptom_list)
+        if not window_size:
+            window_size = cls.get_window_size()
+
+        path = filename
+        try:
+            path = os.path.expanduser(filename)
+            if os.path.isdir(path):
+                kind = 'directory'
+            elif cls.is_archive(path):
+                kind = 'archive'
+            elif os.path.isfile(path):
+                kind = 'file'
+            else:
+                kind = 'text'
+        except (TypeError, ValueError):
+            # Not something os.path can treat as a file name (eg. text
+            # containing NUL characters), analyze it as text.
+            kind = 'text'
+
+        cache_key = cls._get_cache_key(kind, path, plugins, window_size)
+        if cache_key:
+            tokens = cls._load_cached(cache_key, path)
+            if tokens is not None:
+                logger.log(logging.DEBUG, 'Using cached analysis of %s' %
+                           cache_key)
+                return tokens
+
+        # All of the symptoms are matched in a single pass over the text,
+        # the Tokens are then collected in the same order (and deduplicated
+        # the same way) as if each symptom had been searched for in turn.
+        scanner = SymptomScanner(plugins)
+        logger.log(logging.DEBUG, "Starting parsing")
+        try:
+            if kind == 'directory':
+                all_results = cls._analyze_tree(path, path, plugins,
+                                                window_size, jobs)
+            elif kind == 'archive':
+                all_results = cls._analyze_archive(path, plugins,
+                                                   window_size, jobs)
+            elif kind == 'file':
+                all_results = [scanner.scan_file(path, window_size)]
+            else:
+                all_results = [scanner.scan(filename)]
+        except IOError, e:
+            logger.log(logging.ERROR, e)
+            print "Could not open file: %s  Error: %s" \
+                % (e.filename, e.strerror)
+            raise
+        logger.log(logging.DEBUG, "Ended parsing")
+
+        context = symptoms.AnalysisContext()
+        for results in all_results:
+            for plugin in plugins:
+                for token in results[plugin]:
+                    context.collectToken(token)
+
+        if cache_key:
+            cls._store_cached(cache_key, path, context.symptoms)
+        return context.symptoms
+
+    @classmethod
+    def get_cache(cls):
+        '''
+        Returns the DiskCache of analysis results, bounded by the
+        analyzer_cache_size option.
+        '''
+        cache_size = confighelper.get_config_helper().get(
+                                                option='analyzer_cache_size')
+        try:
+            if cache_size is None or cache_size == '':
+                cache_size = \
+                    confighelper.ConfigHelper.DEFAULT_ANALYZER_CACHE_SIZE
+            cache_size = int(cache_size)
+        except ValueError:
+            logger.log(logging.WARNING, 'Invalid analyzer_cache_size %s' %
+                       cache_size)
+            cache_size = confighelper.ConfigHelper.DEFAULT_ANALYZER_CACHE_SIZE
+        return diskcache.DiskCache(CACHE_DIR, cache_size)
+
+    @classmethod
+    def _get_cache_key(cls, kind, path, plugins, window_size):
+        '''
+        Returns the key of the cached results for analyzing path with
+        plugins, made from a digest of its content and the symptoms'
+        versions, or None if the results shouldn't be cached.
+        '''
+        # Hashing a directory would mean reading every file in it anyway.
+        if kind == 'directory' or not cls.get_cache().max_size:
+            return None
+
+        digest = sha1()
+        if kind == 'text':
+            if isinstance(path, unicode):
+                digest.update(path.encode('utf-8'))
+            else:
+                digest.update(path)
+        else:
+            try:
+                contentfile = open(path, 'rb')
+                try:
+                    while True:
+                        data = contentfile.read(1024 * 1024)
+                        if not data:
+                            break
+                        digest.update(data)
+                finally:
+                    contentfile.close()
+            except IOError, e:
+                logger.log(logging.DEBUG, e)
+                return None
+
+        parts = [CACHE_FORMAT, '%d.%d' % sys.version_info[:2], kind,
+                 digest.hexdigest(), str(window_size)]
+        for plugin in plugins:
+            parts.append('%s.%s=%s' % (plugin.__module__, plugin.__name__,
+                                       plugin.get_version()))
+        return diskcache.make_key(*parts)
+
+    @classmethod
+    def _load_cached(cls, cache_key, path):
+        data = cls.get_cache().get(cache_key)
+        if data is None:
+            return None
+        try:
+            fields = marshal.loads(zlib.decompress(data))
+        # pylint: disable=W0703
+        except Exception, e:
+            logger.log(logging.WARNING, 'Discarding bad analyzer cache '
+                       'entry %s: %s' % (cache_key, e))
+            cls.get_cache().invalidate(cache_key)
+            return None
+        tokens = []
+        for token_fields, suffix in fields:
+            source = None
+            if suffix is not None:
+                source = path + suffix
+            tokens.append(symptoms.Token.from_tuple(token_fields, source))
+        return tokens
+
+    @classmethod
+    def _store_cached(cls, cache_key, path, tokens):
+        # Sources are stored relative to path, which may differ next time.
+        fields = []
+        for token in tokens:
+            suffix = None
+            if token.source and token.source.startswith(path):
+                suffix = token.source[len(path):]
+            fields.append((token.to_tuple(), suffix))
+        try:
+            data = zlib.compress(marshal.dumps(fields))
+        except ValueError, e:
+            logger.log(logging.DEBUG, 'Unable to cache analysis: %s' % e)
+            return
+        cls.get_cache().put(cache_key, data)
+
+    @classmethod
+    def follow(cls, filename, symptom_list=None, window_size=None):
+        '''
+        Start following a log file which is being written to, see
+        LogFollower.
 
-        # Need to build out an "or'ed" together statement
-        expression = None
+        Returns: a LogFollower, call its poll method for new symptom tokens
+        '''
+        if not cls.plugin_dict:
+            cls.load_plugins()
+        if not window_size:
+            window_size = cls.get_window_size()
+        return LogFollower(os.path.expanduser(filename),
+                           cls._get_plugin_list(symptom_list), window_size)
+
+    @classmethod
+    def _get_plugin_list(cls, symptom_list=None):
         if symptom_list == None:
             symptom_list = cls.plugin_dict.keys()
 
+        plugins = []
         for s in symptom_list:
             logger.log(logging.DEBUG, "Analyze Plugin %s" % s)
-
-        for s in symptom_list:
             if (cls.plugin_dict[s] != None):
-                expression = cls.plugin_dict[s].get_symptom()
+                plugins.append(cls.plugin_dict[s])
+        return plugins
 
-                # Setup the callback to be able to "Tokenize" the results
-                expression.setParseAction(
-                                    symptoms.AnalyzerPlugin.createTokenObject)
+    @classmethod
+    def _analyze_tree(cls, dirname, source_dir, plugins, window_size,
+                      jobs=None):
+        '''
+        Scan every file beneath dirname, in a pool of processes when there
+        is more than one file to scan.  Tokens are tagged with their path
+        relative to dirname joined to source_dir.
 
-                # searchString doesn't correctly return the Tokens
-                # it's return value is nonsense, just pretend it's not there
-                logger.log(logging.DEBUG, "Starting parsing for %s" %
-                           cls.plugin_dict[s].get_name())
-                try:
-                    if os.path.isfile(os.path.expanduser(filename)):
-                        expression.searchString(
-                                    file(os.path.expanduser(filename)).read())
-                    else:
-                        expression.searchString(filename)
-                except IOError, e:
-                    logger.log(logging.ERROR, e)
-                    print "Could not open file: %s  Error: %s" \
-                        % (e.filename, e.strerror)
-                    raise
-                except:
-                    expression.searchString(filename)
-                logger.log(logging.DEBUG, "Ended parsing for %s" %
-                           cls.plugin_dict[s].get_name())
-
-        # symptoms.AnalyzerPlugin.symptoms contains the real
-        # results from searchString
-        return symptoms.AnalyzerPlugin.symptoms
+        Returns:
+         A list of the scanner results for each file, in file name order.
+        '''
+        paths = []
+        for root, dirs, files in os.walk(dirname):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.isfile(path) and not os.path.islink(path):
+                    paths.append(path)
+        paths.sort()
+        prefix = os.path.join(dirname, '')
+        work = [(path, os.path.join(source_dir, path[len(prefix):]))
+                for path in paths]
+        logger.log(logging.DEBUG, 'Analyzing %d files beneath %s' %
+                   (len(work), dirname))
+
+        if not jobs:
+            jobs = cls.get_jobs()
+        jobs = min(jobs, len(work))
+        if jobs <= 1 or not multiprocessing:
+            scanner = SymptomScanner(plugins)
+            return [_scan_path_with(scanner, window_size, item)
+                    for item in work]
+
+        # The symptom plugins are already loaded, so forked workers
+        # inherit them rather than importing them again.
+        pool = multiprocessing.Pool(jobs, _init_worker,
+                                    (plugins, window_size))
+        try:
+            all_results = pool.map(_scan_path, work,
+                                   max(1, len(work) // (jobs * 4)))
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+        return all_results
+
+    @classmethod
+    def _analyze_archive(cls, filename, plugins, window_size, jobs=None):
+        '''
+        Extract the regular files of a tar archive into a temporary
+        directory and analyze them.  Tokens are tagged with the archive's
+        path joined to the member's name.
+        '''
+        tmpdir = tempfile.mkdtemp(prefix='rhst-analyze-')
+        try:
+            _extract_archive(filename, tmpdir)
+            return cls._analyze_tree(tmpdir, filename, plugins,
+                                     window_size, jobs)
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+# The directory in ~/.redhat-support-tool of cached analysis results, and
+# the version of their format.
+CACHE_DIR = 'analyzer_cache'
+CACHE_FORMAT = '1'
+
+ARCHIVE_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2',
+                    '.tar.xz', '.txz')
+
+# The scanner of each pool process, see _init_worker
+_worker_scanner = None
+_worker_window_size = None
+
+
+def _init_worker(plugins, window_size):
+    global _worker_scanner
+    global _worker_window_size
+    _worker_scanner = SymptomScanner(plugins)
+    _worker_window_size = window_size
+
+
+def _scan_path(item):
+    return _scan_path_with(_worker_scanner, _worker_window_size, item)
+
+
+def _scan_path_with(scanner, window_size, item):
+    '''
+    Scan a single file of a directory or archive for symptoms.  Files
+    which look binary or can't be read are skipped.
+
+    Arguments:
+     scanner     - The SymptomScanner to use
+     window_size - The size of the window to scan the file through
+     item        - A tuple of the path to scan and the source to tag
+                   Tokens with
+    '''
+    path, source = item
+    try:
+        f = open(path, 'rb')
+        try:
+            if '\0' in f.read(1024):
+                logger.log(logging.DEBUG, 'Skipping binary file %s' % source)
+                return scanner.scan('')
+        finally:
+            f.close()
+        return scanner.scan_file(path, window_size, source)
+    except (IOError, OSError), e:
+        logger.log(logging.WARNING, 'Unable to analyze %s: %s' % (source, e))
+        return scanner.scan('')
+
+
+def _extract_archive(filename, destdir):
+    '''
+    Extract the regular files of a tar archive beneath destdir, skipping
+    any whose name would place them outside of it.  xz compressed
+    archives, which the tarfile module can't read, are piped through xz.
+    '''
+    proc = None
+    if filename.endswith('.xz') or filename.endswith('.txz'):
+        proc = subprocess.Popen(['xz', '-dc', filename],
+                                stdout=subprocess.PIPE)
+        tar = tarfile.open(fileobj=proc.stdout, mode='r|')
+    else:
+        tar = tarfile.open(filename, mode='r|*')
+    try:
+        for member in tar:
+            name = os.path.normpath(member.name)
+            if (not member.isfile() or os.path.isabs(name) or
+                name.startswith(os.pardir)):
+                continue
+            member.name = name
+            member.mode = member.mode | 0600
+            tar.extract(member, destdir)
+    finally:
+        tar.close()
+        if proc:
+            proc.stdout.close()
+            if proc.wait():
+                msg = _('ERROR: Unable to decompress %s') % filename
+                print msg
+                logger.log(logging.ERROR, msg)
+                raise Exception(msg)
+
+
+class ScanPosition(object):
+    '''
+    How far a SymptomScanner has got through a file: the offset of the
+    next window, the location (in parsed, ie. tab expanded, coordinates)
+    and number of lines before it, and where each symptom resumes from.
+    '''
+    def __init__(self, nsymptoms):
+        self.start = 0
+        self.base_loc = 0
+        self.base_line = 0
+        self.resume = [0] * nsymptoms
+
+
+class SymptomScanner(object):
+    '''
+    Matches the expressions of a set of symptom plugins against a text
+    in a single pass.
+
+    Each symptom gets the same matches that pyparsing's scanString would
+    give it, but rather than each symptom walking the whole text in turn,
+    the scanner keeps the next candidate location of every symptom in a
+    heap and visits them in ascending order.  When a symptom declares an
+    anchor (see AnalyzerPlugin.get_anchor) its candidates are found by
+    searching for the anchor with str.find, otherwise when its expression
+    starts with a Regex they are found with re.search, and only failing
+    both is the expression tried at every offset.
+
+    Files are scanned through a memory map, one window at a time.  Windows
+    end on a line boundary and the last quarter of each window is scanned
+    again at the start of the next, so a symptom which fails to match
+    there, possibly because its match runs past the end of the window,
+    is retried with more of the file available.  This assumes that a
+    symptom which can match never needs more than the overlap, and that
+    its expression doesn't look beyond the end of the line its match
+    ends on.
+    '''
+
+    def __init__(self, plugins):
+        '''
+        Arguments:
+         plugins - A list of AnalyzerPlugin classes
+        '''
+        self.plugins = plugins
+        self.expressions = []
+        self.anchors = []
+        self.leading = []
+        self.expand_tabs = False
+        for plugin in plugins:
+            expression = plugin.get_symptom()
+            expression.streamline()
+            self.expressions.append(expression)
+            self.anchors.append(plugin.get_anchor())
+            self.leading.append(self._get_leading_regex(expression))
+            if not expression.keepTabs:
+                self.expand_tabs = True
+
+    @classmethod
+    def _get_leading_regex(cls, expression):
+        '''
+        Returns the compiled regular expression which any match of the
+        expression has to start with, or None if there isn't one.
+        '''
+        # Ignorable expressions would have to be skipped before the Regex
+        # is tried, so they rule it out.  Leading whitespace is fine, as
+        # the scanner preParses each candidate just as scanString does.
+        if expression.ignoreExprs:
+            return None
+        while True:
+            if isinstance(expression, Regex):
+                return expression.re
+            elif isinstance(expression, And) and expression.exprs:
+                expression = expression.exprs[0]
+            elif isinstance(expression, (Combine, Group)):
+                expression = expression.expr
+            else:
+                return None
+
+    def _new_results(self):
+        results = {}
+        for plugin in self.plugins:
+            results[plugin] = []
+        return results
+
+    def _add_tokens(self, results, instring, matches, loc_offset=0,
+                    line_offset=0, source=None):
+        line_index = None
+        for i in range(len(self.plugins)):
+            for locn, toks in matches[i]:
+                if not line_index:
+                    line_index = symptoms.LineIndex(instring)
+                results[self.plugins[i]].append(
+                    symptoms.Token(instring, locn, toks[0],
+                                   loc_offset=loc_offset,
+                                   line_offset=line_offset,
+                                   line_index=line_index,
+                                   source=source))
+
+    def scan(self, text):
+        '''
+        Scan a text held in memory for all of the symptoms.
+
+        Returns:
+         A dictionary of plugin class to a list of the Tokens found for it,
+         in the order they were found.
+        '''
+        if self.expand_tabs:
+            text = text.expandtabs()
+        results = self._new_results()
+        matches = self._scan_window(text, [0] * len(self.plugins),
+                                    len(text) + 1)[0]
+        self._add_tokens(results, text, matches)
+        return results
+
+    def scan_file(self, filename, window_size, source=None):
+        '''
+        Scan a file for all of the symptoms, reading it window_size bytes
+        at a time.  The Tokens' source is set to source, or filename.
+
+        Returns:
+         A dictionary of plugin class to a list of the Tokens found for it,
+         in the order they were found.
+        '''
+        f = open(filename, 'rb')
+        try:
+            return self.scan_open_file(f, window_size, source or filename)
+        finally:
+            f.close()
+
+    def scan_open_file(self, f, window_size, source, position=None,
+                       final=True):
+        '''
+        Scan an open file for all of the symptoms from position, or its
+        start, onwards.  See _scan_mapped for what final means.
+
+        Returns:
+         A dictionary of plugin class to a list of the Tokens found for it,
+         in the order they were found.
+        '''
+        size = os.fstat(f.fileno()).st_size
+        if size == 0 or (position and position.start >= size):
+            return self._new_results()
+        mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        try:
+            return self._scan_mapped(mm, size, window_size, source,
+                                     position, final)
+        finally:
+            mm.close()
+
+    def _scan_mapped(self, mm, size, window_size, source, position=None,
+                     final=True):
+        '''
+        Scan the memory mapped file mm, of size bytes, from position
+        onwards one window at a time.
+
+        Unless final is set, the file is expected to grow so the scan
+        stops at its last complete line, leaving position where the next
+        scan should start from, and a symptom which fails to match near
+        the end is retried by that scan.
+        '''
+        results = self._new_results()
+        if position is None:
+            position = ScanPosition(len(self.plugins))
+        window = window_size
+
+        while position.start < size:
+            end = min(size, position.start + window)
+            last_window = (end == size)
+            if not (final and last_window):
+                newline = mm.rfind('\n', position.start, end)
+                if newline == -1:
+                    if last_window:
+                        # Wait for the rest of the line.
+                        break
+                    # A single line longer than the window.
+                    window *= 2
+                    continue
+                end = newline + 1
+            at_eof = final and last_window
+
+            raw = mm[position.start:end]
+            instring = raw
+            if self.expand_tabs:
+                instring = raw.expandtabs()
+
+            if at_eof:
+                commit = len(instring) + 1
+                horizon = None
+            else:
+                commit = len(instring) - window_size // 4
+                # The start of the window's last line.
+                horizon = instring.rfind('\n', 0, len(instring) - 1) + 1
+            local = [max(r - position.base_loc, 0) for r in position.resume]
+            matches, local = self._scan_window(instring, local, commit,
+                                               horizon)
+
+            # Matches are never revisited, so they can be kept even if the
+            # window has to be scanned again.
+            self._add_tokens(results, instring, matches, position.base_loc,
+                             position.base_line, source)
+            position.resume = [position.base_loc + r for r in local]
+            if at_eof:
+                position.start = size
+                break
+
+            # Start the next window a line before the earliest resume
+            # point, so that Tokens found there have a before_line.
+            line_start = instring.rfind('\n', 0, min(local)) + 1
+            next_start = instring.rfind('\n', 0, max(line_start - 1, 0)) + 1
+            if next_start == 0:
+                if last_window:
+                    break
+                # A symptom is still waiting at the start of the window,
+                # widen it until it can be decided.
+                logger.log(logging.DEBUG,
+                           'Widening analyzer window at offset %d' %
+                           position.start)
+                window *= 2
+                continue
+
+            position.start += self._get_raw_offset(raw, instring, next_start)
+            position.base_loc += next_start
+            position.base_line += instring.count('\n', 0, next_start)
+            window = window_size
+            if last_window:
+                break
+
+        return results
+
+    @classmethod
+    def _get_raw_offset(cls, raw, instring, loc):
+        '''
+        Map loc, the start of a line in the tab expanded instring, back to
+        an offset in raw.
+        '''
+        if len(raw) == len(instring):
+            return loc
+        # Count back the same number of lines from the end of both.
+        pos = len(raw)
+        for _ in xrange(instring.count('\n', loc) + 1):
+            pos = raw.rindex('\n', 0, pos)
+        return pos + 1
+
+    def _scan_window(self, instring, resume, commit, horizon=None):
+        '''
+        Scan instring for the symptoms, starting each one from its location
+        in resume.  A symptom which fails to match at or after commit is
+        stopped there so it can be retried against the next window.  So is
+        one whose parse, matching or not, reaches horizon, the start of the
+        window's last line, wherever it starts: its match may run on past
+        the end of the window.  horizon is None when instring is the whole
+        text.
+
+        Returns:
+         A tuple of a list, per symptom, of (location, tokens) tuples and
+         a list of the location each symptom should resume from.
+        '''
+        instrlen = len(instring)
+        ParserElement.resetCache()
+
+        matches = []
+        heap = []
+        next_resume = []
+        for i in range(len(self.plugins)):
+            matches.append([])
+            next_resume.append(instrlen)
+            self._push_candidate(heap, instring, i, resume[i])
+
+        while heap:
+            loc, i = heapq.heappop(heap)
+            if loc > instrlen:
+                continue
+            expression = self.expressions[i]
+            preloc = loc
+            try:
+                preloc = expression.preParse(instring, loc)
+                nextLoc, tokens = expression._parse(instring, preloc,
+                                                    callPreParse=False)
+            except ParseException, e:
+                # e.loc is where the furthest alternative tried failed.
+                if loc >= commit or (horizon is not None and
+                                     e.loc >= horizon):
+                    next_resume[i] = loc
+                    continue
+                nextLoc = preloc + 1
+            else:
+                if horizon is not None and nextLoc >= horizon:
+                    # The match may be cut short by the end of the window.
+                    next_resume[i] = loc
+                    continue
+                if nextLoc > loc:
+                    matches[i].append((preloc, tokens))
+                else:
+                    nextLoc = preloc + 1
+            self._push_candidate(heap, instring, i, nextLoc)
+
+        return matches, next_resume
+
+    def _push_candidate(self, heap, instring, index, loc):
+        '''
+        Queue the next location at or after loc where the symptom at index
+        could match.
+        '''
+        anchor = self.anchors[index]
+        regex = self.leading[index]
+        if anchor:
+            # The match has to start on the same line as the anchor.
+            hit = instring.find(anchor, loc)
+            if hit == -1:
+                return
+            loc = max(loc, instring.rfind('\n', 0, hit) + 1)
+        elif regex is not None:
+            match = regex.search(instring, loc)
+            if not match:
+                return
+            loc = match.start()
+        if loc <= len(instring):
+            heapq.heappush(heap, (loc, index))
+
+
+class LogFollower(object):
+    '''
+    Follows a log file as it is written to, like tail -F.  Each poll only
+    scans the data appended since the previous one, and symptoms which
+    are still being written are completed by a later poll.
+
+    If the file is rotated, ie. its name now refers to a different file,
+    the rest of the old file is scanned and the new one is followed from
+    its start.  A truncated file is followed from its start again.
+    '''
+
+    def __init__(self, filename, plugins, window_size):
+        self.filename = filename
+        self.plugins = plugins
+        self.window_size = window_size
+        self.scanner = SymptomScanner(plugins)
+        self.context = symptoms.AnalysisContext()
+        self.logfile = None
+        self.inode = None
+        self.position = None
+
+    def _open(self):
+        try:
+            self.logfile = open(self.filename, 'rb')
+        except IOError, e:
+            # Between the old file being moved and the new one created.
+            logger.log(logging.DEBUG, e)
+            return False
+        st = os.fstat(self.logfile.fileno())
+        self.inode = (st.st_dev, st.st_ino)
+        self.position = ScanPosition(len(self.plugins))
+        return True
+
+    def _scan(self, final=False):
+        if os.fstat(self.logfile.fileno()).st_size < self.position.start:
+            logger.log(logging.DEBUG, '%s was truncated' % self.filename)
+            self.position = ScanPosition(len(self.plugins))
+        return self.scanner.scan_open_file(self.logfile, self.window_size,
+                                           self.filename, self.position,
+                                           final)
+
+    def _is_rotated(self):
+        try:
+            st = os.stat(self.filename)
+        except OSError:
+            return False
+        return (st.st_dev, st.st_ino) != self.inode
+
+    def poll(self):
+        '''
+        Scan whatever has been written since the last poll.
+
+        Returns: array of the symptom tokens found which haven't been seen
+                 before
+        '''
+        all_results = []
+        if self.logfile and self._is_rotated():
+            logger.log(logging.DEBUG, '%s was rotated' % self.filename)
+            all_results.append(self._scan(final=True))
+            self.close()
+        if self.logfile or self._open():
+            all_results.append(self._scan())
+
+        tokens = []
+        for results in all_results:
+            for plugin in self.plugins:
+                for token in results[plugin]:
+                    count = len(self.context.symptoms)
+                    self.context.collectToken(token)
+                    if len(self.context.symptoms) > count:
+                        tokens.append(token)
+        return tokens
+
+    def close(self):
+        if self.logfile:
+            self.logfile.close()
+            self.logfile = None
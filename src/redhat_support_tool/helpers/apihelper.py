@@ -24,12 +24,14 @@ API object.
 
 from redhat_support_lib.api import API
 import redhat_support_tool.helpers.confighelper as confighelper
+import redhat_support_tool.helpers.httppool as httppool
 import redhat_support_tool.helpers.version as version
 import logging
 
 __author__ = 'Keith Robertson <kroberts@redhat.com>'
 USER_AGENT = 'redhat-support-tool-%s' % (version.version)
 _api = None
+_pool = None
 logger = logging.getLogger("redhat_support_tool.plugins.list_cases")
 
 
@@ -47,8 +49,16 @@ def _make_api():
                                                      cfg.get(option='proxy_user')))
     '''
     global _api
+    global _pool
     if not _api:
         try:
+            # The API's requests keep their connections alive for the
+            # requests after them.  The pool is installed once, later APIs
+            # share it.
+            if _pool is None and httppool.get_pool_size() > 0:
+                _pool = httppool.ConnectionPool(httppool.get_pool_size())
+                httppool.install(_pool)
+
             url = cfg.get(option='url')
             user = cfg.get(option='user')
             passwd = cfg.pw_decode(cfg.get(option='password'), cfg.get(option='user'))
@@ -118,3 +128,6 @@ def disconnect_api():
     if _api:
         _api.disconnect()
         _api = None
+    if _pool is not None:
+        logger.log(logging.DEBUG, 'API connections: %s' % _pool.get_stats())
+        _pool.close()
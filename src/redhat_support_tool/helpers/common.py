@@ -26,16 +26,21 @@ from redhat_support_tool.helpers.confighelper import EmptyValueError, _
 import dateutil.parser as parser
 import dateutil.tz as tz
 import inspect
+import json
+import marshal
 import os
 import os.path
 import redhat_support_tool.helpers.apihelper as apihelper
 import redhat_support_tool.helpers.confighelper as confighelper
+import redhat_support_tool.helpers.diskcache as diskcache
 import re
 import logging
 import struct
 import sys
 import tempfile
 import textwrap
+import time
+import zlib
 
 # To support pagination/obtaining terminal sizes
 _terminfosupport = True
@@ -55,8 +60,33 @@ except:
 __author__ = 'Keith Robertson <kroberts@redhat.com>'
 _interactive = True
 _plugins = None
+_output_format = 'text'
 logger = logging.getLogger("redhat_support_tool.helpers.common")
 
+# The formats listings can be written in by non-interactive commands.
+OUTPUT_FORMATS = ('text', 'jsonl')
+
+# The directory in ~/.redhat-support-tool of cached reference data, the
+# version of its format and the most space it may take.
+REFERENCE_CACHE_DIR = 'reference_cache'
+REFERENCE_CACHE_FORMAT = '1'
+REFERENCE_CACHE_SIZE = 4 * 1024 * 1024
+
+# How many seconds each kind of reference data is cached for, unless the
+# reference_cache_ttl option is set.  Case groups are created by users, so
+# they're refreshed more often.
+REFERENCE_TTLS = {'products': 24 * 60 * 60,
+                  'versions': 24 * 60 * 60,
+                  'severities': 24 * 60 * 60,
+                  'types': 24 * 60 * 60,
+                  'statuses': 24 * 60 * 60,
+                  'groups': 60 * 60}
+
+# The reference data fetched or loaded by this process, keyed by cache key,
+# and the API's product objects, keyed by name, which fetch versions.
+_reference_data = {}
+_api_products = {}
+
 
 def is_interactive():
     '''
@@ -95,6 +125,52 @@ def get_plugin_dict():
     return _plugins
 
 
+def set_output_format(output_format):
+    '''
+    Set the format listings are written in, one of OUTPUT_FORMATS.
+    '''
+    global _output_format
+    _output_format = output_format
+
+
+def is_jsonl_output():
+    '''
+    Should listings be written as JSON Lines, one object per record, rather
+    than as text?  Only non-interactive commands write JSON Lines.
+    '''
+    return _output_format == 'jsonl' and not is_interactive()
+
+
+def get_record(obj, fields):
+    '''
+    Returns a dictionary of fields of an API model object, read with their
+    get_ methods.  A field the object has no get_ method for is None.
+    '''
+    record = {}
+    for field in fields:
+        getter = getattr(obj, 'get_%s' % field, None)
+        if getter:
+            record[field] = getter()
+        else:
+            record[field] = None
+    return record
+
+
+def _json_default(obj):
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    return unicode(obj)
+
+
+def write_jsonl(record):
+    '''
+    Writes a record to stdout as a line of JSON.  Non-ASCII characters are
+    escaped, so the line can be written whatever the output's encoding.
+    '''
+    sys.stdout.write(json.dumps(record, sort_keys=True,
+                                default=_json_default) + '\n')
+
+
 def iso8601tolocal(iso8601):
     '''
     Given an ISO8601 datetime, convert to local.
@@ -112,15 +188,144 @@ def iso8601tolocal(iso8601):
         return ''
 
 
+class CachedProduct(object):
+    '''
+    A product from the reference data cache.  Its versions are fetched,
+    and cached, when they're first asked for.
+    '''
+
+    def __init__(self, name):
+        self._name = name
+        self._versions = None
+
+    def get_name(self):
+        return self._name
+
+    def get_versions(self):
+        if self._versions is None:
+            self._versions = _get_reference_data(
+                        'versions', lambda: _fetch_versions(self._name),
+                        self._name)
+        return self._versions
+
+
+class CachedGroup(object):
+    '''
+    A case group from the reference data cache.
+    '''
+
+    def __init__(self, number, name):
+        self._number = number
+        self._name = name
+
+    def get_number(self):
+        return self._number
+
+    def get_name(self):
+        return self._name
+
+
+def get_reference_ttl(kind):
+    '''
+    Returns the number of seconds a kind of reference data is cached for,
+    the reference_cache_ttl option if it's set.  0 disables the cache.
+    '''
+    ttl = confighelper.get_config_helper().get(option='reference_cache_ttl')
+    try:
+        if ttl is None or ttl == '':
+            return REFERENCE_TTLS[kind]
+        return int(ttl)
+    except ValueError:
+        logger.log(logging.WARNING, 'Invalid reference_cache_ttl %s' % ttl)
+        return REFERENCE_TTLS[kind]
+
+
+def _get_reference_cache():
+    return diskcache.DiskCache(REFERENCE_CACHE_DIR, REFERENCE_CACHE_SIZE)
+
+
+def clear_reference_cache():
+    '''
+    Discards the cached reference data, so that it's fetched again when
+    it's next used.
+    '''
+    _reference_data.clear()
+    _api_products.clear()
+    _get_reference_cache().clear()
+
+
+def _get_reference_data(kind, fetch, *args):
+    '''
+    Returns a kind of reference data from memory, or from the disk cache,
+    if it's younger than the kind's TTL, otherwise it's fetched and cached.
+    Reference data differs between accounts, so it's cached for the API
+    URL and user.
+
+    Arguments:
+     kind  - The kind of reference data, one of REFERENCE_TTLS
+     fetch - A function returning the data from the API, as a list of
+             values which can be marshalled
+     args  - Strings identifying the data of the kind, such as a product
+    '''
+    ttl = get_reference_ttl(kind)
+    if not ttl:
+        return fetch()
+
+    cfg = confighelper.get_config_helper()
+    key = diskcache.make_key(REFERENCE_CACHE_FORMAT,
+                             str(cfg.get(option='url')),
+                             str(cfg.get(option='user')), kind, *args)
+    cache = _get_reference_cache()
+    entry = _reference_data.get(key)
+    if entry is None:
+        data = cache.get(key)
+        if data is not None:
+            try:
+                entry = marshal.loads(zlib.decompress(data))
+            # pylint: disable=W0703
+            except Exception, e:
+                logger.log(logging.DEBUG, 'Invalid %s cache entry: %s' %
+                           (kind, e))
+    if entry and 0 <= time.time() - entry[0] < ttl:
+        _reference_data[key] = entry
+        return list(entry[1])
+
+    logger.log(logging.DEBUG, 'Fetching %s %s' % (kind, ' '.join(args)))
+    entry = (time.time(), list(fetch()))
+    _reference_data[key] = entry
+    try:
+        cache.put(key, zlib.compress(marshal.dumps(entry)))
+    except ValueError, e:
+        logger.log(logging.DEBUG, 'Unable to cache %s: %s' % (kind, e))
+    return list(entry[1])
+
+
+def _fetch_products():
+    api = apihelper.get_api()
+    _api_products.clear()
+    names = []
+    for product in api.products.list():
+        _api_products[product.get_name()] = product
+        names.append(product.get_name())
+    return names
+
+
+def _fetch_versions(name):
+    if name not in _api_products:
+        _fetch_products()
+    if name not in _api_products:
+        return []
+    return _api_products[name].get_versions()
+
+
 def get_products():
     '''
-    A utility function to get the available products from the API.
+    A utility function to get the available products from the API, or from
+    the reference data cache.
     '''
-    api = None
     try:
-        api = apihelper.get_api()
-        productsAry = api.products.list()
-        return productsAry
+        return [CachedProduct(name)
+                for name in _get_reference_data('products', _fetch_products)]
     except EmptyValueError, eve:
         msg = _('ERROR: %s') % str(eve)
         print msg
@@ -170,13 +375,12 @@ def print_products(productsAry):
 
 def get_types():
     '''
-    A utility function to get the available type from the API.
+    A utility function to get the available type from the API, or from the
+    reference data cache.
     '''
-    api = None
     try:
-        api = apihelper.get_api()
-        typeAry = api.values.getType()
-        return typeAry
+        return _get_reference_data(
+                    'types', lambda: apihelper.get_api().values.getType())
     except EmptyValueError, eve:
         msg = _('ERROR: %s') % str(eve)
         print msg
@@ -214,14 +418,13 @@ def print_types(typesAry):
 
 def get_severities():
     '''
-    A utility function to get the available severities from the API.
+    A utility function to get the available severities from the API, or
+    from the reference data cache.
     '''
-    api = None
     try:
-        api = apihelper.get_api()
-        severitiesAry = api.values.getSeverity()
-        severitiesAry = severitiesAry[::-1]
-        return severitiesAry
+        return _get_reference_data(
+            'severities',
+            lambda: list(apihelper.get_api().values.getSeverity())[::-1])
     except EmptyValueError, eve:
         msg = _('ERROR: %s') % str(eve)
         print msg
@@ -261,13 +464,12 @@ def print_severities(severitiesAry):
 
 def get_statuses():
     '''
-    A utility function to get the available statuses from the API.
+    A utility function to get the available statuses from the API, or from
+    the reference data cache.
     '''
-    api = None
     try:
-        api = apihelper.get_api()
-        statusesAry = api.values.getStatus()
-        return statusesAry
+        return _get_reference_data(
+                    'statuses', lambda: apihelper.get_api().values.getStatus())
     except EmptyValueError, eve:
         msg = _('ERROR: %s') % str(eve)
         print msg
@@ -303,15 +505,20 @@ def print_statuses(statusesAry):
         raise
 
 
+def _fetch_groups():
+    return [(group.get_number(), group.get_name())
+            for group in apihelper.get_api().groups.list()]
+
+
 def get_groups():
     '''
-    A utility function to get the available groups from the API.
+    A utility function to get the available groups from the API, or from
+    the reference data cache.
     '''
-    api = None
     try:
-        api = apihelper.get_api()
-        groupsAry = api.groups.list()
-        return groupsAry
+        return [CachedGroup(number, name)
+                for number, name in _get_reference_data('groups',
+                                                        _fetch_groups)]
     except EmptyValueError, eve:
         msg = _('ERROR: %s') % str(eve)
         print msg
@@ -426,6 +633,14 @@ def do_help(clsobj):
         for line in output_wrapped:
             print line
 
+    if not is_interactive():
+        print
+        for line in textwrap.wrap(_('Listing commands write one JSON object '
+                                    'per line when preceded by --format '
+                                    'jsonl, e.g. --format jsonl listcases'),
+                                  termwidth):
+            print line
+
 
 def get_linecount(width, most=True, *args):
     longest_line = None
@@ -57,6 +57,15 @@ class ConfigHelper(object):
     DEFAULT_DEBUG = 'WARNING'
     DEFAULT_NOVERIFYSSL = False
     DEFAULT_KERN_DEBUG_DIR = '/var/lib/redhat-support-tool/debugkernels'
+    DEFAULT_ANALYZER_WINDOW_SIZE = 16 * 1024 * 1024
+    MIN_ANALYZER_WINDOW_SIZE = 64 * 1024
+    DEFAULT_ANALYZER_CACHE_SIZE = 64 * 1024 * 1024
+    DEFAULT_CRASH_CACHE_SIZE = 64 * 1024 * 1024
+    DEFAULT_DEBUGINFO_INDEX_TTL = 24 * 60 * 60
+    DEFAULT_KERN_DEBUG_MAX_SIZE = 0
+    DEFAULT_KERN_DEBUG_MAX_COUNT = 0
+    DEFAULT_PAGE_FETCH_JOBS = 4
+    DEFAULT_API_POOL_SIZE = 4
 
     def __init__(self):
         self.global_config = ConfigParser.SafeConfigParser()
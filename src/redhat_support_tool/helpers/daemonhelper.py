@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#           http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+'''
+A helper module for the optional redhat-support-tool session daemon.
+
+Running 'redhat-support-tool --daemon' starts a daemon listening on
+~/.redhat-support-tool/daemon.sock which keeps the configuration, plugins
+and API connection loaded.  While it is running, non-interactive
+invocations of redhat-support-tool forward their arguments and piped
+input to the daemon and print the output it streams back, instead of
+starting up from scratch.
+
+This module must only import from the standard library so that the
+forwarding client stays cheap.
+'''
+
+import base64
+import gettext
+import json
+import logging
+import os
+import pwd
+import socket
+import struct
+import sys
+
+__author__ = 'Keith Robertson <kroberts@redhat.com>'
+logger = logging.getLogger("redhat_support_tool.helpers.daemonhelper")
+# The same translations as confighelper's, without importing it.
+_ = gettext.translation('redhat-support-tool', fallback=True).ugettext
+
+SOCKET_NAME = 'daemon.sock'
+# Arguments which are always handled by the local process.
+LOCAL_ARGS = ['-h', '--help', '-v', '--version', '--daemon']
+
+# Every message is framed as a one byte kind and a four byte length.
+_FRAME_HDR = struct.Struct('!cI')
+_REQUEST = 'R'
+_STDOUT = 'O'
+_STDERR = 'E'
+_EXIT = 'X'
+
+
+def get_socket_path():
+    '''
+    Returns the path of the daemon socket in ~/.redhat-support-tool.
+    This deliberately avoids ConfigHelper, which parses the config files.
+    '''
+    pw = pwd.getpwuid(os.getuid())
+    return os.path.join(pw.pw_dir, '.redhat-support-tool', SOCKET_NAME)
+
+
+def _send_frame(sock, kind, data):
+    sock.sendall(_FRAME_HDR.pack(kind, len(data)) + data)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise EOFError(_('The session daemon closed the connection.'))
+        chunks.append(chunk)
+        size -= len(chunk)
+    return ''.join(chunks)
+
+
+def _recv_frame(sock):
+    kind, size = _FRAME_HDR.unpack(_recv_exact(sock, _FRAME_HDR.size))
+    return kind, _recv_exact(sock, size)
+
+
+def _connect():
+    '''
+    Returns a socket connected to the daemon or None if there isn't
+    one running.
+    '''
+    path = get_socket_path()
+    if not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except socket.error, e:
+        logger.log(logging.DEBUG, 'Unable to connect to %s: %s' % (path, e))
+        sock.close()
+        return None
+    return sock
+
+
+def forward_command(argv):
+    '''
+    Forward a non-interactive command to a running session daemon.
+
+    Arguments:
+     argv - The full command line, ie. sys.argv
+
+    Returns:
+     The exit status of the command, or None if the command should be run
+     locally because it is interactive or no daemon is running.
+    '''
+    if len(argv) < 2 or str(argv[1]).lower() in LOCAL_ARGS:
+        return None
+    sock = _connect()
+    if not sock:
+        return None
+
+    try:
+        data = None
+        if not sys.stdin.isatty():
+            data = sys.stdin.read()
+        # The arguments, input and directory are sent base64 encoded as
+        # they needn't be UTF-8, which JSON strings have to be.
+        if data is not None:
+            data = base64.b64encode(data)
+        request = {'argv': [base64.b64encode(arg) for arg in argv[1:]],
+                   'stdin': data,
+                   'cwd': base64.b64encode(os.getcwd()),
+                   'tty': sys.stdout.isatty()}
+        try:
+            _send_frame(sock, _REQUEST, json.dumps(request))
+
+            while True:
+                kind, data = _recv_frame(sock)
+                if kind == _STDOUT:
+                    sys.stdout.write(data)
+                    sys.stdout.flush()
+                elif kind == _STDERR:
+                    sys.stderr.write(data)
+                elif kind == _EXIT:
+                    return int(data)
+        except (EOFError, socket.error), e:
+            # The daemon died, or was stopped, while running the command.
+            # Logging isn't set up before a command is forwarded.
+            sys.stderr.write(_('ERROR: The session daemon did not complete '
+                               'the command: %s\n') % e)
+            return 1
+    finally:
+        sock.close()
+
+
+class _FrameWriter(object):
+    '''
+    A file-like object which sends everything written to it back to
+    the client as frames of the given kind.
+    '''
+    encoding = 'UTF-8'
+
+    def __init__(self, sock, kind, tty):
+        self.sock = sock
+        self.kind = kind
+        self.tty = tty
+
+    def write(self, data):
+        if isinstance(data, unicode):
+            data = data.encode('UTF-8', 'replace')
+        if data:
+            _send_frame(self.sock, self.kind, data)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return self.tty
+
+
+class _NoInput(object):
+    '''
+    Stands in for stdin while a forwarded command runs, so that any
+    prompt sees an end of file instead of reading the daemon's terminal.
+    '''
+    def read(self, size=-1):
+        return ''
+
+    def readline(self, size=-1):
+        return ''
+
+    def isatty(self):
+        return False
+
+
+class SessionDaemon(object):
+    '''
+    Serves forwarded commands one at a time over the daemon socket.
+    Commands are run sequentially because they share sys.argv, sys.stdout
+    and the other process-wide state used by the plugins.
+    '''
+
+    def __init__(self, run_command):
+        '''
+        Arguments:
+         run_command - A callable taking the command arguments (less the
+                       program name) and any piped input and returning
+                       the command's exit status.
+        '''
+        self.run_command = run_command
+        self.path = get_socket_path()
+
+    def serve_forever(self):
+        sock = _connect()
+        if sock:
+            sock.close()
+            msg = _('ERROR: A session daemon is already listening on %s') % \
+                    self.path
+            print msg
+            raise Exception(msg)
+        if os.path.exists(self.path):
+            # Left behind by a daemon which didn't shut down cleanly.
+            os.unlink(self.path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask_save = os.umask(0177)  # Set to 600
+        try:
+            server.bind(self.path)
+        finally:
+            os.umask(umask_save)
+        server.listen(5)
+        logger.log(logging.INFO, 'Session daemon listening on %s' % self.path)
+        print _('Session daemon listening on %s') % self.path
+
+        try:
+            while True:
+                conn = server.accept()[0]
+                try:
+                    self._handle(conn)
+                # pylint: disable=W0703
+                except Exception, e:
+                    logger.exception(e)
+                conn.close()
+        finally:
+            server.close()
+            os.unlink(self.path)
+
+    def _handle(self, conn):
+        kind, data = _recv_frame(conn)
+        if kind != _REQUEST:
+            return
+        request = json.loads(data)
+        args = [base64.b64decode(arg) for arg in request['argv']]
+        stdin_data = request['stdin']
+        if stdin_data is not None:
+            stdin_data = base64.b64decode(stdin_data)
+        cwd = base64.b64decode(request['cwd'])
+
+        saved = (sys.argv, sys.stdin, sys.stdout, sys.stderr, os.getcwd())
+        sys.argv = [sys.argv[0]] + args
+        sys.stdin = _NoInput()
+        sys.stdout = _FrameWriter(conn, _STDOUT, request['tty'])
+        sys.stderr = _FrameWriter(conn, _STDERR, request['tty'])
+        try:
+            os.chdir(cwd)
+            logger.log(logging.DEBUG, 'Running forwarded command %s' % args)
+            ret = self.run_command(args, stdin_data)
+        except SystemExit, e:
+            ret = e.code
+        # pylint: disable=W0703
+        except Exception, e:
+            logger.exception(e)
+            print _('ERROR: %s') % e
+            ret = 1
+        finally:
+            sys.argv, sys.stdin, sys.stdout, sys.stderr = saved[:4]
+            os.chdir(saved[4])
+
+        # Mirror what sys.exit() would have done with the return value.
+        if ret is None or ret == '' or ret == 0:
+            status = 0
+        elif isinstance(ret, int):
+            status = ret
+        else:
+            _send_frame(conn, _STDERR, '%s\n' % ret)
+            status = 1
+        _send_frame(conn, _EXIT, str(status))
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#           http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+'''
+A helper module providing a local index of the kernel debuginfo packages
+in the debug repositories, so that they can be searched without loading
+the repositories' metadata, or reaching them at all.
+'''
+import fnmatch
+import logging
+import marshal
+import redhat_support_tool.helpers.confighelper as confighelper
+import redhat_support_tool.helpers.diskcache as diskcache
+import re
+import time
+import zlib
+
+__author__ = 'Keith Robertson <kroberts@redhat.com>'
+logger = logging.getLogger("redhat_support_tool.helpers.debuginfoindex")
+
+# The DiskCache holding the indexes, the version of their format and the
+# most space they may take.
+INDEX_CACHE = 'debuginfo_index'
+INDEX_FORMAT = '1'
+INDEX_CACHE_SIZE = 16 * 1024 * 1024
+
+# The packages of the debug repositories which are indexed.
+INDEX_PATTERNS = ['kernel*debuginfo*']
+
+
+class IndexedPackage(object):
+    '''
+    The name, EVR, arch, size and repository of an indexed package, with
+    the attributes of a yum package object that are used to list it.
+    '''
+
+    def __init__(self, name, epoch, version, release, arch, repoid, size):
+        self.name = name
+        self.epoch = epoch
+        self.version = version
+        self.release = release
+        self.arch = arch
+        self.repoid = repoid
+        self.size = size
+        self.evr = '%s:%s-%s' % (epoch, version, release)
+        self.nvr = '%s-%s-%s' % (name, version, release)
+
+    def to_tuple(self):
+        return (self.name, self.epoch, self.version, self.release, self.arch,
+                self.repoid, self.size)
+
+    def matches(self, match):
+        '''
+        Returns True if match, the match method of a compiled pattern,
+        matches the package in any of the forms that yum matches package
+        names in.
+        '''
+        nvra = '%s.%s' % (self.nvr, self.arch)
+        for form in (self.name,
+                     '%s.%s' % (self.name, self.arch),
+                     '%s-%s' % (self.name, self.version),
+                     self.nvr,
+                     nvra,
+                     '%s:%s' % (self.epoch, nvra),
+                     '%s-%s:%s-%s.%s' % (self.name, self.epoch, self.version,
+                                         self.release, self.arch)):
+            if match(form):
+                return True
+        return False
+
+    def __str__(self):
+        if self.epoch and self.epoch != '0':
+            return '%s:%s.%s' % (self.epoch, self.nvr, self.arch)
+        return '%s.%s' % (self.nvr, self.arch)
+
+
+def get_ttl():
+    '''
+    Returns the number of seconds an index is used for before it's
+    rebuilt, from the debuginfo_index_ttl option.  0 disables the index.
+    '''
+    ttl = confighelper.get_config_helper().get(option='debuginfo_index_ttl')
+    try:
+        if ttl is None or ttl == '':
+            return confighelper.ConfigHelper.DEFAULT_DEBUGINFO_INDEX_TTL
+        return int(ttl)
+    except ValueError:
+        logger.log(logging.WARNING, 'Invalid debuginfo_index_ttl %s' % ttl)
+        return confighelper.ConfigHelper.DEFAULT_DEBUGINFO_INDEX_TTL
+
+
+class DebuginfoIndex(object):
+    '''
+    The index of the packages in the repositories enabled by a pattern,
+    such as *debug*.
+    '''
+
+    def __init__(self, repos):
+        '''
+        Arguments:
+         repos - The pattern of the repositories which are indexed
+        '''
+        self.cache = diskcache.DiskCache(INDEX_CACHE, INDEX_CACHE_SIZE)
+        self.key = diskcache.make_key(INDEX_FORMAT, repos)
+        self.created = None
+        self.repoids = []
+        self.packages = []
+        self._load()
+
+    def _load(self):
+        data = self.cache.get(self.key)
+        if data is None:
+            return
+        try:
+            self.created, self.repoids, packages = \
+                marshal.loads(zlib.decompress(data))
+            self.packages = [IndexedPackage(*fields) for fields in packages]
+        # pylint: disable=W0703
+        except Exception, e:
+            logger.log(logging.WARNING, 'Invalid debuginfo index %s: %s' %
+                       (self.key, e))
+            self.created = None
+            self.repoids = []
+            self.packages = []
+
+    def is_fresh(self):
+        '''
+        Returns True if the index is younger than its TTL.
+        '''
+        return (self.created is not None and
+                0 <= time.time() - self.created < get_ttl())
+
+    def update(self, repoids, packages):
+        '''
+        Replaces the index with the yum package objects of the repositories
+        and saves it.
+        '''
+        self.created = time.time()
+        self.repoids = list(repoids)
+        self.packages = [IndexedPackage(str(pkg.name), str(pkg.epoch),
+                                        str(pkg.version), str(pkg.release),
+                                        str(pkg.arch), str(pkg.repoid),
+                                        long(pkg.size or 0))
+                         for pkg in packages]
+        self.cache.put(self.key, zlib.compress(marshal.dumps(
+                        (self.created, self.repoids,
+                         [pkg.to_tuple() for pkg in self.packages]))))
+
+    def find(self, query):
+        '''
+        Returns the indexed packages matching query, a package name with
+        wildcards allowed, in the order they were indexed.
+        '''
+        match = re.compile(fnmatch.translate(query)).match
+        return [pkg for pkg in self.packages if pkg.matches(match)]
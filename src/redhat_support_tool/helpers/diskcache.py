@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#           http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+'''
+A helper module providing a size bounded, least recently used, cache of
+byte strings stored as files in a directory beneath ~/.redhat-support-tool.
+'''
+
+import logging
+import os
+import redhat_support_tool.helpers.confighelper as confighelper
+import tempfile
+try:
+    from hashlib import sha1
+except ImportError:
+    from sha import new as sha1
+
+__author__ = 'Keith Robertson <kroberts@redhat.com>'
+logger = logging.getLogger("redhat_support_tool.helpers.diskcache")
+
+
+def make_key(*parts):
+    '''
+    Returns a cache key made from the given strings.
+    '''
+    digest = sha1()
+    for part in parts:
+        if isinstance(part, unicode):
+            part = part.encode('utf-8')
+        digest.update('%d:%s' % (len(part), part))
+    return digest.hexdigest()
+
+
+class DiskCache(object):
+    '''
+    Each entry is stored in its own file, named after its key, and the
+    file's modification time records when it was last used.  Whenever an
+    entry is added, the least recently used entries are removed until the
+    cache fits in max_size bytes.  A max_size of 0 disables the cache.
+
+    Entries are written to a temporary file and renamed into place, so
+    concurrent readers never see a partial entry.
+    '''
+
+    def __init__(self, name, max_size):
+        '''
+        Arguments:
+         name     - The name of the cache's directory in
+                    ~/.redhat-support-tool
+         max_size - The maximum total size of the entries in bytes
+        '''
+        self.dirname = os.path.join(confighelper.get_config_helper().dotdir,
+                                    name)
+        self.max_size = max_size
+
+    def _get_path(self, key):
+        return os.path.join(self.dirname, key)
+
+    def get(self, key):
+        '''
+        Returns the data stored for key, or None.
+        '''
+        if not self.max_size:
+            return None
+        path = self._get_path(key)
+        try:
+            entry = open(path, 'rb')
+            try:
+                data = entry.read()
+            finally:
+                entry.close()
+            os.utime(path, None)
+            return data
+        except (IOError, OSError):
+            return None
+
+    def put(self, key, data):
+        '''
+        Store data for key, then evict entries until the cache fits.
+        '''
+        if not self.max_size or len(data) > self.max_size:
+            return
+        try:
+            if not os.path.isdir(self.dirname):
+                os.makedirs(self.dirname, 0700)
+            fd, tmppath = tempfile.mkstemp(prefix='.', dir=self.dirname)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+            os.rename(tmppath, self._get_path(key))
+            self.evict()
+        except (IOError, OSError), e:
+            logger.log(logging.WARNING, 'Unable to write to %s: %s' %
+                       (self.dirname, e))
+
+    def invalidate(self, key):
+        '''
+        Remove the entry for key, if there is one.
+        '''
+        try:
+            os.unlink(self._get_path(key))
+        except OSError:
+            pass
+
+    def clear(self):
+        '''
+        Remove every entry.
+        '''
+        for key, size, mtime in self._get_entries():
+            self.invalidate(key)
+
+    def _get_entries(self):
+        entries = []
+        try:
+            names = os.listdir(self.dirname)
+        except OSError:
+            return entries
+        for name in names:
+            if name.startswith('.'):
+                continue
+            try:
+                st = os.stat(self._get_path(name))
+            except OSError:
+                continue
+            entries.append((name, st.st_size, st.st_mtime))
+        return entries
+
+    def evict(self):
+        '''
+        Remove the least recently used entries until the cache fits in
+        max_size bytes.
+        '''
+        entries = self._get_entries()
+        total = sum([size for key, size, mtime in entries])
+        if total <= self.max_size:
+            return
+        entries.sort(key=lambda entry: entry[2])
+        for key, size, mtime in entries:
+            if total <= self.max_size:
+                break
+            logger.log(logging.DEBUG, 'Evicting %s from %s' %
+                       (key, self.dirname))
+            self.invalidate(key)
+            total -= size
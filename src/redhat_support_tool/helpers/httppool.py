@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#           http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+'''
+A helper module providing a pool of kept alive HTTP and HTTPS connections,
+so that the requests a command makes to the API reuse the connection, and
+TLS session, of the requests before them rather than each opening its own.
+
+The pool works beneath redhat_support_lib: install() replaces the httplib
+connection classes the library's modules use with subclasses which take
+their socket from the pool when they connect, and give it back when
+they're closed after a complete response, instead of closing it.
+'''
+import httplib
+import inspect
+import logging
+import redhat_support_tool.helpers.confighelper as confighelper
+import select
+import socket
+import sys
+import threading
+import time
+import types
+
+__author__ = 'Keith Robertson <kroberts@redhat.com>'
+logger = logging.getLogger("redhat_support_tool.helpers.httppool")
+
+# How long an idle connection is kept for.  Servers close idle keep-alive
+# connections after a while, reusing one they've closed fails.
+IDLE_TIMEOUT = 30
+
+
+def get_pool_size():
+    '''
+    Returns the most idle connections kept for each host, from the
+    api_pool_size option.  0 disables the pool.
+    '''
+    size = confighelper.get_config_helper().get(option='api_pool_size')
+    try:
+        if size is None or size == '':
+            return confighelper.ConfigHelper.DEFAULT_API_POOL_SIZE
+        return int(size)
+    except ValueError:
+        logger.log(logging.WARNING, 'Invalid api_pool_size %s' % size)
+        return confighelper.ConfigHelper.DEFAULT_API_POOL_SIZE
+
+
+class ConnectionPool(object):
+    '''
+    The idle, connected, sockets of each host, and counts of the
+    connections opened, the connections reused and the sockets discarded.
+    The pool is shared by the threads fetching pages of results, so it's
+    locked.
+    '''
+
+    def __init__(self, max_idle, idle_timeout=IDLE_TIMEOUT):
+        '''
+        Arguments:
+         max_idle     - The most idle sockets kept for each host
+         idle_timeout - The number of seconds a socket is kept idle for
+        '''
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.opened = 0
+        self.reused = 0
+        self.discarded = 0
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _is_alive(self, sock):
+        # An idle socket the server has closed, or sent anything on, is
+        # readable.
+        try:
+            return not select.select([sock], [], [], 0)[0]
+        except (select.error, ValueError):
+            return False
+
+    def checkout(self, key):
+        '''
+        Returns an idle socket connected to the host identified by key, or
+        None if there isn't one.
+        '''
+        now = time.time()
+        self._lock.acquire()
+        try:
+            idle = self._idle.get(key, [])
+            while idle:
+                sock, since = idle.pop()
+                if now - since < self.idle_timeout and self._is_alive(sock):
+                    self.reused += 1
+                    logger.log(logging.DEBUG, 'Reusing a connection to %s:%s '
+                               '(%s)' % (key[1], key[2], self.get_stats()))
+                    return sock
+                self.discarded += 1
+                _close_socket(sock)
+            return None
+        finally:
+            self._lock.release()
+
+    def checkin(self, key, sock):
+        '''
+        Keeps a socket whose request is complete for the next request to
+        the host identified by key, or closes it if the host has enough
+        idle sockets.
+        '''
+        self._lock.acquire()
+        try:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append((sock, time.time()))
+                return
+            self.discarded += 1
+        finally:
+            self._lock.release()
+        _close_socket(sock)
+
+    def opened_connection(self, key):
+        self._lock.acquire()
+        try:
+            self.opened += 1
+            logger.log(logging.DEBUG, 'Opened a connection to %s:%s (%s)' %
+                       (key[1], key[2], self.get_stats()))
+        finally:
+            self._lock.release()
+
+    def get_stats(self):
+        '''
+        Returns a description of the pool's counts.
+        '''
+        return 'opened %d, reused %d, idle %d, discarded %d' % \
+            (self.opened, self.reused,
+             sum([len(idle) for idle in self._idle.values()]),
+             self.discarded)
+
+    def close(self):
+        '''
+        Closes every idle socket.
+        '''
+        self._lock.acquire()
+        try:
+            for idle in self._idle.values():
+                for sock, since in idle:
+                    _close_socket(sock)
+            self._idle = {}
+        finally:
+            self._lock.release()
+
+
+def _close_socket(sock):
+    try:
+        sock.close()
+    except (IOError, OSError):
+        pass
+
+
+class PooledConnectionMixin:
+    '''
+    Mixed into an httplib connection class by install().  The pool is an
+    attribute of the class that's made.
+    '''
+    pool = None
+    # Whether the socket came from the pool, the last request made with
+    # request(), which is sent again if the pooled socket turns out to be
+    # closed, and the response to it if the server is keeping the
+    # connection alive.
+    _pool_reused = False
+    _pool_request = None
+    _pool_response = None
+
+    def _get_pool_key(self):
+        # Connections tunnelled through a proxy are pooled per proxy and
+        # destination.
+        return (self.__class__.__name__, self.host, self.port,
+                getattr(self, '_tunnel_host', None),
+                getattr(self, '_tunnel_port', None))
+
+    def _connect_new(self):
+        self._pool_reused = False
+        self._pooled_base.connect(self)
+        self.pool.opened_connection(self._get_pool_key())
+
+    def connect(self):
+        sock = self.pool.checkout(self._get_pool_key())
+        if sock is None:
+            self._connect_new()
+            return
+        # The socket still has the timeout of the connection that opened
+        # it.
+        timeout = self.timeout
+        if timeout is socket._GLOBAL_DEFAULT_TIMEOUT:
+            timeout = socket.getdefaulttimeout()
+        sock.settimeout(timeout)
+        self.sock = sock
+        self._pool_reused = True
+
+    def _can_retry(self, e):
+        # The server may close an idle connection just as it's reused.  A
+        # timeout though means the request reached a slow server.
+        return (self._pool_reused and self._pool_request is not None and
+                not isinstance(e, socket.timeout))
+
+    def _retry_request(self, e):
+        logger.log(logging.DEBUG, 'A reused connection to %s:%s failed, '
+                   'retrying on a new one: %s' % (self.host, self.port, e))
+        self._pooled_base.close(self)
+        self._connect_new()
+        self._pooled_base.request(self, *self._pool_request)
+
+    def putrequest(self, *args, **kwargs):
+        self._pool_response = None
+        return self._pooled_base.putrequest(self, *args, **kwargs)
+
+    def request(self, method, url, body=None, headers={}):
+        # A body read from a file can't be sent again.
+        if body is None or isinstance(body, basestring):
+            self._pool_request = (method, url, body, headers)
+        else:
+            self._pool_request = None
+        try:
+            self._pooled_base.request(self, method, url, body, headers)
+        except socket.error, e:
+            if not self._can_retry(e):
+                raise
+            self._retry_request(e)
+
+    def getresponse(self, *args, **kwargs):
+        try:
+            response = self._pooled_base.getresponse(self, *args, **kwargs)
+        except (httplib.BadStatusLine, socket.error), e:
+            # Nothing of a response arrived on the reused socket.
+            if not self._can_retry(e):
+                raise
+            self._retry_request(e)
+            response = self._pooled_base.getresponse(self, *args, **kwargs)
+        if not response.will_close:
+            self._pool_response = response
+        return response
+
+    def close(self):
+        # The socket can be used for another request only if a response
+        # was received on it, the server is keeping it alive, and the
+        # response has been read to its end.  Otherwise, say after a
+        # timeout, the rest of a response may still be on its way.
+        response = self._pool_response
+        self._pool_response = None
+        if self.sock is not None and response is not None and \
+           response.isclosed() and \
+           self._HTTPConnection__state == httplib._CS_IDLE:
+            sock = self.sock
+            self.sock = None
+            self._pooled_base.close(self)
+            self.pool.checkin(self._get_pool_key(), sock)
+        else:
+            self._pooled_base.close(self)
+
+
+def make_pooled_class(cls, pool):
+    '''
+    Returns a subclass of an httplib connection class whose connections
+    are kept alive in pool.
+    '''
+    # httplib's classes are classic classes, so the subclass is made with
+    # a class statement rather than type().
+    class PooledConnection(PooledConnectionMixin, cls):
+        pass
+    PooledConnection.__name__ = cls.__name__
+    PooledConnection.__module__ = cls.__module__
+    PooledConnection.pool = pool
+    PooledConnection._pooled_base = cls
+    return PooledConnection
+
+
+def _make_pooled_httplib(pool, pooled):
+    '''
+    Returns a copy of the httplib module whose connection classes are
+    pooled, for modules which use httplib.HTTPSConnection and the like.
+    '''
+    module = types.ModuleType(httplib.__name__, httplib.__doc__)
+    module.__dict__.update(vars(httplib))
+    for attr, value in vars(httplib).items():
+        if inspect.isclass(value) and \
+           issubclass(value, httplib.HTTPConnection):
+            if value not in pooled:
+                pooled[value] = make_pooled_class(value, pool)
+            setattr(module, attr, pooled[value])
+    return module
+
+
+def install(pool, prefix='redhat_support_lib'):
+    '''
+    Replaces the httplib connection classes, and their subclasses, bound
+    in the loaded modules whose names start with prefix with pooled
+    subclasses, so that the connections they make afterwards use pool.
+    httplib itself is left alone, it's used by urllib2 and yum too.
+
+    Returns:
+     The number of classes and modules replaced.
+    '''
+    pooled = {}
+    pooled_httplib = None
+    replaced = 0
+    for name, module in sys.modules.items():
+        if module is None or not (name == prefix or
+                                  name.startswith(prefix + '.')):
+            continue
+        for attr, value in vars(module).items():
+            if value is httplib:
+                if pooled_httplib is None:
+                    pooled_httplib = _make_pooled_httplib(pool, pooled)
+                setattr(module, attr, pooled_httplib)
+                replaced += 1
+                continue
+            if not inspect.isclass(value) or \
+               not issubclass(value, httplib.HTTPConnection) or \
+               issubclass(value, PooledConnectionMixin):
+                continue
+            if value not in pooled:
+                pooled[value] = make_pooled_class(value, pool)
+            setattr(module, attr, pooled[value])
+            replaced += 1
+    if not replaced:
+        logger.log(logging.DEBUG, 'No connection classes to pool in %s' %
+                   prefix)
+    return replaced
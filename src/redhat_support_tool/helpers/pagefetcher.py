@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#           http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+'''
+A helper module which fetches the pages of a paginated API query ahead of
+the code consuming them, in background threads.
+'''
+from collections import deque
+import logging
+import redhat_support_tool.helpers.confighelper as confighelper
+import sys
+import threading
+
+__author__ = 'Keith Robertson <kroberts@redhat.com>'
+logger = logging.getLogger("redhat_support_tool.helpers.pagefetcher")
+
+
+def get_jobs():
+    '''
+    Returns the number of pages fetched at once in non-interactive mode,
+    from the page_fetch_jobs option.
+    '''
+    jobs = confighelper.get_config_helper().get(option='page_fetch_jobs')
+    try:
+        if jobs is None or jobs == '':
+            return confighelper.ConfigHelper.DEFAULT_PAGE_FETCH_JOBS
+        return max(int(jobs), 1)
+    except ValueError:
+        logger.log(logging.WARNING, 'Invalid page_fetch_jobs %s' % jobs)
+        return confighelper.ConfigHelper.DEFAULT_PAGE_FETCH_JOBS
+
+
+class _Page(threading.Thread):
+    '''
+    A page being fetched.  Its results, or the exception raised fetching
+    it, are kept until the page is consumed.
+    '''
+
+    def __init__(self, fetch, offset, count):
+        threading.Thread.__init__(self, name='page-%d' % offset)
+        # A page nobody waits for mustn't keep the process alive.
+        self.setDaemon(True)
+        self.fetch = fetch
+        self.offset = offset
+        self.count = count
+        self.results = None
+        self.exc_info = None
+
+    def run(self):
+        try:
+            self.results = self.fetch(self.offset, self.count)
+        # pylint: disable=W0702
+        except:
+            self.exc_info = sys.exc_info()
+
+
+class PageFetcher(object):
+    '''
+    Keeps up to jobs pages of a query in flight ahead of the consumer,
+    who gets them in order from next_page.  Pages are requested until one
+    comes back short, or max_offset is reached.
+    '''
+
+    def __init__(self, fetch, offset, page_size, max_offset, jobs=1):
+        '''
+        Arguments:
+         fetch      - A function of (offset, count) returning a page's list
+                      of results
+         offset     - The offset of the first page to fetch
+         page_size  - The most results a page is asked for
+         max_offset - The offset no page goes beyond
+         jobs       - The number of pages fetched at once
+        '''
+        self._fetch = fetch
+        self._offset = offset
+        self._page_size = page_size
+        self._max_offset = max_offset
+        self._jobs = max(jobs, 1)
+        self._pages = deque()
+        self._ended = page_size <= 0
+        self._fill()
+
+    def _fill(self):
+        while (not self._ended and len(self._pages) < self._jobs and
+               self._offset < self._max_offset):
+            count = min(self._page_size, self._max_offset - self._offset)
+            logger.log(logging.DEBUG, 'Fetching %d results from %d' %
+                       (count, self._offset))
+            page = _Page(self._fetch, self._offset, count)
+            page.start()
+            self._pages.append(page)
+            self._offset += count
+
+    def next_page(self):
+        '''
+        Returns the results of the next page, waiting for them if they're
+        still being fetched, or an empty list once there are no more.  An
+        exception raised fetching the page is raised here.
+        '''
+        if not self._pages:
+            return []
+        page = self._pages.popleft()
+        page.join()
+        if page.exc_info:
+            self.close()
+            raise page.exc_info[0], page.exc_info[1], page.exc_info[2]
+        if not page.results or len(page.results) < page.count:
+            # The pages after a short one are empty.
+            self.close()
+        else:
+            self._fill()
+        return page.results or []
+
+    def close(self):
+        '''
+        Stops requesting pages.  Pages already requested are discarded.
+        '''
+        self._ended = True
+        self._pages.clear()
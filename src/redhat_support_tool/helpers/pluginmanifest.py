@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#           http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+'''
+A helper module which maintains a manifest of the commands provided by
+the redhat-support-tool plug-ins.
+
+The manifest maps each command name to the module and class which
+implement it, so that only the plug-in for the command being run needs
+to be imported.  It is stored in
+~/.redhat-support-tool/plugin_manifest.conf and is rebuilt whenever the
+modification times of the plug-in or vendor plug-in directories change.
+'''
+
+from redhat_support_tool.helpers.confighelper import _
+import ConfigParser
+import inspect
+import logging
+import os
+import pkgutil
+import redhat_support_tool.helpers.confighelper as confighelper
+import redhat_support_tool.plugins
+import redhat_support_tool.vendors
+import sys
+
+__author__ = 'Keith Robertson <kroberts@redhat.com>'
+logger = logging.getLogger("redhat_support_tool.helpers.pluginmanifest")
+
+MANIFEST_FILE = 'plugin_manifest.conf'
+_MTIME_SECTION = 'mtimes'
+_COMMAND_SECTION = 'commands'
+
+
+class LazyPluginDict(dict):
+    '''
+    A dictionary of command names to plug-in classes.  Entries are
+    stored as (module name, class name) tuples and the plug-in module
+    is only imported the first time its class is looked up.
+    '''
+
+    def __getitem__(self, name):
+        value = dict.__getitem__(self, name)
+        if isinstance(value, tuple):
+            logger.log(logging.DEBUG, "Importing %s for command %s" %
+                       (value[0], name))
+            __import__(value[0])
+            value = getattr(sys.modules[value[0]], value[1])
+            dict.__setitem__(self, name, value)
+        return value
+
+    def get(self, name, default=None):
+        if name in self:
+            return self[name]
+        return default
+
+    def values(self):
+        return [self[name] for name in self.keys()]
+
+    def items(self):
+        return [(name, self[name]) for name in self.keys()]
+
+    def itervalues(self):
+        for name in self.keys():
+            yield self[name]
+
+    def iteritems(self):
+        for name in self.keys():
+            yield (name, self[name])
+
+
+def _get_watched_dirs():
+    '''
+    Returns the plug-in directory, the vendor directory and every vendor
+    package directory beneath it.
+    '''
+    dirs = [redhat_support_tool.plugins.__path__[0]]
+    for vendor_dir in redhat_support_tool.vendors.__path__:
+        dirs.append(vendor_dir)
+        if not os.path.isdir(vendor_dir):
+            continue
+        for loc in os.listdir(vendor_dir):
+            loc = os.path.join(vendor_dir, loc)
+            if (os.path.isdir(loc) and
+                os.path.exists(os.path.join(loc, '__init__.py'))):
+                dirs.append(loc)
+    return dirs
+
+
+def _get_dir_mtimes():
+    '''
+    Returns a dictionary of watched directory to a signature made up of
+    the number of python source files in it and their newest modification
+    time.  The directory's own mtime is not used as it changes whenever
+    python writes out compiled .pyc files.
+    '''
+    mtimes = {}
+    for dirname in _get_watched_dirs():
+        try:
+            count = 0
+            newest = 0
+            for filename in os.listdir(dirname):
+                if filename.endswith('.py'):
+                    count += 1
+                    newest = max(newest, os.stat(
+                                 os.path.join(dirname, filename)).st_mtime)
+            mtimes[dirname] = '%d:%r' % (count, newest)
+        except OSError, e:
+            logger.log(logging.DEBUG, e)
+    return mtimes
+
+
+def _init_vendor_packages():
+    vendor_packages = []
+    vendor_plugins = []
+    vendor_ignorelist = []
+
+    # pkgutil.walk_packages is only in 2.6+ (maybe 2.5, but we don't use
+    # python 2.5)
+    # The problem is, for 2.4 (RHEL 5) plugins are forced to be in the
+    # same locations, 2.6+ we allow far more acceptable locations, which
+    # is anywhere defined in sys.path/PYTHONPATH=
+    if sys.version_info[:2] >= (2, 6):
+        for pkg in pkgutil.walk_packages(
+                            redhat_support_tool.vendors.__path__,
+                            redhat_support_tool.vendors.__name__ + '.'):
+            # pkg = (pkgutil object, package name, is a package?)
+            if pkg[2]:
+                vendor_packages.append(pkg[1])
+    else:
+        vendor_dir = redhat_support_tool.vendors.__path__[0]
+        for loc in os.listdir(vendor_dir):
+            if (os.path.isdir(os.path.join(vendor_dir, loc)) and
+                os.path.exists(os.path.join(vendor_dir, loc,
+                                            '__init__.py'))):
+                vendor_packages.append('redhat_support_tool.vendors.%s' %
+                                       loc)
+
+    for package in vendor_packages:
+        try:
+            __import__(package)
+            mod = sys.modules[package]
+            if hasattr(mod, 'provided_modules'):
+                vendor_plugins.extend(mod.provided_modules)
+            if hasattr(mod, 'ignored_modules'):
+                vendor_ignorelist.extend(mod.ignored_modules)
+        except AttributeError:
+            logger.error(_('Vendor plugin %s was not loaded due to missing'
+                           ' metadata'), package)
+        except ImportError:
+            logger.error(_('Unable to load vendor plugin %s,'
+                           ' skipping...'), package)
+    logger.log(31, "vendor_plugins(%s)" % (vendor_plugins))
+    logger.log(31, "vendor_ignorelist(%s)" % (vendor_ignorelist))
+    return vendor_plugins, vendor_ignorelist
+
+
+def build_manifest():
+    '''
+    Import every plug-in module and record the command name, module and
+    class of each plug-in that it provides.
+
+    Returns:
+     A dictionary of command name to (module name, class name)
+    '''
+    manifest = {}
+
+    package = redhat_support_tool.plugins
+    prefix = package.__name__ + "."
+    modnames = []
+    for filename in os.listdir(package.__path__[0]):
+        if ((filename.endswith('.py') or filename.endswith('.pyc')) and
+            filename.rsplit('.', 1)[0] != '__init__'):
+            modnames.append(prefix + filename.rsplit('.', 1)[0])
+
+    # Filter functions for vendor overrides and plugins
+    vendor_plugins, ignore_list = _init_vendor_packages()
+    modnames = list(set(modnames) - set(ignore_list))
+    modnames.extend(vendor_plugins)
+    logger.debug(modnames)
+
+    for modname in modnames:
+        logger.log(31, "Found submodule %s" % (modname))
+        __import__(modname)
+        mod = sys.modules[modname]
+        objectAry = inspect.getmembers(mod, inspect.isclass)
+        for o in objectAry:
+            if (issubclass(o[1], redhat_support_tool.plugins.Plugin) and
+                (o[0] != 'InteractivePlugin' and o[0] != 'Plugin') and
+                not issubclass(o[1],
+                               redhat_support_tool.plugins.HiddenCommand) and
+                o[1].__module__ not in ignore_list):
+                logger.log(31, "Adding import %s to"
+                           " plugin manifest" % o[0])
+                manifest[o[1].get_name()] = (o[1].__module__,
+                                             o[1].__name__)
+    return manifest
+
+
+def _get_manifest_path():
+    return os.path.join(confighelper.get_config_helper().dotdir,
+                        MANIFEST_FILE)
+
+
+def _new_parser():
+    parser = ConfigParser.RawConfigParser()
+    # Option names are paths and command names; keep them case sensitive.
+    parser.optionxform = str
+    return parser
+
+
+def _load_manifest(mtimes):
+    '''
+    Returns the stored manifest, or None if it is missing, unreadable or
+    was built from plug-in directories with different modification times.
+    '''
+    parser = _new_parser()
+    try:
+        if not parser.read(_get_manifest_path()):
+            return None
+        if dict(parser.items(_MTIME_SECTION)) != mtimes:
+            logger.log(logging.DEBUG, 'Plugin manifest is out of date')
+            return None
+        manifest = {}
+        for name, value in parser.items(_COMMAND_SECTION):
+            modname, clsname = value.rsplit(':', 1)
+            manifest[name] = (modname, clsname)
+        return manifest
+    # pylint: disable=W0703
+    except Exception, e:
+        logger.log(logging.DEBUG, 'Unable to read plugin manifest: %s' % e)
+        return None
+
+
+def _save_manifest(manifest, mtimes):
+    parser = _new_parser()
+    parser.add_section(_MTIME_SECTION)
+    for dirname, mtime in mtimes.items():
+        parser.set(_MTIME_SECTION, dirname, mtime)
+    parser.add_section(_COMMAND_SECTION)
+    for name, (modname, clsname) in manifest.items():
+        parser.set(_COMMAND_SECTION, name, '%s:%s' % (modname, clsname))
+    try:
+        manifestfile = open(_get_manifest_path(), 'wb')
+        try:
+            parser.write(manifestfile)
+        finally:
+            manifestfile.close()
+    # pylint: disable=W0703
+    except Exception, e:
+        logger.log(logging.WARNING, 'Unable to save plugin manifest: %s' % e)
+
+
+def get_plugin_dict():
+    '''
+    A helper method to get the dictionary of available commands.  The
+    manifest is rebuilt first if the plug-in directories have changed.
+
+    Returns:
+     A LazyPluginDict of command name to plug-in class
+    '''
+    mtimes = _get_dir_mtimes()
+    manifest = _load_manifest(mtimes)
+    if manifest is None:
+        manifest = build_manifest()
+        _save_manifest(manifest, mtimes)
+    return LazyPluginDict(manifest)
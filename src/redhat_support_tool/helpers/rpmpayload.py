@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+
+#
+# Copyright (c) 2012 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#           http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+'''
+A helper module which reads the cpio payload of an RPM package as a
+stream, so that a single file can be extracted from it without rpm2cpio,
+cpio or a temporary directory.
+'''
+from redhat_support_tool.helpers.confighelper import _
+import bz2
+import logging
+import os
+import signal
+import struct
+import subprocess
+import tempfile
+import zlib
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+__author__ = 'Keith Robertson <kroberts@redhat.com>'
+logger = logging.getLogger("redhat_support_tool.helpers.rpmpayload")
+
+RPM_LEAD_SIZE = 96
+RPM_LEAD_MAGIC = '\xed\xab\xee\xdb'
+RPM_HEADER_MAGIC = '\x8e\xad\xe8\x01'
+# magic, reserved, index entry count and data size
+RPM_HEADER = struct.Struct('>4s4sII')
+RPM_INDEX_ENTRY_SIZE = 16
+
+CPIO_MAGICS = ('070701', '070702')
+CPIO_HEADER_SIZE = 110
+CPIO_TRAILER = 'TRAILER!!!'
+
+# How much compressed payload is decompressed at a time.
+READ_SIZE = 1024 * 1024
+
+# The payload compressors, recognized by their magic, and the commands used
+# to decompress them when there's no python module for it.
+GZIP_MAGIC = '\x1f\x8b'
+BZIP2_MAGIC = 'BZh'
+XZ_MAGIC = '\xfd7zXZ\x00'
+LZMA_MAGIC = '\x5d\x00\x00'
+ZSTD_MAGIC = '\x28\xb5\x2f\xfd'
+DECOMPRESS_COMMANDS = {'xz': ['xz', '-dc'],
+                       'lzma': ['xz', '--format=lzma', '-dc'],
+                       'zstd': ['zstd', '-dc']}
+
+
+class PayloadError(Exception):
+    def __init__(self, msg):
+        Exception.__init__(self, msg)
+
+
+class PayloadStream(object):
+    '''
+    A file-like reader of the decompressed payload.  Data is decompressed
+    as it's read, either by a decompressor object or, for formats python
+    has no module for, by a command whose output is the source.
+    '''
+
+    def __init__(self, source, decompressor=None, proc=None):
+        '''
+        Arguments:
+         source       - The file to read the payload from
+         decompressor - An object whose decompress method decompresses
+                        what's read from source, or None if source is
+                        already decompressed
+         proc         - The decompressing process whose output is source
+        '''
+        self._source = source
+        self._decompressor = decompressor
+        self._proc = proc
+        self._buffer = ''
+        self._offset = 0
+        self._eof = False
+
+    def _fill(self):
+        '''
+        Adds more decompressed data to the buffer.  Returns False at the
+        end of the payload.
+        '''
+        while not self._eof:
+            data = self._source.read(READ_SIZE)
+            if not data:
+                self._eof = True
+                break
+            if self._decompressor:
+                data = self._decompressor.decompress(data)
+                if not data:
+                    continue
+            self._buffer = self._buffer[self._offset:] + data
+            self._offset = 0
+            return True
+        return False
+
+    def read(self, size):
+        '''
+        Returns the next size bytes of the payload, or fewer at its end.
+        '''
+        while len(self._buffer) - self._offset < size and self._fill():
+            pass
+        data = self._buffer[self._offset:self._offset + size]
+        self._offset += len(data)
+        return data
+
+    def skip(self, size):
+        '''
+        Discards the next size bytes of the payload.  Returns the number of
+        bytes skipped, which is less than size at its end.
+        '''
+        skipped = 0
+        while skipped < size:
+            available = len(self._buffer) - self._offset
+            if not available:
+                if not self._fill():
+                    break
+                continue
+            count = min(available, size - skipped)
+            self._offset += count
+            skipped += count
+        return skipped
+
+    def close(self):
+        self._source.close()
+        if self._proc:
+            # The rest of the payload isn't wanted.
+            if self._proc.poll() is None:
+                try:
+                    os.kill(self._proc.pid, signal.SIGTERM)
+                except OSError:
+                    pass
+            self._proc.wait()
+
+
+def _get_payload_offset(rpmfile, filename):
+    '''
+    Returns the offset of the payload in an RPM file, after the lead, the
+    signature header, which is padded to 8 bytes, and the header.
+    '''
+    lead = rpmfile.read(RPM_LEAD_SIZE)
+    if len(lead) < RPM_LEAD_SIZE or lead[:4] != RPM_LEAD_MAGIC:
+        raise PayloadError(_('%s is not an RPM package.') % filename)
+    offset = RPM_LEAD_SIZE
+    for padded in (True, False):
+        rpmfile.seek(offset)
+        header = rpmfile.read(RPM_HEADER.size)
+        if len(header) < RPM_HEADER.size:
+            raise PayloadError(_('%s is truncated.') % filename)
+        magic, reserved, count, size = RPM_HEADER.unpack(header)
+        if magic != RPM_HEADER_MAGIC:
+            raise PayloadError(_('%s has an invalid header.') % filename)
+        offset += RPM_HEADER.size + count * RPM_INDEX_ENTRY_SIZE + size
+        if padded:
+            offset += (8 - offset % 8) % 8
+    return offset
+
+
+def open_payload(filename):
+    '''
+    Returns a PayloadStream of the decompressed cpio payload of an RPM
+    package, compressed with gzip, bzip2, xz, lzma or zstd.
+    '''
+    rpmfile = open(filename, 'rb', 0)
+    try:
+        offset = _get_payload_offset(rpmfile, filename)
+        rpmfile.seek(offset)
+        magic = rpmfile.read(6)
+        rpmfile.seek(offset)
+
+        if magic.startswith(GZIP_MAGIC):
+            return PayloadStream(rpmfile,
+                                 zlib.decompressobj(16 + zlib.MAX_WBITS))
+        if magic.startswith(BZIP2_MAGIC):
+            return PayloadStream(rpmfile, bz2.BZ2Decompressor())
+        if magic.startswith(XZ_MAGIC):
+            compressor = 'xz'
+        elif magic.startswith(ZSTD_MAGIC):
+            compressor = 'zstd'
+        elif magic.startswith(LZMA_MAGIC):
+            compressor = 'lzma'
+        elif magic[:6] in CPIO_MAGICS:
+            return PayloadStream(rpmfile)
+        else:
+            raise PayloadError(_('The payload of %s is compressed in an '
+                                 'unknown format.') % filename)
+
+        if compressor in ('xz', 'lzma') and lzma:
+            return PayloadStream(rpmfile, lzma.LZMADecompressor())
+        if compressor == 'zstd' and zstandard:
+            return PayloadStream(
+                        rpmfile, zstandard.ZstdDecompressor().decompressobj())
+
+        # The command reads the payload straight from the package, rpmfile
+        # is unbuffered so its offset is the payload's.
+        cmd = DECOMPRESS_COMMANDS[compressor]
+        logger.log(logging.DEBUG, 'Decompressing the payload of %s with %s'
+                   % (filename, ' '.join(cmd)))
+        try:
+            proc = subprocess.Popen(cmd, stdin=rpmfile,
+                                    stdout=subprocess.PIPE)
+        except OSError, e:
+            raise PayloadError(_('Unable to run %s to decompress %s: %s') %
+                               (cmd[0], filename, e))
+        rpmfile.close()
+        return PayloadStream(proc.stdout, proc=proc)
+    # pylint: disable=W0702
+    except:
+        rpmfile.close()
+        raise
+
+
+class CpioReader(object):
+    '''
+    Reads the entries of a "newc" cpio archive from a stream.
+    '''
+
+    def __init__(self, stream):
+        self._stream = stream
+        # The unread data, and the data and padding, of the current entry.
+        self._size = 0
+        self._remaining = 0
+
+    def _read(self, size):
+        data = self._stream.read(size)
+        if len(data) < size:
+            raise PayloadError(_('The cpio archive is truncated.'))
+        return data
+
+    def next_entry(self):
+        '''
+        Skips the rest of the current entry and returns the name, mode and
+        size of the next, or None at the end of the archive.
+        '''
+        if self._stream.skip(self._remaining) < self._remaining:
+            raise PayloadError(_('The cpio archive is truncated.'))
+        self._remaining = 0
+
+        header = self._read(CPIO_HEADER_SIZE)
+        if header[:6] not in CPIO_MAGICS:
+            raise PayloadError(_('The cpio archive has an unsupported '
+                                 'format.'))
+        try:
+            mode = int(header[14:22], 16)
+            size = int(header[54:62], 16)
+            namesize = int(header[94:102], 16)
+        except ValueError:
+            raise PayloadError(_('The cpio archive has an invalid header.'))
+        name = self._read(namesize).rstrip('\0')
+        self._stream.skip((4 - (CPIO_HEADER_SIZE + namesize) % 4) % 4)
+        if name == CPIO_TRAILER:
+            return None
+        self._remaining = size + (4 - size % 4) % 4
+        self._size = size
+        return name, mode, size
+
+    def copy_entry(self, dest):
+        '''
+        Writes the data of the current entry to the file dest.
+        '''
+        left = self._size
+        while left:
+            data = self._stream.read(min(left, READ_SIZE))
+            if not data:
+                raise PayloadError(_('The cpio archive is truncated.'))
+            dest.write(data)
+            left -= len(data)
+            self._remaining -= len(data)
+        self._size = 0
+
+
+def extract_file(filename, member, dest):
+    '''
+    Extracts a file from the payload of an RPM package to dest.  The file
+    is written to a temporary file beside dest and renamed into place once
+    it's complete, so dest is never partially written.
+
+    Arguments:
+     filename - The RPM package
+     member   - The path of the file in the package, such as
+                ./usr/lib/debug/lib/modules/2.6.32-431.el6.x86_64/vmlinux
+     dest     - The path to extract the file to
+
+    Returns:
+     dest
+    '''
+    member = './' + member.lstrip('./')
+    stream = open_payload(filename)
+    try:
+        reader = CpioReader(stream)
+        while True:
+            entry = reader.next_entry()
+            if entry is None:
+                raise PayloadError(_('%s is not in %s.') % (member, filename))
+            name, mode, size = entry
+            if './' + name.lstrip('./') == member:
+                break
+
+        logger.log(logging.DEBUG, 'Extracting %s (%d bytes) from %s to %s' %
+                   (member, size, filename, dest))
+        fd, tmppath = tempfile.mkstemp(prefix='.' + os.path.basename(dest),
+                                       dir=os.path.dirname(dest))
+        try:
+            destfile = os.fdopen(fd, 'wb')
+            try:
+                reader.copy_entry(destfile)
+            finally:
+                destfile.close()
+            os.chmod(tmppath, mode & 0777)
+            os.rename(tmppath, dest)
+        # pylint: disable=W0702
+        except:
+            os.unlink(tmppath)
+            raise
+    finally:
+        stream.close()
+    return dest
@@ -16,114 +16,143 @@
 # limitations under the License.
 #
 from redhat_support_tool.helpers.confighelper import _
-import redhat_support_tool.helpers.analyzer as analyzer
+import redhat_support_tool.helpers.confighelper as confighelper
+import redhat_support_tool.helpers.diskcache as diskcache
+import binascii
+import errno
 import fnmatch
 import logging
+import mmap
 import os
+import pty
 import rpm
+import shutil
 import struct
 import subprocess
 import tempfile
+import time
+import zlib
+try:
+    import multiprocessing
+except ImportError:
+    # python 2.4 and 2.5
+    multiprocessing = None
 
 __author__ = 'Rex White <rexwhite@redhat.com>'
 __author__ = 'Keith Robertson <kroberts@redhat.com>'
 logger = logging.getLogger("redhat_support_tool.helpers.vmcorehelper")
 
+# The name of the index of vmlinux files in the debug symbol cache directory.
+VMLINUX_INDEX = '.vmlinux-index'
+
+# The file beside each vmlinux file in the debug symbol cache directory
+# whose modification time records when the vmlinux was last used.
+VMLINUX_LAST_USED = '.last-used'
+
+# The directory in ~/.redhat-support-tool of cached crash output, the
+# version of its format, and how much of the start of a vmcore goes into
+# its identity.
+CRASH_CACHE_DIR = 'crash_cache'
+CRASH_CACHE_FORMAT = '1'
+IDENTITY_HEADER_SIZE = 64 * 1024
+
+# The ELF identification, which is the same for every ELF class:
+# magic, class, data encoding, version, OS ABI and ABI version.
+ELF_IDENT = struct.Struct('4sBBBBB7x')
+
+# The rest of the ELF header and the section header layouts, keyed by
+# ELF class (1 for 32-bit, 2 for 64-bit) and data encoding (1 for little
+# endian, 2 for big endian).
+ELF_LAYOUTS = {}
+for _elfclass, _hdr, _sect in ((1, 'HHIIIIIHHHHHH', 'IIIIIIIIII'),
+                               (2, 'HHIQQQIHHHHHH', 'IIQQQQIIQQ')):
+    for _encoding, _endianness in ((1, '<'), (2, '>')):
+        ELF_LAYOUTS[(_elfclass, _encoding)] = \
+            (struct.Struct(_endianness + _hdr),
+             struct.Struct(_endianness + _sect))
+del _elfclass, _hdr, _sect, _encoding, _endianness
+
+# The program header layouts, keyed like ELF_LAYOUTS, with the indexes of
+# p_offset and p_filesz, which 64-bit program headers put after p_flags.
+PT_NOTE = 4
+ELF_PROG_LAYOUTS = {}
+for _encoding, _endianness in ((1, '<'), (2, '>')):
+    ELF_PROG_LAYOUTS[(1, _encoding)] = \
+        (struct.Struct(_endianness + 'IIIIIIII'), 1, 4)
+    ELF_PROG_LAYOUTS[(2, _encoding)] = \
+        (struct.Struct(_endianness + 'IIQQQQQQ'), 2, 5)
+del _encoding, _endianness
+
+# Note headers, namesz, descsz and type, keyed by data encoding.
+ELF_NOTE_LAYOUTS = {1: struct.Struct('<III'), 2: struct.Struct('>III')}
+
 
 class VMLinux(object):
     '''
     The VMLinux class represents a vmlinux file and is primarily intended
     for use as a means to extract the kernel version from a vmlinux kernel
     debug symbol file.
+
+    The file is mapped into memory and its headers are unpacked in place
+    with precompiled struct layouts, so only the pages holding the ELF
+    header, the section headers, the section names and the version banner
+    are ever read.
     '''
     version = None
     filename = None
 
+    # The name of the section holding the kernel's version banner, and the
+    # offset and maximum length of the banner within it.
+    RODATA = '.rodata\0'
+    BANNER_OFFSET = 32
+    BANNER_SIZE = 192
+
     class ELFHeader(object):
 
-        def __init__(self, vmlinux_file):
+        def __init__(self, vmlinux_map, filename):
             '''
-            Constructor for ELFHeader.  Takes a file object for the vmlinux
-            file as an argument
+            Constructor for ELFHeader.  Takes a buffer holding the
+            vmlinux file, and its name for error messages, as arguments
             '''
-            # read the ELF header from the vmlinux file...
-            # verify ELF "magic number" file signature
-            self.elfHdr_magic = vmlinux_file.read(4)
-            if self.elfHdr_magic != "\x7fELF":
+            if (len(vmlinux_map) < ELF_IDENT.size or
+                vmlinux_map[:4] != "\x7fELF"):
                 # ELF "magic number" file signature invalid: not a valid ELF
                 # file
-                msg = _('ERROR: %s is an invalid ELF file!.')
+                msg = _('ERROR: %s is an invalid ELF file!.') % filename
                 print msg
                 logger.log(logging.ERROR, msg)
                 raise Exception(msg)
 
-            # read rest of ELF identification stuff...
+            (self.elfHdr_magic, self.elfHdr_class, self.elfHdr_encoding,
+             self.elfHdr_identVersion, self.elfHdr_OSABI,
+             self.elfHdr_ABIVersion) = ELF_IDENT.unpack_from(vmlinux_map, 0)
 
-            self.elfHdr_class = vmlinux_file.read(1)
-
-            # determine "endian-ness" of file and set up converters
-            self.elfHdr_encoding = vmlinux_file.read(1)
-            if self.elfHdr_encoding == '\x01':
-                # little endian...
-                self.endianness = '<'
-            elif self.elfHdr_encoding == '\x02':
-                # big endian...
-                self.endianness = '>'
-            else:
-                msg = _('ERROR: %s has an unrecognized byte encoding.')
+            layouts = ELF_LAYOUTS.get((self.elfHdr_class,
+                                       self.elfHdr_encoding))
+            if not layouts:
+                msg = _('ERROR: %s has an unrecognized ELF class or byte '
+                        'encoding.') % filename
                 print msg
                 logger.log(logging.ERROR, msg)
                 raise Exception(msg)
+            self.hdr_layout, self.sect_layout = layouts
 
-#            VMLinux.Elf64_Half = struct.Struct(endianness + 'H')
-#            VMLinux.Elf64_Word = struct.Struct(endianness + 'I')
-#            VMLinux.Elf64_Long = struct.Struct(endianness + 'Q')
-
-            self.elfHdr_version = vmlinux_file.read(1)
-            self.elfHdr_OSABI = vmlinux_file.read(1)
-            self.elfHdr_ABIVersion = vmlinux_file.read(1)
-            self.elfHdr_padding = vmlinux_file.read(7)
-
-            # read rest of ELF header...
-            self.elfHdr_ObjType = \
-                struct.unpack(self.endianness + 'H',
-                                          vmlinux_file.read(2))[0]
-            self.elfHdr_MachineType = \
-                struct.unpack(self.endianness + 'H',
-                                          vmlinux_file.read(2))[0]
-            self.elfHdr_version = \
-                struct.unpack(self.endianness + 'I',
-                                          vmlinux_file.read(4))[0]
-            self.elfHdr_entry = \
-                struct.unpack(self.endianness + 'Q', vmlinux_file.read(8))[0]
-            self.elfHdr_ProgHdrOff = \
-                struct.unpack(self.endianness + 'Q', vmlinux_file.read(8))[0]
-            self.elfHdr_SectHdrOff = \
-                struct.unpack(self.endianness + 'Q', vmlinux_file.read(8))[0]
-            self.elfHdr_flags = \
-                struct.unpack(self.endianness + 'I',
-                                          vmlinux_file.read(4))[0]
-            self.elfHdr_HdrSize = \
-                struct.unpack(self.endianness + 'H',
-                                          vmlinux_file.read(2))[0]
-            self.elfHdr_ProgHdrEntSize = \
-                struct.unpack(self.endianness + 'H',
-                                          vmlinux_file.read(2))[0]
-            self.elfHdr_ProgHdrEntCount = \
-                struct.unpack(self.endianness + 'H',
-                                          vmlinux_file.read(2))[0]
-            self.elfHdr_SectHdrEntSize = \
-                struct.unpack(self.endianness + 'H',
-                                          vmlinux_file.read(2))[0]
-            self.elfHdr_SectHdrEntCount = \
-                struct.unpack(self.endianness + 'H',
-                                          vmlinux_file.read(2))[0]
-            self.elfHdr_SectNameStrTableIdx = \
-                struct.unpack(self.endianness + 'H',
-                                          vmlinux_file.read(2))[0]
+            if len(vmlinux_map) < ELF_IDENT.size + self.hdr_layout.size:
+                msg = _('ERROR: %s is an invalid ELF file!.') % filename
+                print msg
+                logger.log(logging.ERROR, msg)
+                raise Exception(msg)
+            (self.elfHdr_ObjType, self.elfHdr_MachineType,
+             self.elfHdr_version, self.elfHdr_entry, self.elfHdr_ProgHdrOff,
+             self.elfHdr_SectHdrOff, self.elfHdr_flags, self.elfHdr_HdrSize,
+             self.elfHdr_ProgHdrEntSize, self.elfHdr_ProgHdrEntCount,
+             self.elfHdr_SectHdrEntSize, self.elfHdr_SectHdrEntCount,
+             self.elfHdr_SectNameStrTableIdx) = \
+                self.hdr_layout.unpack_from(vmlinux_map, ELF_IDENT.size)
 
         def __str__(self):
-            result = "encoding:" + repr(self.elfHdr_encoding)
+            result = "class:" + str(self.elfHdr_class)
+            result += "\nencoding:" + str(self.elfHdr_encoding)
             result += "\nObject type: " + str(self.elfHdr_ObjType)
             result += "\nMachine type: " + str(self.elfHdr_MachineType)
             result += "\nVersion: " + str(self.elfHdr_version)
@@ -147,110 +176,117 @@ class VMLinux(object):
 
     class ELFSectionHdr(object):
 
-        def __init__(self, vmlinux_file, elf_hdr):
-
-            # read section table entry from file
-            self.sect_name = struct.unpack(elf_hdr.endianness + 'I',
-                                                       vmlinux_file.read(4))[0]
-            self.sect_type = struct.unpack(elf_hdr.endianness + 'I',
-                                                       vmlinux_file.read(4))[0]
-            self.sect_flags = \
-                struct.unpack(elf_hdr.endianness + 'Q',
-                              vmlinux_file.read(8))[0]
-            self.sect_address = \
-                struct.unpack(elf_hdr.endianness + 'Q',
-                              vmlinux_file.read(8))[0]
-            self.sect_offset = \
-                struct.unpack(elf_hdr.endianness + 'Q',
-                              vmlinux_file.read(8))[0]
-            self.sect_size = struct.unpack(elf_hdr.endianness + 'Q',
-                                           vmlinux_file.read(8))[0]
-            self.sect_link = struct.unpack(elf_hdr.endianness + 'I',
-                                           vmlinux_file.read(4))[0]
-            self.sect_info = struct.unpack(elf_hdr.endianness + 'I',
-                                           vmlinux_file.read(4))[0]
-            self.sect_align = \
-                struct.unpack(elf_hdr.endianness + 'Q',
-                              vmlinux_file.read(8))[0]
-            self.sect_entrySize = \
-                struct.unpack(elf_hdr.endianness + 'Q',
-                              vmlinux_file.read(8))[0]
-
-            # skip any leftover stuff at the end of this segment header
-            vmlinux_file.seek(elf_hdr.elfHdr_SectHdrEntSize - 64, 1)
+        def __init__(self, vmlinux_map, offset, elf_hdr):
+            '''
+            Constructor for ELFSectionHdr.  Takes a buffer holding the
+            vmlinux file, the offset of the section header within it and
+            the file's ELFHeader as arguments
+            '''
+            (self.sect_name, self.sect_type, self.sect_flags,
+             self.sect_address, self.sect_offset, self.sect_size,
+             self.sect_link, self.sect_info, self.sect_align,
+             self.sect_entrySize) = \
+                elf_hdr.sect_layout.unpack_from(vmlinux_map, offset)
 
         def __str__(self):
             result = "Section name: " + str(self.sect_name)
             result += "\nSection type: " + str(self.sect_type)
             result += "\nSection flags: " + str(self.sect_flags)
-            result += "\nSection address: {0:x}".format(self.sect_address)
-            result += "\nSection offset: {0:x}".format(self.sect_offset)
-            result += "\nSection size: {0:x}".format(self.sect_size)
+            result += "\nSection address: %x" % self.sect_address
+            result += "\nSection offset: %x" % self.sect_offset
+            result += "\nSection size: %x" % self.sect_size
             result += "\nSection link: " + str(self.sect_link)
             result += "\nSection info: " + str(self.sect_info)
-            result += "\nSection aligment: {0:x}".format(self.sect_align)
-            result += "\nSection entry size: {0:x}".format(self.sect_entrySize)
+            result += "\nSection aligment: %x" % self.sect_align
+            result += "\nSection entry size: %x" % self.sect_entrySize
 
             return result
 
-    def __init__(self, filename):
+    def __init__(self, filename, version=None):
         '''
         Constructor for VMLinux.  Takes the filename of a vmlinux file
-        as an argument
+        as an argument, and optionally its already known kernel version,
+        in which case the file isn't parsed.
         '''
         self.filename = filename
+        if version:
+            self.version = version
+            return
 
-        # open file
         vmlinux = open(filename, 'rb')
+        try:
+            try:
+                vmlinux_map = mmap.mmap(vmlinux.fileno(), 0,
+                                        access=mmap.ACCESS_READ)
+            except (EnvironmentError, ValueError), e:
+                # Empty files can't be mapped.
+                msg = _('ERROR: %s is an invalid ELF file!.') % filename
+                print msg
+                logger.log(logging.ERROR, '%s %s' % (msg, e))
+                raise Exception(msg)
+            try:
+                self._parse(vmlinux_map)
+            finally:
+                vmlinux_map.close()
+        finally:
+            vmlinux.close()
 
-        # read ELF header from file
-        hdr = self.ELFHeader(vmlinux)
+    def _parse(self, vmlinux_map):
+        hdr = self.ELFHeader(vmlinux_map, self.filename)
 #        logger.log(logging.DEBUG, str(hdr))
 
-        # read ELF section headers
-        vmlinux.seek(hdr.elfHdr_SectHdrOff, 0)
-        sections = []
-        for i in range(hdr.elfHdr_SectHdrEntCount):
-            sections.append(self.ELFSectionHdr(vmlinux, hdr))
-#            logger.log(logging.DEBUG, str(i))
-
-        # read the section name string table from the indicated section
-        string_sect = sections[hdr.elfHdr_SectNameStrTableIdx]
-        vmlinux.seek(string_sect.sect_offset, 0)
-
-        # WARNING!!  This can blow up, so do something clever...
-        strings = vmlinux.read(string_sect.sect_size)
-
-        # find the offset for ".rodata"
-        ro_offset = strings.find(".rodata", 1)
-        if ro_offset == -1:
-            msg = _('ERROR: There is no segment named .rodata in %s') % \
-                filename
+        # Make sure the section header table is within the file.
+        count = hdr.elfHdr_SectHdrEntCount
+        entsize = hdr.elfHdr_SectHdrEntSize
+        if (entsize < hdr.sect_layout.size or
+            hdr.elfHdr_SectNameStrTableIdx >= count or
+            hdr.elfHdr_SectHdrOff + count * entsize > len(vmlinux_map)):
+            msg = _('ERROR: %s is an invalid ELF file!.') % self.filename
             print msg
             logger.log(logging.ERROR, msg)
             raise Exception(msg)
 
-        # now find the .rodata section...
-#        print "\nSearching for .rodata section..."
-        for i in range(len(sections)):
-            if sections[i].sect_name == ro_offset:
-#                print ".rodata is segment number {0:d}".format(i)
+        # Only the section name string table's header is needed to look up
+        # the other sections' names.
+        string_sect = self.ELFSectionHdr(
+                        vmlinux_map,
+                        hdr.elfHdr_SectHdrOff +
+                        hdr.elfHdr_SectNameStrTableIdx * entsize, hdr)
+
+        # now find the .rodata section by comparing each section's name,
+        # in place, with ".rodata".
+        for offset in xrange(hdr.elfHdr_SectHdrOff,
+                             hdr.elfHdr_SectHdrOff + count * entsize,
+                             entsize):
+            sect = self.ELFSectionHdr(vmlinux_map, offset, hdr)
+            if sect.sect_name >= string_sect.sect_size:
+                continue
+            name_offset = string_sect.sect_offset + sect.sect_name
+            if (vmlinux_map[name_offset:name_offset + len(self.RODATA)] !=
+                self.RODATA):
+                continue
 
-                # now grab the first 192 bytes of the string starting at byte
-                # 32 of this section...
-                vmlinux.seek(sections[i].sect_offset + 32, 0)
-                id_string = vmlinux.read(192).split()
+            # now grab the first 192 bytes of the string starting at byte
+            # 32 of this section...
+            start = sect.sect_offset + self.BANNER_OFFSET
+            id_string = vmlinux_map[start:start + self.BANNER_SIZE].split()
 
-                # validate string
+            # validate string
+            logger.log(logging.DEBUG,
+                       '%s id string is %s' % (self.filename, id_string))
+            if (len(id_string) > 2 and id_string[0] == 'Linux' and
+                id_string[1] == 'version'):
                 logger.log(logging.DEBUG,
-                           '%s id string is %s' % (filename,
-                                                   id_string))
-                if id_string[0] == 'Linux':
-                    if id_string[1] == 'version':
-                        logger.log(logging.DEBUG,
-                                   '%s version is %s' % (filename,
-                                                         id_string[2]))
-                        self.version = str(id_string[2]).strip()
+                           '%s version is %s' % (self.filename,
+                                                 id_string[2]))
+                self.version = str(id_string[2]).strip()
+            return
+
+        msg = _('ERROR: There is no segment named .rodata in %s') % \
+            self.filename
+        print msg
+        logger.log(logging.ERROR, msg)
+        raise Exception(msg)
 
     def get_version(self):
         '''
@@ -262,6 +298,225 @@ class VMLinux(object):
         return self.filename
 
 
+# vmcore formats are recognized by their first bytes.  kdump compressed
+# vmcores start with a disk_dump_header, and flattened ones, which
+# makedumpfile -F writes to be piped over the network, with a
+# makedumpfile_header followed by a sequence of (offset, size, data)
+# records which rearrange into an ELF or kdump compressed vmcore.
+KDUMP_SIGNATURES = ('KDUMP   ', 'DISKDUMP')
+FLAT_SIGNATURE = 'makedumpfile\0'
+FLAT_HEADER_SIZE = 4096
+FLAT_RECORD = struct.Struct('>qq')
+
+# The start of a disk_dump_header: signature, header_version and the
+# utsname's sysname, nodename, release, version and machine.
+KDUMP_HEADER = struct.Struct('8s4s65s65s65s65s65s')
+# The offset of block_size in a 64-bit disk_dump_header, and the offsets of
+# offset_vmcoreinfo and size_vmcoreinfo in a 64-bit kdump_sub_header, which
+# starts at the second block.
+KDUMP_BLOCK_SIZE_OFFSET = 428
+KDUMP_VMCOREINFO_OFFSET = 32
+
+# The limits on how much of a vmcore is read to find its OSRELEASE.
+MAX_NOTES_SIZE = 1024 * 1024
+MAX_VMCOREINFO_SIZE = 64 * 1024
+MAX_FLAT_RECORDS = 4096
+
+
+class FlattenedReader(object):
+    '''
+    Reads a flattened vmcore as though it had been rearranged.  Records
+    are only scanned as far as is needed to cover what's read, and no
+    further than MAX_FLAT_RECORDS, as the headers are written first.
+    '''
+
+    def __init__(self, vmcore_file):
+        self._file = vmcore_file
+        self._records = []
+        self._next = FLAT_HEADER_SIZE
+        self._done = False
+
+    def _scan(self):
+        '''
+        Reads the next record's header.  Returns False at the end of the
+        records.
+        '''
+        if self._done or len(self._records) >= MAX_FLAT_RECORDS:
+            return False
+        self._file.seek(self._next)
+        data = self._file.read(FLAT_RECORD.size)
+        if len(data) < FLAT_RECORD.size:
+            self._done = True
+            return False
+        offset, size = FLAT_RECORD.unpack(data)
+        if offset < 0 or size <= 0:
+            self._done = True
+            return False
+        self._records.append((offset, size, self._next + FLAT_RECORD.size))
+        self._next += FLAT_RECORD.size + size
+        return True
+
+    def _get_pieces(self, offset, end):
+        pieces = [(max(start, offset), min(start + size, end),
+                   data_offset + max(start, offset) - start)
+                  for start, size, data_offset in self._records
+                  if start < end and start + size > offset]
+        pieces.sort()
+        covered = offset
+        for start, stop, data_offset in pieces:
+            if start > covered:
+                break
+            covered = max(covered, stop)
+        return pieces, covered
+
+    def read(self, offset, size):
+        end = offset + size
+        pieces, covered = self._get_pieces(offset, end)
+        while covered < end and self._scan():
+            start, length, data_offset = self._records[-1]
+            if start < end and start + length > covered:
+                pieces, covered = self._get_pieces(offset, end)
+        data = []
+        for start, stop, data_offset in pieces:
+            if start > offset:
+                break
+            if stop <= offset:
+                continue
+            self._file.seek(data_offset + offset - start)
+            data.append(self._file.read(stop - offset))
+            offset = stop
+        return ''.join(data)
+
+
+class FileReader(object):
+    '''
+    Reads a vmcore which isn't flattened.
+    '''
+
+    def __init__(self, vmcore_file):
+        self._file = vmcore_file
+
+    def read(self, offset, size):
+        self._file.seek(offset)
+        return self._file.read(size)
+
+
+def _vmcoreinfo_osrelease(vmcoreinfo):
+    '''
+    Returns the OSRELEASE in the text of a VMCOREINFO, or None.
+    '''
+    for line in vmcoreinfo.split('\n'):
+        if line.startswith('OSRELEASE='):
+            return line[len('OSRELEASE='):].strip('\0 \t\r') or None
+    return None
+
+
+def _elf_osrelease(reader):
+    '''
+    Returns the OSRELEASE in the VMCOREINFO note of an ELF vmcore, or None.
+    '''
+    ident = reader.read(0, ELF_IDENT.size)
+    if len(ident) < ELF_IDENT.size:
+        return None
+    magic, elfclass, encoding = ELF_IDENT.unpack(ident)[:3]
+    if (elfclass, encoding) not in ELF_LAYOUTS:
+        return None
+    hdr_layout = ELF_LAYOUTS[(elfclass, encoding)][0]
+    prog_layout, offset_index, filesz_index = \
+        ELF_PROG_LAYOUTS[(elfclass, encoding)]
+    hdr = reader.read(ELF_IDENT.size, hdr_layout.size)
+    if len(hdr) < hdr_layout.size:
+        return None
+    hdr = hdr_layout.unpack(hdr)
+    phoff, phentsize, phnum = hdr[4], hdr[8], hdr[9]
+    if phentsize < prog_layout.size:
+        return None
+    progs = reader.read(phoff, phentsize * phnum)
+    note_layout = ELF_NOTE_LAYOUTS[encoding]
+
+    for prog_offset in xrange(0, len(progs) - prog_layout.size + 1,
+                              phentsize):
+        prog = prog_layout.unpack_from(progs, prog_offset)
+        if prog[0] != PT_NOTE:
+            continue
+        notes = reader.read(prog[offset_index],
+                            min(prog[filesz_index], MAX_NOTES_SIZE))
+        pos = 0
+        while pos + note_layout.size <= len(notes):
+            namesz, descsz, notetype = note_layout.unpack_from(notes, pos)
+            pos += note_layout.size
+            name = notes[pos:pos + namesz].rstrip('\0')
+            pos += (namesz + 3) & ~3
+            if name == 'VMCOREINFO':
+                return _vmcoreinfo_osrelease(notes[pos:pos + descsz])
+            pos += (descsz + 3) & ~3
+    return None
+
+
+def _kdump_osrelease(reader):
+    '''
+    Returns the OSRELEASE of a kdump compressed vmcore.  It's read from
+    the VMCOREINFO that 64-bit vmcores of header version 3 or later carry,
+    or else from the utsname in the header.
+    '''
+    header = reader.read(0, KDUMP_HEADER.size)
+    if len(header) < KDUMP_HEADER.size:
+        return None
+    (signature, raw_version, sysname, nodename, release,
+     version, machine) = KDUMP_HEADER.unpack(header)
+    release = release.split('\0', 1)[0].strip() or None
+    machine = machine.split('\0', 1)[0]
+
+    # The header is in the byte order of the machine that was dumped.
+    endianness = '<'
+    header_version = struct.unpack('<i', raw_version)[0]
+    if not 0 < header_version < 0x10000:
+        endianness = '>'
+        header_version = struct.unpack('>i', raw_version)[0]
+    if header_version < 3 or not (machine.endswith('64') or
+                                  machine == 's390x'):
+        return release
+
+    block_size = reader.read(KDUMP_BLOCK_SIZE_OFFSET, 4)
+    if len(block_size) < 4:
+        return release
+    block_size = struct.unpack(endianness + 'i', block_size)[0]
+    if block_size < KDUMP_HEADER.size or block_size & (block_size - 1):
+        return release
+    location = reader.read(block_size + KDUMP_VMCOREINFO_OFFSET, 16)
+    if len(location) < 16:
+        return release
+    offset, size = struct.unpack(endianness + 'qQ', location)
+    if offset <= 0 or not 0 < size <= MAX_VMCOREINFO_SIZE:
+        return release
+    return _vmcoreinfo_osrelease(reader.read(offset, size)) or release
+
+
+def get_vmcore_osrelease(filename):
+    '''
+    A utility function which returns the OSRELEASE (kernel version) of an
+    ELF, kdump compressed or flattened vmcore, read from its headers, or
+    None if it isn't one of those.
+    '''
+    vmcore = open(filename, 'rb')
+    try:
+        reader = FileReader(vmcore)
+        if reader.read(0, len(FLAT_SIGNATURE)) == FLAT_SIGNATURE:
+            logger.log(logging.DEBUG, '%s is a flattened vmcore' % filename)
+            reader = FlattenedReader(vmcore)
+        signature = reader.read(0, 8)
+        if signature in KDUMP_SIGNATURES:
+            logger.log(logging.DEBUG, '%s is a kdump compressed vmcore' %
+                       filename)
+            return _kdump_osrelease(reader)
+        if signature[:4] == '\x7fELF':
+            logger.log(logging.DEBUG, '%s is an ELF vmcore' % filename)
+            return _elf_osrelease(reader)
+        return None
+    finally:
+        vmcore.close()
+
+
 class VMCore(object):
     '''
     The VMCore class represents a vmcore file, from which we can extract a
@@ -270,6 +525,8 @@ class VMCore(object):
     coreFilename = None
     kernelVersion = None
     vmlinux = None
+    crashSession = None
+    coreIdentity = None
 
     def __init__(self, filename):
         '''
@@ -298,31 +555,32 @@ class VMCore(object):
         getKernelVersion() extracts and returns the OSRELEASE (kernel version)
         string from the target core file
         '''
-        # determine vmcore osrelease
-        # get crash to do the heavy lifting for us
+        # read it from the vmcore's headers
+        try:
+            version = get_vmcore_osrelease(self.coreFilename)
+        except (IOError, struct.error), e:
+            logger.log(logging.DEBUG, 'Unable to read the headers of %s: %s' %
+                       (self.coreFilename, e))
+            version = None
+        if version:
+            logger.log(logging.DEBUG,
+                       'Detected kernel version of %s is %s' %
+                       (self.coreFilename, version))
+            return version
+
+        # get crash to do the heavy lifting for formats we don't know
         try:
             proc = subprocess.Popen(["crash", "--osrelease", self.coreFilename],
                                     stdout=subprocess.PIPE,
                                     stderr=subprocess.PIPE)
             stdout, stderr = proc.communicate()
-            if proc.returncode == 0:
+            if proc.returncode == 0 and str(stdout).strip():
                 logger.log(logging.DEBUG,
                            'Detected kernel version of %s is %s' %
                            (self.coreFilename, str(stdout).strip()))
                 return  str(stdout).strip()
             else:
-                p1 = subprocess.Popen(["strings", self.coreFilename],
-                                        stdout=subprocess.PIPE)
-                for line in iter(p1.stdout.readline, ''):
-                    if 'el' in line:
-                        p1.stdout.close()
-                        logger.log(logging.DEBUG,
-                                   'Detected kernel version of %s is %s' %
-                                   (self.coreFilename, str(line).strip()))
-                        return  str(line).strip()
-
                 # Not found
-                p1.stdout.close()
                 msg = _('Unable to determine vmcore kernel version of ' +
                         self.coreFilename + ': ')
                 if not stderr:
@@ -349,84 +607,490 @@ class VMCore(object):
         A setter function for attaching a VMLinux to this VMCore.  A valid
         VMLinux is a pre-requisite to any BT work.
         '''
+        self.close_crash_session()
         self.vmlinux = vmlinux
 
     def getDebugSymbols(self):
         return self.vmlinux
 
-    def exe_crash_commands(self, commands=None):
+    def get_crash_session(self):
+        '''
+        Returns the CrashSession for this vmcore and its VMLinux, starting
+        crash if it isn't already running.
+        '''
+        if not self.crashSession:
+            self.crashSession = CrashSession(self.coreFilename,
+                                             self.vmlinux.get_filename())
+        return self.crashSession
+
+    def close_crash_session(self):
+        '''
+        Stops crash, if it was started.
+        '''
+        if self.crashSession:
+            self.crashSession.close()
+            self.crashSession = None
+
+    def get_identity(self):
+        '''
+        Returns a digest identifying the vmcore, made from its size,
+        modification time and the start of the file, which holds its
+        headers.
+        '''
+        if not self.coreIdentity:
+            st = os.stat(self.coreFilename)
+            core = open(self.coreFilename, 'rb')
+            try:
+                header = core.read(IDENTITY_HEADER_SIZE)
+            finally:
+                core.close()
+            self.coreIdentity = diskcache.make_key(str(st.st_size),
+                                                   repr(st.st_mtime),
+                                                   header)
+        return self.coreIdentity
+
+    def _get_cache_key(self, commands):
+        return diskcache.make_key(CRASH_CACHE_FORMAT, self.get_identity(),
+                                  self.vmlinux.get_version() or
+                                  self.vmlinux.get_filename(),
+                                  '\n'.join(commands))
+
+    def exe_crash_commands(self, commands=None, refresh=False):
         '''
         A utility function which executes a set of crash commands
-        on this object.
+        on this object.  The commands are run by this object's
+        CrashSession, so crash only loads the vmcore and its debug
+        symbols once however many times this is called.
+
+        Output is cached, by the vmcore's identity, the vmlinux version
+        and the commands, in a DiskCache bounded by the crash_cache_size
+        option.
 
         Arguments:
             commands: A newline separated sequence of commands
                       to execute.  One command per-line.
                       See the -i option in crash.
+            refresh:  Run the commands even if their output is cached.
 
         Returns:
-            The stdout from crash or None
+            The output from crash or None
         '''
-        retVal = None
-        tf = None
-        tempfilename = None
-
         if not commands:
             logger.log(logging.DEBUG,
                        'commands is None')
-            return retVal
-
-        if self.vmlinux:
-            try:
-                (tf, tempfilename) = tempfile.mkstemp()
-                tf = os.fdopen(tf, 'w')
-                tf.write(commands)
-                tf.write('\nquit')
-                tf.close()
+            return None
 
-                logger.log(logging.DEBUG,
-                           'Crash command file is %s with contents of:\n%s' %
-                           (tempfilename,
-                            open(tempfilename, 'r').read()))
-                cmd = ['crash', self.coreFilename, self.vmlinux.get_filename(),
-                       '-i', tempfilename]
-                logger.log(logging.DEBUG, 'Executing: %s ' % " ".join(cmd))
-                proc = subprocess.Popen(cmd,
-                                        stdout=subprocess.PIPE,
-                                        stderr=subprocess.PIPE)
-
-                stdout, stderr = proc.communicate()
-                if proc.returncode == 0:
-                    logger.log(logging.DEBUG,
-                               'Crash output %s' % str(stdout).strip())
-                    retVal = str(stdout).strip().replace('\r', '\n')
-                    if commands == 'bt -a':
-                        clean = analyzer.Analyzer.analyze(
-                                        retVal, ["Crash bt -a Analyzer", ])
-                        retVal = clean[0].token_string
-                else:
-                    msg = _('ERROR: Problem executing crash command: %s' %
-                            stderr)
-                    if not stderr:
-                        logger.error('%s\nCommand: %s\nOutput:\n%s' %
-                                     (msg, ' '.join(cmd), str(stdout).strip()))
-                        msg += _('\nPlease consult the Red Hat Support Tool '
-                                 'logs for more details.')
-                    print msg
-                    raise Exception(msg)
-
-                # Cleanup
-                if tf:
-                    os.unlink(tempfilename)
-            except Exception, e:
-                if tf:
-                    os.unlink(tempfilename)
-        else:
+        if not self.vmlinux:
             logger.log(logging.DEBUG,
                        'There is no vmlinux objec associated with %s' %
                        self.coreFilename)
-            return retVal
-        return retVal
+            return None
+
+        commands = _split_commands(commands)
+        cache = get_crash_cache()
+        cache_key = None
+        if cache.max_size:
+            cache_key = self._get_cache_key(commands)
+            if refresh:
+                cache.invalidate(cache_key)
+            else:
+                data = cache.get(cache_key)
+                if data is not None:
+                    try:
+                        output = zlib.decompress(data)
+                        logger.log(logging.DEBUG,
+                                   'Using cached crash output %s' % cache_key)
+                        return output
+                    except zlib.error, e:
+                        logger.log(logging.WARNING,
+                                   'Invalid cached crash output %s: %s' %
+                                   (cache_key, e))
+
+        output = self._run_crash_commands(commands)
+        if cache_key:
+            cache.put(cache_key, zlib.compress(output))
+        return output
+
+    def _run_crash_commands(self, commands):
+        session = self.get_crash_session()
+        if commands == ['bt -a']:
+            # Head the backtraces with the system information, which names
+            # the kernel and the panic, as crash's banner used to.
+            return '%s\n\n%sbt -a\n%s' % (session.run('sys'),
+                                           CrashSession.PROMPT,
+                                           session.run('bt -a'))
+        if len(commands) == 1:
+            return session.run(commands[0])
+        output = []
+        for command in commands:
+            output.append(CrashSession.PROMPT + command)
+            output.append(session.run(command))
+        return '\n'.join(output)
+
+
+def _split_commands(commands):
+    '''
+    Returns the list of commands in a newline separated sequence.  The
+    CrashSession ends when it's closed, not at a quit in a command file.
+    '''
+    return [command.strip() for command in commands.split('\n')
+            if command.strip() and
+            command.strip() not in ('q', 'quit', 'exit')]
+
+
+def get_crash_cache():
+    '''
+    Returns the DiskCache of crash output, bounded by the crash_cache_size
+    option.
+    '''
+    cache_size = confighelper.get_config_helper().get(
+                                            option='crash_cache_size')
+    try:
+        if cache_size is None or cache_size == '':
+            cache_size = confighelper.ConfigHelper.DEFAULT_CRASH_CACHE_SIZE
+        cache_size = int(cache_size)
+    except ValueError:
+        logger.log(logging.WARNING, 'Invalid crash_cache_size %s' %
+                   cache_size)
+        cache_size = confighelper.ConfigHelper.DEFAULT_CRASH_CACHE_SIZE
+    return diskcache.DiskCache(CRASH_CACHE_DIR, cache_size)
+
+
+class CrashSession(object):
+    '''
+    A long lived crash process for a vmcore and its vmlinux, which runs any
+    number of commands.
+
+    Commands are written to crash's stdin and its output is read from a
+    pseudo-terminal, so that crash doesn't hold it in a block buffer.  Each
+    command is followed by an echo of a marker that is unique to the
+    command, and the command's output is everything read before the marker.
+    '''
+    PROMPT = 'crash> '
+    READ_SIZE = 65536
+
+    def __init__(self, core_filename, vmlinux_filename):
+        '''
+        Arguments:
+         core_filename    - The vmcore to examine
+         vmlinux_filename - The debug symbols matching the vmcore
+        '''
+        self.cmd = ['crash', '-s', core_filename, vmlinux_filename]
+        self.marker = 'RHST-%d-%s' % (os.getpid(),
+                                      binascii.hexlify(os.urandom(8)))
+        self._proc = None
+        self._master = None
+        self._buffer = ''
+        self._count = 0
+
+    def start(self):
+        '''
+        Starts crash and waits for it to load the vmcore.
+        '''
+        logger.log(logging.DEBUG, 'Executing: %s ' % " ".join(self.cmd))
+        master, slave = pty.openpty()
+        try:
+            try:
+                self._proc = subprocess.Popen(self.cmd,
+                                              stdin=subprocess.PIPE,
+                                              stdout=slave,
+                                              stderr=slave,
+                                              close_fds=True)
+            except OSError, e:
+                os.close(master)
+                msg = _('ERROR: Unable to launch crash. Message: %s') % e
+                print msg
+                logger.log(logging.ERROR, msg)
+                raise Exception(msg)
+        finally:
+            os.close(slave)
+        self._master = master
+        # crash pipes output through a pager when it writes to a terminal.
+        self.run('set scroll off')
+
+    def run(self, command):
+        '''
+        Runs a single crash command and returns its output.
+        '''
+        if self._proc is None:
+            self.start()
+        self._count += 1
+        marker = '%s-%d' % (self.marker, self._count)
+        logger.log(logging.DEBUG, 'Crash command: %s' % command)
+        try:
+            self._proc.stdin.write('%s\necho %s\n' % (command, marker))
+            self._proc.stdin.flush()
+        except IOError, e:
+            # crash has exited, which _read_until reports.
+            logger.log(logging.DEBUG, e)
+        output = self._read_until(command, marker)
+        # Drop any prompts crash echoed for the command and the marker.
+        lines = [line for line in output.split('\n')
+                 if line.rstrip() != self.PROMPT + command and
+                 not line.rstrip().endswith('echo ' + marker)]
+        output = '\n'.join(lines).strip('\n').rstrip()
+        logger.log(logging.DEBUG, 'Crash output %s' % output)
+        return output
+
+    def _read(self):
+        try:
+            data = os.read(self._master, self.READ_SIZE)
+        except OSError, e:
+            # Linux reports the other end of a closed pty as EIO.
+            if e.errno != errno.EIO:
+                raise
+            data = ''
+        return data.replace('\r', '')
+
+    def _read_until(self, command, marker):
+        end = '\n%s\n' % marker
+        chunks = [self._buffer]
+        seen = '\n' + self._buffer
+        while seen.find(end) == -1:
+            data = self._read()
+            if not data:
+                output = ''.join(chunks).strip()
+                self.close()
+                msg = _('ERROR: Problem executing crash command: %s') % \
+                    command
+                logger.error('%s\nCommand: %s\nOutput:\n%s' %
+                             (msg, ' '.join(self.cmd), output))
+                msg += _('\nPlease consult the Red Hat Support Tool '
+                         'logs for more details.')
+                print msg
+                raise Exception(msg)
+            chunks.append(data)
+            seen = seen[-len(end):] + data
+        text = '\n' + ''.join(chunks)
+        index = text.find(end)
+        self._buffer = text[index + len(end):]
+        return text[1:index + 1]
+
+    def close(self):
+        '''
+        Quits crash and waits for it to exit.
+        '''
+        if self._proc is None:
+            return
+        try:
+            self._proc.stdin.write('quit\n')
+            self._proc.stdin.close()
+        except IOError:
+            pass
+        # Drain the pty so that crash can't block writing to it.
+        while self._read():
+            pass
+        self._proc.wait()
+        logger.log(logging.DEBUG, 'crash exited with %s after %d commands' %
+                   (self._proc.returncode, self._count))
+        os.close(self._master)
+        self._proc = None
+        self._master = None
+        self._buffer = ''
+
+
+def _get_index_path(kernelext_dir):
+    return os.path.join(kernelext_dir, VMLINUX_INDEX)
+
+
+def load_vmlinux_index(kernelext_dir):
+    '''
+    Returns the index of the vmlinux files in the debug symbol cache
+    directory, a dictionary of kernel version to (path, size, mtime).
+    '''
+    index = {}
+    try:
+        indexfile = open(_get_index_path(kernelext_dir), 'r')
+    except IOError:
+        return index
+    try:
+        for line in indexfile:
+            try:
+                version, size, mtime, path = line.rstrip('\n').split('\t', 3)
+                index[version] = (path, long(size), float(mtime))
+            except ValueError:
+                logger.log(logging.DEBUG,
+                           'Ignoring bad vmlinux index line: %s' % line)
+    finally:
+        indexfile.close()
+    return index
+
+
+def save_vmlinux_index(kernelext_dir, index):
+    '''
+    Writes the index of the vmlinux files in the debug symbol cache
+    directory.  The index is written to a temporary file and renamed into
+    place, so that it's never seen partially written.
+    '''
+    try:
+        fd, tmppath = tempfile.mkstemp(prefix=VMLINUX_INDEX,
+                                       dir=kernelext_dir)
+        indexfile = os.fdopen(fd, 'w')
+        try:
+            for version in sorted(index):
+                path, size, mtime = index[version]
+                indexfile.write('%s\t%d\t%r\t%s\n' %
+                                (version, size, mtime, path))
+        finally:
+            indexfile.close()
+        os.rename(tmppath, _get_index_path(kernelext_dir))
+    except (IOError, OSError), e:
+        logger.log(logging.WARNING, 'Unable to write the vmlinux index in '
+                   '%s: %s' % (kernelext_dir, e))
+
+
+def _get_index_entry(path):
+    '''
+    Returns the (path, size, mtime) index entry for a vmlinux file, or None
+    if it can't be stat'd.
+    '''
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_size, st.st_mtime)
+
+
+def index_vmlinux(kernelext_dir, path):
+    '''
+    Adds a newly extracted vmlinux file to the index of the debug symbol
+    cache directory.
+
+    Returns:
+        The file's VMLinux object
+    '''
+    vm = VMLinux(path)
+    entry = _get_index_entry(path)
+    if vm.get_version() and entry:
+        index = load_vmlinux_index(kernelext_dir)
+        index[vm.get_version()] = entry
+        save_vmlinux_index(kernelext_dir, index)
+    return vm
+
+
+def unindex_vmlinuxes(kernelext_dir, dirname):
+    '''
+    Removes the vmlinux files in a directory which has been removed from
+    the debug symbol cache directory from its index.
+    '''
+    prefix = os.path.join(dirname, '')
+    index = load_vmlinux_index(kernelext_dir)
+    removed = [version for version in index
+               if index[version][0].startswith(prefix)]
+    if removed:
+        for version in removed:
+            del index[version]
+        save_vmlinux_index(kernelext_dir, index)
+
+
+def touch_vmlinux(path):
+    '''
+    Records that a vmlinux file in the debug symbol cache directory has
+    just been used.  The vmlinux file itself isn't touched, as its
+    modification time is part of its index entry.
+    '''
+    marker = os.path.join(os.path.dirname(path), VMLINUX_LAST_USED)
+    try:
+        os.utime(marker, None)
+    except OSError:
+        try:
+            open(marker, 'w').close()
+        except IOError, e:
+            logger.log(logging.DEBUG, 'Unable to record the use of %s: %s' %
+                       (path, e))
+
+
+def get_vmlinux_usage(kernelext_dir):
+    '''
+    Returns a list of (package, size, last used time) of each vmlinux file
+    in the debug symbol cache directory, least recently used first.  A
+    vmlinux file which has never been used was last used when it was
+    extracted.
+    '''
+    usage = []
+    for pkgname in list_extracted_vmlinuxes(kernelext_dir):
+        path = os.path.join(kernelext_dir, pkgname, 'vmlinux')
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        try:
+            last_used = os.path.getmtime(os.path.join(kernelext_dir, pkgname,
+                                                      VMLINUX_LAST_USED))
+        except OSError:
+            last_used = st.st_mtime
+        usage.append((pkgname, st.st_size, last_used))
+    usage.sort(key=lambda entry: entry[2])
+    return usage
+
+
+def get_kern_debug_quota():
+    '''
+    Returns the most bytes, and the most vmlinux files, the debug symbol
+    cache directory may hold, from the kern_debug_max_size and
+    kern_debug_max_count options.  0 is no limit.
+    '''
+    quota = []
+    for option, default in (
+            ('kern_debug_max_size',
+             confighelper.ConfigHelper.DEFAULT_KERN_DEBUG_MAX_SIZE),
+            ('kern_debug_max_count',
+             confighelper.ConfigHelper.DEFAULT_KERN_DEBUG_MAX_COUNT)):
+        value = confighelper.get_config_helper().get(option=option)
+        try:
+            if value is None or value == '':
+                value = default
+            value = int(value)
+        except ValueError:
+            logger.log(logging.WARNING, 'Invalid %s %s' % (option, value))
+            value = default
+        quota.append(value)
+    return tuple(quota)
+
+
+def evict_vmlinuxes(kernelext_dir, keep=None):
+    '''
+    Removes the least recently used vmlinux files, and their packages'
+    directories, until the debug symbol cache directory fits in its quota.
+
+    Arguments:
+     kernelext_dir - The debug symbol cache directory
+     keep          - Packages which must not be removed, such as those
+                     which have just been extracted
+
+    Returns:
+     The list of removed packages.
+    '''
+    max_size, max_count = get_kern_debug_quota()
+    if not max_size and not max_count:
+        return []
+    if not keep:
+        keep = []
+
+    usage = get_vmlinux_usage(kernelext_dir)
+    total = sum([size for pkgname, size, last_used in usage])
+    count = len(usage)
+    evicted = []
+    for pkgname, size, last_used in usage:
+        if (not max_size or total <= max_size) and \
+           (not max_count or count <= max_count):
+            break
+        if pkgname in keep:
+            continue
+        kpath = os.path.join(kernelext_dir, pkgname)
+        logger.log(logging.INFO, 'Evicting %s, last used %s' %
+                   (kpath, time.ctime(last_used)))
+        try:
+            shutil.rmtree(kpath)
+            unindex_vmlinuxes(kernelext_dir, kpath)
+        except (IOError, OSError), e:
+            logger.log(logging.WARNING, 'Unable to remove %s: %s' %
+                       (kpath, e))
+            continue
+        evicted.append(pkgname)
+        total -= size
+        count -= 1
+    return evicted
 
 
 def get_debug_symbols(kernelext_dir, kernel_version=None):
@@ -436,28 +1100,172 @@ def get_debug_symbols(kernelext_dir, kernel_version=None):
     the provided kernel version.  This must be version from
     /proc/version (ie. 3.6.11-1.fc17.x86_64)
 
+    The directory's index is consulted first, and its entry for the
+    version is used if the file's size and modification time are
+    unchanged.  Otherwise the directory is searched, parsing only the
+    vmlinux files the index doesn't already know about, and the index
+    is updated with what was found.  The use of the returned vmlinux
+    is recorded for the cache's least recently used eviction.
+
     Returns:
         A VMLinux object or None
 
     '''
-    retVal = None
-
     logger.log(logging.DEBUG, 'Searching %s for debug symbols '
                'matching %s' % (kernelext_dir, kernel_version))
 
+    index = load_vmlinux_index(kernelext_dir)
+    entry = index.get(kernel_version)
+    if entry:
+        if _get_index_entry(entry[0]) == entry:
+            logger.log(logging.DEBUG, '%s is a match for %s' %
+                       (entry[0], kernel_version))
+            touch_vmlinux(entry[0])
+            return VMLinux(entry[0], kernel_version)
+        logger.log(logging.DEBUG, 'Index entry for %s is stale' %
+                   kernel_version)
+
+    # Drop entries for files which have changed or gone, and note the rest
+    # so that they aren't parsed again.
+    changed = False
+    known = {}
+    for version, entry in index.items():
+        if _get_index_entry(entry[0]) == entry:
+            known[entry[0]] = version
+        else:
+            del index[version]
+            changed = True
+
+    retVal = None
     for root, dirnames, filenames in \
         os.walk(kernelext_dir):
         for filename in fnmatch.filter(filenames, '*vmlinux*'):
+            path = os.path.join(root, filename)
+            if path in known or filename.startswith(VMLINUX_INDEX):
+                continue
             logger.log(logging.DEBUG, 'Inspecting %s' % filename)
-            vm = VMLinux(os.path.join(root, filename))
+            try:
+                vm = VMLinux(path)
+            # pylint: disable=W0703
+            except Exception, e:
+                logger.log(logging.DEBUG, e)
+                continue
+            entry = _get_index_entry(path)
+            if vm.get_version() and entry:
+                index[vm.get_version()] = entry
+                changed = True
             if vm.get_version() == kernel_version:
                 logger.log(logging.DEBUG,
                            '%s is a match for %s' %
-                           (os.path.join(root, filename), kernel_version))
+                           (path, kernel_version))
                 retVal = vm
+
+    if changed:
+        save_vmlinux_index(kernelext_dir, index)
+    if retVal:
+        touch_vmlinux(retVal.get_filename())
     return retVal
 
 
+def find_vmcores(paths):
+    '''
+    A utility function which returns the vmcore files named by paths,
+    where each path is a vmcore or a directory, such as /var/crash, to
+    search for files named vmcore*.
+    '''
+    vmcores = []
+    for path in paths:
+        path = os.path.expanduser(path)
+        if not os.path.isdir(path):
+            vmcores.append(path)
+            continue
+        found = []
+        for root, dirnames, filenames in os.walk(path):
+            for filename in fnmatch.filter(filenames, 'vmcore*'):
+                if not filename.startswith('vmcore-dmesg'):
+                    found.append(os.path.join(root, filename))
+        found.sort()
+        vmcores.extend(found)
+    return vmcores
+
+
+def get_jobs():
+    '''
+    Returns the default number of vmcores examined at once, the number of
+    CPUs.
+    '''
+    try:
+        return multiprocessing.cpu_count()
+    except (AttributeError, NotImplementedError):
+        return 1
+
+
+def run_crash_commands(vmcores, commands, refresh=False, jobs=None):
+    '''
+    A utility function which runs the same crash commands on several
+    vmcores.  Each vmcore has its own debug symbols found and its own
+    crash session, in a pool of processes when there is more than one.
+
+    Arguments:
+        vmcores:  The paths of the vmcores.
+        commands: A list of arguments to VMCore.exe_crash_commands.
+        refresh:  Run the commands even if their output is cached.
+        jobs:     The number of vmcores to examine at once.
+
+    Returns:
+        A list of (vmcore, kernel version, outputs, error) for each
+        vmcore, in order, where outputs is the output of each of the
+        commands and error is None or a message saying why there's no
+        output.
+    '''
+    kernelext_dir = confighelper.get_config_helper().get(
+                                            option='kern_debug_dir')
+    work = [(vmcore, kernelext_dir, commands, refresh) for vmcore in vmcores]
+    if not jobs:
+        jobs = get_jobs()
+    jobs = min(jobs, len(work))
+    if jobs <= 1 or not multiprocessing:
+        return [_run_core_commands(item) for item in work]
+
+    logger.log(logging.DEBUG, 'Examining %d vmcores in %d processes' %
+               (len(work), jobs))
+    pool = multiprocessing.Pool(jobs)
+    try:
+        results = pool.map(_run_core_commands, work, 1)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    return results
+
+
+def _run_core_commands(item):
+    '''
+    Runs crash commands on one vmcore of several, see run_crash_commands.
+    '''
+    filename, kernelext_dir, commands, refresh = item
+    kernel_version = None
+    try:
+        vmcore = VMCore(filename)
+        kernel_version = vmcore.getKernelVersion()
+        vmlinux = get_debug_symbols(kernelext_dir, kernel_version)
+        if not vmlinux:
+            return (filename, kernel_version, [],
+                    _('Debug symbols for %s were not found.') %
+                    kernel_version)
+        vmcore.setDebugSymbols(vmlinux)
+        try:
+            outputs = [vmcore.exe_crash_commands(command, refresh)
+                       for command in commands]
+        finally:
+            vmcore.close_crash_session()
+        return (filename, kernel_version, outputs, None)
+    # pylint: disable=W0703
+    except Exception, e:
+        logger.log(logging.DEBUG, e)
+        return (filename, kernel_version, [], str(e))
+
+
 def list_extracted_vmlinuxes(kernelext_dir):
     debugimages = []
 
@@ -26,17 +26,29 @@ import fnmatch
 import logging
 import os
 import redhat_support_tool.helpers.confighelper as confighelper
-import shutil
-import subprocess
+import redhat_support_tool.helpers.debuginfoindex as debuginfoindex
+import redhat_support_tool.helpers.rpmpayload as rpmpayload
+import redhat_support_tool.helpers.vmcorehelper as vmcorehelper
 import sys
-import tempfile
+import time
 import yum
+try:
+    import multiprocessing
+except ImportError:
+    # python 2.4 and 2.5
+    multiprocessing = None
 
 __author__ = 'Nigel Jones <nigjones@redhat.com>'
 __author__ = 'Keith Robertson <kroberts@redhat.com>'
 logger = logging.getLogger("redhat_support_tool.helpers.yumdownloadhelper")
 _yum_helper = None
 
+# The number of kernel debuginfo packages downloaded at once.
+DEFAULT_DOWNLOAD_JOBS = 4
+
+# The repositories searched for kernel debuginfo packages by default.
+DEFAULT_DEBUG_REPOS = '*debug*'
+
 
 class NoReposError(Exception):
     def __init__(self, msg):
@@ -79,6 +91,11 @@ class YumDownloadHelper(yum.YumBase):
         # Set the progress bar
         self.repos.setProgressBar(TextMeter(fo=sys.stdout))
 
+        # The debug repos are set up when they're first needed, searches
+        # answered by the debuginfo index don't need them.
+        self._debug_repos_setup = False
+        self._debuginfo_index = None
+
     def setup_repos(self,
                     repos_to_enable=None,
                     repos_to_disable=None):
@@ -107,49 +124,137 @@ class YumDownloadHelper(yum.YumBase):
         # Re-enable the file download text meter
         self.repos.setProgressBar(TextMeter(fo=sys.stdout))
 
-    def setup_debug_repos(self,
-                          repos_to_enable='*debug*',
-                          repos_to_disable='*'):
+    def _getDebugRepos(self):
         debug_repos = confighelper.get_config_helper().get(
                                                        option='debug_repos')
         if debug_repos:
-            repos_to_enable = debug_repos
+            return debug_repos
+        return DEFAULT_DEBUG_REPOS
+
+    def setup_debug_repos(self,
+                          repos_to_enable=None,
+                          repos_to_disable='*'):
+        if not repos_to_enable:
+            repos_to_enable = self._getDebugRepos()
 
         self.setup_repos(repos_to_enable, repos_to_disable)
+        self._debug_repos_setup = True
+
+    def _setupDebugReposOnce(self):
+        if not self._debug_repos_setup:
+            self.setup_debug_repos()
 
     def get_repoids(self):
         '''Return a list of repoids
         Iterates over repos.listEnabled() and assembles a list of the
-        repository ids used by yum.
+        repository ids used by yum.  If the debug repos haven't been set
+        up, the ids recorded in the debuginfo index are returned instead.
         '''
+        if not self._debug_repos_setup and self._debuginfo_index:
+            return list(self._debuginfo_index.repoids)
         repoids = []
         for repo in self.repos.listEnabled():
             repoids.append(repo.id)
         return repoids
 
+    def _returnPackages(self, patterns):
+        self.repos.setProgressBar(None)
+        try:
+            return self.pkgSack.returnPackages(patterns=patterns)
+        finally:
+            # Re-enable the file download text meter
+            self.repos.setProgressBar(TextMeter(fo=sys.stdout))
+
+    def _useStaleIndex(self, index, query, e):
+        '''
+        Searches an index which is out of date, or returns None if there
+        isn't one, when the debug repos can't be searched.
+        '''
+        if index is None or index.created is None:
+            return None
+        logger.log(logging.WARNING, 'Unable to refresh the debuginfo '
+                   'index: %s' % e)
+        print _('WARNING: The debug repositories could not be searched, '
+                'using their index from %s.') % \
+            time.strftime('%Y-%m-%d %H:%M', time.localtime(index.created))
+        return index.find(query)
+
     def find_package(self, query=None):
         '''
-        Find package in the available repos. WARNING: by default this
-        function only searches the debug repos.  You need to change
-        the args to search other repos.
+        Find package in the debug repos, setting them up if they haven't
+        been.  The kernel debuginfo packages of the repos are recorded in
+        a local index which answers searches until it's older than the
+        debuginfo_index_ttl, or when the repos can't be reached.
 
         Keyword arguments:
          query            -- A package name.  Wildcards allowed.
 
         Returns:
-             An array yum package objects.
+             An array of yum package objects, or of IndexedPackage objects
+             if the search was answered by the index.
         '''
         retVal = None
+        index = None
+        if debuginfoindex.get_ttl():
+            index = debuginfoindex.DebuginfoIndex(self._getDebugRepos())
+            self._debuginfo_index = index
+            if index.is_fresh():
+                retVal = index.find(query)
+                if retVal:
+                    return retVal
+                # The package may be newer than the index.
+                logger.log(logging.DEBUG, '%s is not in the debuginfo '
+                           'index, searching the debug repos' % query)
+
         try:
-            self.repos.setProgressBar(None)
-            retVal = self.pkgSack.returnPackages(patterns=[query])
-            # Re-enable the file download text meter
-            self.repos.setProgressBar(TextMeter(fo=sys.stdout))
+            self._setupDebugReposOnce()
+        # pylint: disable=W0703
+        except Exception, e:
+            retVal = self._useStaleIndex(index, query, e)
+            if retVal is None:
+                raise
+            return retVal
+
+        try:
+            if index is None:
+                retVal = self._returnPackages([query])
+            else:
+                index.update(self.get_repoids(), self._returnPackages(
+                                            debuginfoindex.INDEX_PATTERNS))
+                retVal = index.find(query)
         except Exception, e:
             logger.log(logging.ERROR, e)
             logger.exception(e)
+            retVal = self._useStaleIndex(index, query, e)
         return retVal
 
+    def _resolvePackage(self, pkgobj):
+        '''
+        Returns the yum package object of a package found in the debuginfo
+        index, which is needed to download it.
+        '''
+        if not isinstance(pkgobj, debuginfoindex.IndexedPackage):
+            return pkgobj
+        self._setupDebugReposOnce()
+        self.repos.setProgressBar(None)
+        try:
+            matches = self.pkgSack.searchNevra(name=pkgobj.name,
+                                               epoch=pkgobj.epoch,
+                                               ver=pkgobj.version,
+                                               rel=pkgobj.release,
+                                               arch=pkgobj.arch)
+        finally:
+            self.repos.setProgressBar(TextMeter(fo=sys.stdout))
+        for match in matches:
+            if match.repoid == pkgobj.repoid:
+                return match
+        if matches:
+            return matches[0]
+        err = _('%s is no longer in the debug repositories.') % pkgobj
+        print(_("ERROR: %s" % err))
+        logger.log(logging.ERROR, err)
+        raise Exception(err)
+
     def isSpaceToDownloadPackage(self, pkgobj):
         if not os.path.exists(pkgobj.localPkg()):
             fs_stat = os.statvfs(os.path.dirname(pkgobj.localPkg()))
@@ -184,45 +289,106 @@ class YumDownloadHelper(yum.YumBase):
         else:
             return None
 
-    def _extractKernelDebug(self, pkgobj=None, kernelext_dir=None):
+    def _getVmlinuxPath(self, pkgobj):
+        '''
+        Returns the path of the vmlinux file in a kernel debuginfo package.
+        '''
         # TODO: Consider 're' match here to ensure it's a kernel
         # debuginfo
-        location = self.downloadPackage(pkgobj)
-        vmlinuxfound = None
-
-        if location:
-            try:
-                for path in pkgobj.filelist:
-                    if path.endswith('vmlinux'):
-                        vmlinuxfound = path
-                        break
-            except Exception, e:
-                print(_("ERROR: %s" % e))
-                logger.log(logging.ERROR, e)
+        try:
+            for path in pkgobj.filelist:
+                if path.endswith('vmlinux'):
+                    return path
+        except Exception, e:
+            print(_("ERROR: %s" % e))
+            logger.log(logging.ERROR, e)
 
-        if not vmlinuxfound:
-            err = _('Failed to install kernel debug symbols from %s' % pkgobj)
-            print(_("ERROR: %s" % err))
-            logger.log(logging.ERROR, err)
-            raise Exception(err)
-            return None
+        err = _('Failed to install kernel debug symbols from %s' % pkgobj)
+        print(_("ERROR: %s" % err))
+        logger.log(logging.ERROR, err)
+        raise Exception(err)
 
+    def _getPackageNVR(self, pkgobj):
         if hasattr(pkgobj, 'nvr'):
-            pkgnvr = pkgobj.nvr
+            return pkgobj.nvr
         else:
-            pkgnvr = "%s-%s-%s" % (pkgobj.name, pkgobj.version, pkgobj.release)
-        destdir = os.path.join(kernelext_dir, pkgnvr)
-        dest = os.path.join(destdir, 'vmlinux')
-        if os.path.exists(dest):
-            logger.log(logging.INFO, "%s already exists, skipping extraction"
-                       % dest)
-            return dest
-        elif not os.path.exists(destdir):
-            os.mkdir(destdir)
+            return "%s-%s-%s" % (pkgobj.name, pkgobj.version, pkgobj.release)
 
+    def _getVmlinuxDest(self, pkgobj, kernelext_dir):
+        return os.path.join(kernelext_dir, self._getPackageNVR(pkgobj),
+                            'vmlinux')
+
+    def _downloadAndExtract(self, pkgobj, vmlinuxfound, dest):
+        '''
+        Downloads a kernel debuginfo package and extracts its vmlinux file
+        to dest.  Returns dest, or None if either failed.
+        '''
+        location = self.downloadPackage(pkgobj)
+        if not location:
+            return None
+        if not os.path.exists(os.path.dirname(dest)):
+            os.mkdir(os.path.dirname(dest))
         return self.extractFile(location, vmlinuxfound, dest)
 
-    def extractKernelDebugs(self, pkgAry):
+    def _extractKernelDebugsInParallel(self, work, jobs):
+        '''
+        Downloads and extracts packages in a pool of processes, each of
+        which extracts a package as soon as it has downloaded it, while the
+        aggregate progress is shown.
+
+        Arguments:
+         work - A list of (pkgobj, vmlinuxfound, dest) for each package
+         jobs - The number of processes
+
+        Returns:
+         A list of (pkgobj, dest or None) in the order that they finished.
+        '''
+        global _worker_helper
+        global _worker_work
+        _worker_helper = self
+        _worker_work = work
+        meter = ExtractMeter(work)
+        results = []
+        # The package objects aren't picklable, the forked workers inherit
+        # them and are passed their index in work.
+        pool = multiprocessing.Pool(jobs)
+        try:
+            finished = pool.imap_unordered(_extract_worker,
+                                           range(len(work)))
+            while True:
+                try:
+                    index, dest = finished.next(ExtractMeter.INTERVAL)
+                except multiprocessing.TimeoutError:
+                    meter.update()
+                    continue
+                except StopIteration:
+                    break
+                meter.finished(index, dest)
+                results.append((work[index][0], dest))
+            pool.close()
+        finally:
+            meter.end()
+            pool.terminate()
+            pool.join()
+            _worker_helper = None
+            _worker_work = None
+        return results
+
+    def extractKernelDebugs(self, pkgAry, jobs=None):
+        '''
+        Downloads kernel debuginfo packages and extracts their vmlinux
+        files to the kern_debug_dir, several at a time.  A package which
+        can't be downloaded or extracted is reported and the rest carry on.
+
+        Arguments:
+         pkgAry - The yum package objects, or IndexedPackage objects
+         jobs   - The number of packages downloaded at once, by default
+                  DEFAULT_DOWNLOAD_JOBS
+
+        Returns:
+         A list of dictionaries of the 'package' and the 'path' of each
+         extracted vmlinux file.
+        '''
         extracted_paths = []
 
         kernelext_dir = confighelper.get_config_helper().get(
@@ -245,62 +411,162 @@ class YumDownloadHelper(yum.YumBase):
             logger.log(logging.ERROR, str)
             raise Exception(err)
 
+        results = []
+        work = []
         for pkgobj in pkgAry:
-            ret = self._extractKernelDebug(pkgobj, kernelext_dir)
-            if ret:
-                if hasattr(pkgobj, 'nvr'):
-                    pkgnvr = pkgobj.nvr
-                else:
-                    pkgnvr = "%s-%s-%s" % (pkgobj.name,
-                                           pkgobj.version,
-                                           pkgobj.release)
-                extracted_paths.append({'package': pkgnvr,
-                                        'path': ret})
+            dest = self._getVmlinuxDest(pkgobj, kernelext_dir)
+            if os.path.exists(dest):
+                logger.log(logging.INFO, "%s already exists, skipping "
+                           "extraction" % dest)
+                results.append((pkgobj, dest))
+                continue
+            # The packages and their file lists are looked up here, rather
+            # than in the workers, as yum's sqlite connections can't be
+            # shared with them.
+            try:
+                pkgobj = self._resolvePackage(pkgobj)
+                work.append((pkgobj, self._getVmlinuxPath(pkgobj), dest))
+            # pylint: disable=W0703
+            except Exception, e:
+                logger.log(logging.WARNING, 'Unable to resolve %s: %s' %
+                           (pkgobj, e))
+                results.append((pkgobj, None))
+
+        if not jobs:
+            jobs = DEFAULT_DOWNLOAD_JOBS
+        jobs = min(jobs, len(work))
+        if jobs <= 1 or not multiprocessing:
+            for pkgobj, vmlinuxfound, dest in work:
+                try:
+                    ret = self._downloadAndExtract(pkgobj, vmlinuxfound,
+                                                   dest)
+                # pylint: disable=W0703
+                except Exception, e:
+                    print(_("ERROR: %s" % e))
+                    logger.log(logging.ERROR, e)
+                    ret = None
+                results.append((pkgobj, ret))
+        else:
+            results.extend(self._extractKernelDebugsInParallel(work, jobs))
+
+        failed = []
+        for pkgobj, ret in results:
+            pkgnvr = self._getPackageNVR(pkgobj)
+            if not ret:
+                failed.append(pkgnvr)
+                continue
+            extracted_paths.append({'package': pkgnvr,
+                                    'path': ret})
+            vmcorehelper.touch_vmlinux(ret)
+            try:
+                vmcorehelper.index_vmlinux(kernelext_dir, ret)
+            # pylint: disable=W0703
+            except Exception, e:
+                logger.log(logging.WARNING,
+                           'Unable to index %s: %s' % (ret, e))
 
-        return extracted_paths
+        if failed:
+            err = _('Failed to install kernel debug symbols from: %s') % \
+                ', '.join(failed)
+            print(_("ERROR: %s" % err))
+            logger.log(logging.ERROR, err)
 
-    def extractFile(self, pkgloc, pattern, dest):
-        cpiopattern = "." + pattern
-        rpm2cpiocmd = ["rpm2cpio", pkgloc]
-        cpiocmd = ["cpio", "-id", cpiopattern]
-        tempdir = None
+        # Make room for what was just extracted, which was asked for and so
+        # is never evicted itself.
+        evicted = vmcorehelper.evict_vmlinuxes(
+                        kernelext_dir,
+                        [extracted['package'] for extracted in extracted_paths])
+        if evicted:
+            print _('Removed the least recently used vmlinux images to stay '
+                    'within the kern_debug_dir quota: %s') % ', '.join(evicted)
 
-        # Record current working directory, create a temp directory
-        # and change to it for CPIO expansion.
-        prevcwd = os.getcwd()
+        return extracted_paths
 
+    def extractFile(self, pkgloc, pattern, dest):
         try:
-            tempdir = tempfile.mkdtemp('-rhst')
-            os.chdir(tempdir)
-
-            # BZ983909 - don't use shell=True
-            proc1 = subprocess.Popen(rpm2cpiocmd,
-                                     stdout=subprocess.PIPE,
-                                     stderr=subprocess.PIPE)
-            proc2 = subprocess.Popen(cpiocmd, stdin=proc1.stdout,
-                                     stdout=subprocess.PIPE,
-                                     stderr=subprocess.PIPE)
-            # pylint: disable= E1101
-            out, err = proc2.communicate()
-            ret = proc2.returncode
-            if ret != 0:
-                raise Exception(err.rstrip())
-
-            # Return to previous dir, move the file to destination
-            # and revert to previous cwd.
-            shutil.move(os.path.join(tempdir, cpiopattern), dest)
+            # The file is streamed out of the package's payload straight to
+            # dest, which is only renamed into place once it's complete.
+            rpmpayload.extract_file(pkgloc, "." + pattern, dest)
         # pylint: disable=W0703
         except Exception, e:
             logger.log(logging.ERROR, e)
             print(_("ERROR: %s" % e))
             print(_("ERROR: Unable to extract %s from %s" % (pattern, pkgloc)))
-            if os.path.exists(dest):
-                # clean up in case vmlinux file is only partially extracted
-                shutil.rmtree(os.path.dirname(dest))
             dest = None
 
-        os.chdir(prevcwd)
-        if tempdir:
-            shutil.rmtree(tempdir)
-
         return dest
+
+
+class ExtractMeter(object):
+    '''
+    Shows the aggregate progress of packages being downloaded and
+    extracted in parallel, on a single line which is rewritten every
+    INTERVAL seconds.  The amount downloaded is the size of the packages'
+    partially downloaded files.
+    '''
+    INTERVAL = 0.5
+
+    def __init__(self, work, fo=sys.stdout):
+        self.work = work
+        self.fo = fo
+        self.done = {}
+        self.total = 0
+        for pkgobj, vmlinuxfound, dest in work:
+            self.total += self._get_size(pkgobj)
+        self.update()
+
+    def _get_size(self, pkgobj):
+        try:
+            return int(pkgobj.size)
+        except (AttributeError, TypeError, ValueError):
+            return 0
+
+    def _get_downloaded(self, pkgobj):
+        try:
+            return min(os.path.getsize(pkgobj.localPkg()),
+                       self._get_size(pkgobj))
+        except (AttributeError, OSError):
+            return 0
+
+    def finished(self, index, dest):
+        self.done[index] = dest
+        self.update()
+
+    def update(self):
+        downloaded = 0
+        for index, (pkgobj, vmlinuxfound, dest) in enumerate(self.work):
+            if index in self.done:
+                downloaded += self._get_size(pkgobj)
+            else:
+                downloaded += self._get_downloaded(pkgobj)
+        failed = len([dest for dest in self.done.values() if not dest])
+        line = _('%d of %d packages done (%d failed), %d of %d MB '
+                 'downloaded') % (len(self.done), len(self.work), failed,
+                                  downloaded / 1024 / 1024,
+                                  self.total / 1024 / 1024)
+        self.fo.write('\r%-79s' % line)
+        self.fo.flush()
+
+    def end(self):
+        self.fo.write('\n')
+        self.fo.flush()
+
+
+# The helper and work of the pool processes, see
+# _extractKernelDebugsInParallel
+_worker_helper = None
+_worker_work = None
+
+
+def _extract_worker(index):
+    pkgobj, vmlinuxfound, dest = _worker_work[index]
+    # Only the parent shows progress.
+    _worker_helper.repos.setProgressBar(None)
+    try:
+        return index, _worker_helper._downloadAndExtract(pkgobj,
+                                                         vmlinuxfound, dest)
+    # pylint: disable=W0703
+    except Exception, e:
+        print(_("ERROR: %s" % e))
+        logger.log(logging.ERROR, e)
+        return index, None
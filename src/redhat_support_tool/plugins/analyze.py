@@ -16,15 +16,19 @@
 # limitations under the License.
 #
 from collections import deque
+from optparse import Option
 from redhat_support_tool.helpers.confighelper import _
 from redhat_support_tool.helpers.launchhelper import LaunchHelper
 from redhat_support_tool.plugins import InteractivePlugin, ObjectDisplayOption
 from redhat_support_tool.plugins.symptom import Symptom
 import logging
+import os
 import pydoc as pydoc
 import redhat_support_tool.helpers.analyzer as analyzer
 import redhat_support_tool.helpers.common as common
-import redhat_support_tool.symptoms as Symptoms
+import shlex
+import sys
+import time
 
 __author__ = 'Dan Varga <dvarga@redhat.com>'
 
@@ -40,6 +44,8 @@ class Analyze(InteractivePlugin):
     _sections = None
     filename = None
     results = None
+    multiple_files = False
+    follow_interval = 1.0
 
     def __init__(self):
         InteractivePlugin.__init__(self)
@@ -53,7 +59,7 @@ class Analyze(InteractivePlugin):
             - %prog -c CASENUMBER [options] <comment text here>
         Important: %prog is a OptionParser built-in.  Use it!
         '''
-        return _('%prog <file for analysis>')
+        return _('%prog [options] <file, directory or archive for analysis>')
 
     @classmethod
     def get_desc(cls):
@@ -64,7 +70,8 @@ class Analyze(InteractivePlugin):
             - 'Use the \'%s\' command to add a comment to a case.'\
              % cls.plugin_name
         '''
-        return _('Use the \'%s\' command to analyze a file for'
+        return _('Use the \'%s\' command to analyze a file, or every file'
+                 ' in a directory or tar archive such as a sosreport, for'
                  ' symptoms') % cls.plugin_name
 
     @classmethod
@@ -81,9 +88,31 @@ class Analyze(InteractivePlugin):
         return _("Examples:\n"
                  "- %s /var/log/jbossas/rhevm-slimmed/boot.log\n"
                  "- %s /var/spool/abrt/ccpp-2012-09-28-09:53:26-4080\n"
-                 "- %s /var/log/messages\n") % \
+                 "- %s /var/log/messages\n"
+                 "- %s -j 4 /var/tmp/sosreport-host-20130101.tar.xz\n"
+                 "- %s --follow /var/log/jbossas/standalone/server.log\n") % \
                  (cls.plugin_name, cls.plugin_name,
-                  cls.plugin_name)
+                  cls.plugin_name, cls.plugin_name, cls.plugin_name)
+
+    @classmethod
+    def get_options(cls):
+        '''
+        Subclasses that need command line options should override this method
+        and return an array of optparse.Option(s) to be used by the
+        OptionParser.
+        '''
+        return [Option('-j', '--jobs', dest='jobs', type='int',
+                       help=_('The number of processes used to analyze the '
+                              'files of a directory or archive. '
+                              '(optional)'), default=None),
+                Option('-f', '--follow', dest='follow', action='store_true',
+                       help=_('Keep analyzing the file as it grows, '
+                              'printing new symptoms until interrupted. '
+                              '(optional)'), default=False),
+                Option('--interval', dest='interval', type='float',
+                       help=_('The number of seconds between checks of a '
+                              'followed file. (default=%s)') %
+                       cls.follow_interval, default=cls.follow_interval)]
 
     def get_intro_text(self):
         return _('\nType the number of the symptom to view,\n'
@@ -99,6 +128,15 @@ class Analyze(InteractivePlugin):
         msg = _("ERROR: %s requires a file.")\
                     % self.plugin_name
 
+        if common.is_interactive():
+            given = shlex.split(self._line or '')
+        else:
+            given = sys.argv[2:]
+        if given != self._args:
+            # Options were given, the rest of the line is the file or text
+            # to analyze.
+            self._line = u' '.join(self._args)
+
         if not self._line:
             if common.is_interactive():
                 userinput = []
@@ -119,6 +157,11 @@ class Analyze(InteractivePlugin):
     def validate_args(self):
         # Check for required arguments.
         self._check_input()
+        if (self._options['follow'] and
+            not os.path.isfile(os.path.expanduser(self._line))):
+            msg = _("ERROR: %s can only follow a file.") % self.plugin_name
+            print msg
+            raise Exception(msg)
 
     def postinit(self):
         '''
@@ -126,23 +169,35 @@ class Analyze(InteractivePlugin):
         '''
         self._submenu_opts = deque()
         self._sections = {}
-        Symptoms.AnalyzerPlugin.symptoms = []
-        self.do_analysis(self._line)
+        if self._options['follow']:
+            # Symptoms are printed as they're found, there's no menu.
+            self.no_submenu = True
+            self.results = []
+            self.do_follow(self._line)
+        else:
+            self.do_analysis(self._line)
 
     def non_interactive_action(self):
         '''
         Running in non-interactive mode, just dump the text to screen
         '''
         for res in self.results:
+            self._print_symptom(res)
+
+    def _print_symptom(self, res):
+        if self.multiple_files:
+            line = "In: %s At Line: %d \n Symptom: %s" % (res.source,
+                    res.line_num,
+                    (res.before_line + '\n' + res.token_string))
+        else:
             line = "At Line: %d \n Symptom: %s" % (res.line_num,
-                        (res.before_line + '\n' + res.token_string))
-            try:
-                print line.encode("UTF-8", 'replace')
-            # pylint: disable=W0703
-            except Exception, e:
-                logger.log(logging.WARNING, e)
-                import sys
-                print line.encode(sys.getdefaultencoding(), 'replace')
+                    (res.before_line + '\n' + res.token_string))
+        try:
+            print line.encode("UTF-8", 'replace')
+        # pylint: disable=W0703
+        except Exception, e:
+            logger.log(logging.WARNING, e)
+            print line.encode(sys.getdefaultencoding(), 'replace')
 
     def interactive_action(self, display_option=None):
         '''
@@ -160,19 +215,48 @@ class Analyze(InteractivePlugin):
             lh = LaunchHelper(Symptom)
             lh.run(None, display_option)
 
+    def do_follow(self, filename):
+        '''
+        Print the symptoms in a file, then keep printing new ones as the
+        file is written to until interrupted with Ctrl-c.
+        '''
+        follower = analyzer.Analyzer.follow(filename)
+        try:
+            try:
+                while True:
+                    for res in follower.poll():
+                        self._print_symptom(res)
+                    sys.stdout.flush()
+                    time.sleep(self._options['interval'])
+            except KeyboardInterrupt:
+                print
+        finally:
+            follower.close()
+
     def do_analysis(self, filename):
         '''
         Call the analyzer helper to do the actual work and build the Display
         '''
+        try:
+            path = os.path.expanduser(filename)
+            self.multiple_files = (os.path.isdir(path) or
+                                   analyzer.Analyzer.is_archive(path))
+        except (TypeError, ValueError):
+            self.multiple_files = False
+
         # Call analyze, this will do the work
-        self.results = analyzer.Analyzer.analyze(filename)
+        self.results = analyzer.Analyzer.analyze(filename,
+                                                 jobs=self._options['jobs'])
 
         for res in self.results:
             # This builds the input for the Interactive display
             # DisplayOptions get appended to the _submenu_opts
             # Displays as "index [lineNumber] begin description\n"
             #                                  "2nd part of desc"
-            disp_opt = ObjectDisplayOption('[' + str(res.line_num) +
+            location = str(res.line_num)
+            if self.multiple_files:
+                location = '%s:%s' % (res.source, location)
+            disp_opt = ObjectDisplayOption('[' + location +
                                      ']  '
                                      + (res.before_line +
                                         '\n\t\t' +
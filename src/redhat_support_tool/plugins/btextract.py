@@ -50,6 +50,7 @@ class BTExtract(InteractivePlugin):
     _sections = None
     end_of_entries = ''
     vmcore = None
+    vmcores = None
     mkdumpfilepath = None
     # Should interactive_plugin/non_interactive_plugin skip output methods?
     no_submenu = False
@@ -63,7 +64,7 @@ class BTExtract(InteractivePlugin):
             - %prog -c CASENUMBER [options] <comment text here>
         Important: %prog is a OptionParser built-in.  Use it!
         '''
-        return _('%prog [options] </path/to/vmcore>')
+        return _('%prog [options] </path/to/vmcore or directory> ...')
 
     @classmethod
     def get_desc(cls):
@@ -78,7 +79,9 @@ class BTExtract(InteractivePlugin):
                  'other related information from a kernel core dump file. '
                  'The default behavior is to issue \'bt -a\'; however, there '
                  'are a variety of other \'crash\' '
-                 'commands that can be run.') % cls.plugin_name
+                 'commands that can be run.  Given several core dump files, '
+                 'or a directory of them, the commands are run on each in '
+                 'parallel.') % cls.plugin_name
 
     @classmethod
     def get_epilog(cls):
@@ -92,8 +95,9 @@ class BTExtract(InteractivePlugin):
           - %s -c 12345678
         '''
         return _("""Examples:
-  - %s /var/crash/vmcore""") \
-  % (cls.plugin_name)
+  - %s /var/crash/vmcore
+  - %s -j 4 /var/crash""") \
+  % (cls.plugin_name, cls.plugin_name)
 
     @classmethod
     def get_options(cls):
@@ -158,6 +162,16 @@ class BTExtract(InteractivePlugin):
                 Option("-i", "--cmdfile", dest="cmdfile",
                     help=_('Run a sequence of individual \'crash\' commands '
                            'from a file.'),
+                    default=None),
+                Option("-r", "--refresh", dest="refresh",
+                    action="store_true",
+                    help=_('Run the \'crash\' commands again rather than '
+                           'using their cached output.'),
+                    default=False),
+                Option("-j", "--jobs", dest="jobs", type="int",
+                    help=_('The number of core dump files to run the '
+                           '\'crash\' commands on at once. '
+                           '(default=the number of CPUs)'),
                     default=None)]
 
     def get_intro_text(self):
@@ -175,6 +189,23 @@ class BTExtract(InteractivePlugin):
         '''
         self.vmcore = VMCore(filename)
 
+    def _check_vmcores(self):
+        '''
+        Finds the core files given, or in the directories given, to run
+        the crash commands on in parallel.
+        '''
+        if self._options['casenumber']:
+            msg = _('ERROR: %s can only add the output from one kernel '
+                    'core dump file to a case.') % self.plugin_name
+            print msg
+            raise Exception(msg)
+        self.vmcores = vmcorehelper.find_vmcores(self._args)
+        if not self.vmcores:
+            msg = _('ERROR: No kernel core dump files were found in %s.') % \
+                ' '.join(self._args)
+            print msg
+            raise Exception(msg)
+
     def _find_debug_symbols(self):
         '''
         At this point self.vmcore had better be non-null.  This
@@ -219,6 +250,10 @@ class BTExtract(InteractivePlugin):
                     'file.') % self.plugin_name
             print msg
             raise Exception(msg)
+        if len(self._args) > 1 or os.path.isdir(
+                                        os.path.expanduser(self._args[0])):
+            self._check_vmcores()
+            return
         self._check_vmcore(self._args[0])
         try:
             self._find_debug_symbols()
@@ -235,17 +270,24 @@ class BTExtract(InteractivePlugin):
         self._submenu_opts = deque()
         self._sections = {}
 
+        if self.vmcores:
+            self._execute_vmcores_commands()
+            return
+
         # If we had to fallback on makedumpfile, lets run it.
         if self.mkdumpfilepath:
             self._mkdumpfile_log_fallback()
         else:
             try:
-                self._execute_bt_commands()
-            except Exception, e:
-                msg = _('ERROR: %s') % e
-                print msg
-                logger.log(logging.ERROR, msg)
-                raise e
+                try:
+                    self._execute_bt_commands()
+                except Exception, e:
+                    msg = _('ERROR: %s') % e
+                    print msg
+                    logger.log(logging.ERROR, msg)
+                    raise e
+            finally:
+                self.vmcore.close_crash_session()
 
         try:
             if self._options['casenumber']:
@@ -413,10 +455,14 @@ class BTExtract(InteractivePlugin):
             print msg
             logger.log(logging.ERROR, msg)
 
-    def _execute_bt_commands(self):
+    def _exe_crash_commands(self, commands):
+        return self.vmcore.exe_crash_commands(commands,
+                                              self._options['refresh'])
+
+    def _get_crash_commands(self):
         '''
-        A utility method which executes the BT commands specified by the
-        user.
+        Returns a list of the title and the crash commands of each section
+        of output requested by the user.
         '''
         if self._options['all']:
             self._options['exframe'] = True
@@ -426,74 +472,80 @@ class BTExtract(InteractivePlugin):
             self._options['files'] = True
 
         # Always do 'bt -a'
-        output = self.vmcore.exe_crash_commands('bt -a')
-        disp_opt = DisplayOption(_('Output from crash \'bt -a\''),
-                                 'interactive_action')
-        self._submenu_opts.append(disp_opt)
-        self._sections[disp_opt] = output
-
-        if common.is_interactive():
-            # Send to Shadowman
-            disp_opt = ObjectDisplayOption(_("Diagnose 'bt -a' output"),
-                                           '_send_to_shadowman',
-                                           output)
-            self._submenu_opts.append(disp_opt)
-            self._sections[disp_opt] = output
-
-            # Open a support case
-            disp_opt = ObjectDisplayOption(
-                                _("Open a support case with 'bt -a' output"),
-                                '_opencase',
-                                output)
-            self._submenu_opts.append(disp_opt)
-            self._sections[disp_opt] = output
-
+        commands = [(_('Output from crash \'bt -a\''), 'bt -a')]
         if self._options['exframe']:
-            output = self.vmcore.exe_crash_commands('bt -e')
-            disp_opt = DisplayOption(_('Output from crash \'bt -e\''),
-                                     'interactive_action')
-            self._submenu_opts.append(disp_opt)
-            self._sections[disp_opt] = output
-
+            commands.append((_('Output from crash \'bt -e\''), 'bt -e'))
         if self._options['foreachbt']:
-            output = self.vmcore.exe_crash_commands('foreach bt')
-            disp_opt = DisplayOption(_('Output from crash \'foreach bt\''),
-                                     'interactive_action')
-            self._submenu_opts.append(disp_opt)
-            self._sections[disp_opt] = output
-
+            commands.append((_('Output from crash \'foreach bt\''),
+                             'foreach bt'))
         if self._options['log']:
-            output = self.vmcore.exe_crash_commands('log')
-            disp_opt = DisplayOption(_('Output from crash \'log\''),
-                                     'interactive_action')
-            self._submenu_opts.append(disp_opt)
-            self._sections[disp_opt] = output
-
+            commands.append((_('Output from crash \'log\''), 'log'))
         if self._options['ps']:
-            output = self.vmcore.exe_crash_commands('ps')
-            disp_opt = DisplayOption(_('Output from crash \'ps\''),
-                                     'interactive_action')
-            self._submenu_opts.append(disp_opt)
-            self._sections[disp_opt] = output
-
+            commands.append((_('Output from crash \'ps\''), 'ps'))
         if self._options['files']:
-            output = self.vmcore.exe_crash_commands('files')
-            disp_opt = DisplayOption(_('Output from crash \'files\''),
-                                     'interactive_action')
-            self._submenu_opts.append(disp_opt)
-            self._sections[disp_opt] = output
-
+            commands.append((_('Output from crash \'files\''), 'files'))
         if self._options['cmdfile']:
             try:
                 file_contents = open(self._options['cmdfile'], 'r').read()
-                output = self.vmcore.exe_crash_commands(file_contents)
-                disp_opt = DisplayOption(_('Output from crash -i %s') % \
-                                         self._options['files'],
-                                         'interactive_action')
-                self._submenu_opts.append(disp_opt)
-                self._sections[disp_opt] = output
             except Exception, e:
                 msg = _('Problem opening %s. Error is: %s') % \
-                    (self._options['files'], e)
+                    (self._options['cmdfile'], e)
                 logger.log(logging.ERROR, msg)
                 raise Exception(msg)
+            commands.append((_('Output from crash -i %s') %
+                             self._options['cmdfile'], file_contents))
+        return commands
+
+    def _execute_bt_commands(self):
+        '''
+        A utility method which executes the BT commands specified by the
+        user.
+        '''
+        for title, commands in self._get_crash_commands():
+            output = self._exe_crash_commands(commands)
+            disp_opt = DisplayOption(title, 'interactive_action')
+            self._submenu_opts.append(disp_opt)
+            self._sections[disp_opt] = output
+
+            if commands == 'bt -a' and common.is_interactive():
+                # Send to Shadowman
+                disp_opt = ObjectDisplayOption(_("Diagnose 'bt -a' output"),
+                                               '_send_to_shadowman',
+                                               output)
+                self._submenu_opts.append(disp_opt)
+                self._sections[disp_opt] = output
+
+                # Open a support case
+                disp_opt = ObjectDisplayOption(
+                                _("Open a support case with 'bt -a' output"),
+                                '_opencase',
+                                output)
+                self._submenu_opts.append(disp_opt)
+                self._sections[disp_opt] = output
+
+    def _execute_vmcores_commands(self):
+        '''
+        A utility method which executes the BT commands specified by the
+        user on each of several core files in parallel, and makes a
+        section of each core file's output.
+        '''
+        commands = self._get_crash_commands()
+        results = vmcorehelper.run_crash_commands(
+                                    self.vmcores,
+                                    [command for title, command in commands],
+                                    self._options['refresh'],
+                                    self._options['jobs'])
+        for vmcore, kernel_version, outputs, error in results:
+            title = vmcore
+            if kernel_version:
+                title = '%s (%s)' % (vmcore, kernel_version)
+            doc = '%s\n%s\n%s\n' % (str(self.ruler * Constants.MAX_RULE),
+                                     title,
+                                     str(self.ruler * Constants.MAX_RULE))
+            if error:
+                doc += _('ERROR: %s\n') % error
+            for (heading, command), output in zip(commands, outputs):
+                doc += '\n%s\n%s\n' % (heading, output)
+            disp_opt = DisplayOption(title, 'interactive_action')
+            self._submenu_opts.append(disp_opt)
+            self._sections[disp_opt] = doc
@@ -149,6 +149,51 @@ class Config(Plugin):
            _('Path to the directory where kernel debug symbols should be '
              'downloaded and cached. Default=%s') %
             confighelper.ConfigHelper.DEFAULT_KERN_DEBUG_DIR)
+        options += " %-10s: %-67s\n" % ('analyzer_window_size',
+           _('The number of bytes of a file the analyze command parses at '
+             'a time.  Minimum=%d Default=%d') %
+            (confighelper.ConfigHelper.MIN_ANALYZER_WINDOW_SIZE,
+             confighelper.ConfigHelper.DEFAULT_ANALYZER_WINDOW_SIZE))
+        options += " %-10s: %-67s\n" % ('analyzer_jobs',
+           _('The number of processes the analyze command uses for a '
+             'directory or archive.  Default=the number of CPUs'))
+        options += " %-10s: %-67s\n" % ('analyzer_cache_size',
+           _('The number of bytes of analysis results to cache, or 0 to '
+             'disable the cache.  Default=%d') %
+            confighelper.ConfigHelper.DEFAULT_ANALYZER_CACHE_SIZE)
+        options += " %-10s: %-67s\n" % ('crash_cache_size',
+           _('The number of bytes of btextract crash output to cache, or 0 '
+             'to disable the cache.  Default=%d') %
+            confighelper.ConfigHelper.DEFAULT_CRASH_CACHE_SIZE)
+        options += " %-10s: %-67s\n" % ('debuginfo_index_ttl',
+           _('The number of seconds the local index of the debug '
+             'repositories is used before it is refreshed, or 0 to always '
+             'search the repositories.  Default=%d') %
+            confighelper.ConfigHelper.DEFAULT_DEBUGINFO_INDEX_TTL)
+        options += " %-10s: %-67s\n" % ('kern_debug_max_size',
+           _('The number of bytes of vmlinux images kept in '
+             'kern_debug_dir, the least recently used are removed when '
+             'more are downloaded, or 0 for no limit.  Default=%d') %
+            confighelper.ConfigHelper.DEFAULT_KERN_DEBUG_MAX_SIZE)
+        options += " %-10s: %-67s\n" % ('kern_debug_max_count',
+           _('The number of vmlinux images kept in kern_debug_dir, the '
+             'least recently used are removed when more are downloaded, or '
+             '0 for no limit.  Default=%d') %
+            confighelper.ConfigHelper.DEFAULT_KERN_DEBUG_MAX_COUNT)
+        options += " %-10s: %-67s\n" % ('reference_cache_ttl',
+           _('The number of seconds products, versions, severities, types, '
+             'statuses and case groups are cached for, or 0 to disable the '
+             'cache.  Setting it clears the cache.  Default=%d, %d for '
+             'case groups') % (common.REFERENCE_TTLS['products'],
+                               common.REFERENCE_TTLS['groups']))
+        options += " %-10s: %-67s\n" % ('page_fetch_jobs',
+           _('The number of pages of results listcases and search fetch at '
+             'once in non-interactive mode.  Default=%d') %
+            confighelper.ConfigHelper.DEFAULT_PAGE_FETCH_JOBS)
+        options += " %-10s: %-67s\n" % ('api_pool_size',
+           _('The number of idle connections to the API kept alive for '
+             'reuse.  0 disables keep-alive.  Default=%d') %
+            confighelper.ConfigHelper.DEFAULT_API_POOL_SIZE)
 
         return options
 
@@ -249,6 +294,185 @@ class Config(Plugin):
                 value=kern_debug_dir, persist=True,
                 global_config=global_config)
 
+    @classmethod
+    def config_get_analyzer_window_size(cls):
+        cfg = confighelper.get_config_helper()
+        return cfg.get(section='RHHelp', option='analyzer_window_size')
+
+    @classmethod
+    def config_set_analyzer_window_size(cls, window_size,
+                                        global_config=False):
+        try:
+            if int(window_size) <= 0:
+                raise ValueError
+        except ValueError:
+            raise EmptyValueError(_('%s is not a valid number of bytes.') %
+                                  window_size)
+        # The window has to hold the longest symptom a few times over.
+        if int(window_size) < confighelper.ConfigHelper.MIN_ANALYZER_WINDOW_SIZE:
+            raise EmptyValueError(_('The analyzer window must be at least %d '
+                                    'bytes.') %
+                    confighelper.ConfigHelper.MIN_ANALYZER_WINDOW_SIZE)
+        cfg = confighelper.get_config_helper()
+        cfg.set(section='RHHelp', option='analyzer_window_size',
+                value=window_size, persist=True, global_config=global_config)
+
+    @classmethod
+    def config_get_analyzer_jobs(cls):
+        cfg = confighelper.get_config_helper()
+        return cfg.get(section='RHHelp', option='analyzer_jobs')
+
+    @classmethod
+    def config_set_analyzer_jobs(cls, jobs, global_config=False):
+        try:
+            if int(jobs) <= 0:
+                raise ValueError
+        except ValueError:
+            raise EmptyValueError(_('%s is not a valid number of processes.')
+                                  % jobs)
+        cfg = confighelper.get_config_helper()
+        cfg.set(section='RHHelp', option='analyzer_jobs', value=jobs,
+                persist=True, global_config=global_config)
+
+    @classmethod
+    def config_get_analyzer_cache_size(cls):
+        cfg = confighelper.get_config_helper()
+        return cfg.get(section='RHHelp', option='analyzer_cache_size')
+
+    @classmethod
+    def config_set_analyzer_cache_size(cls, cache_size, global_config=False):
+        try:
+            if int(cache_size) < 0:
+                raise ValueError
+        except ValueError:
+            raise EmptyValueError(_('%s is not a valid number of bytes.') %
+                                  cache_size)
+        cfg = confighelper.get_config_helper()
+        cfg.set(section='RHHelp', option='analyzer_cache_size',
+                value=cache_size, persist=True, global_config=global_config)
+
+    @classmethod
+    def config_get_crash_cache_size(cls):
+        cfg = confighelper.get_config_helper()
+        return cfg.get(section='RHHelp', option='crash_cache_size')
+
+    @classmethod
+    def config_set_crash_cache_size(cls, cache_size, global_config=False):
+        try:
+            if int(cache_size) < 0:
+                raise ValueError
+        except ValueError:
+            raise EmptyValueError(_('%s is not a valid number of bytes.') %
+                                  cache_size)
+        cfg = confighelper.get_config_helper()
+        cfg.set(section='RHHelp', option='crash_cache_size',
+                value=cache_size, persist=True, global_config=global_config)
+
+    @classmethod
+    def config_get_debuginfo_index_ttl(cls):
+        cfg = confighelper.get_config_helper()
+        return cfg.get(section='RHHelp', option='debuginfo_index_ttl')
+
+    @classmethod
+    def config_set_debuginfo_index_ttl(cls, ttl, global_config=False):
+        try:
+            if int(ttl) < 0:
+                raise ValueError
+        except ValueError:
+            raise EmptyValueError(_('%s is not a valid number of seconds.') %
+                                  ttl)
+        cfg = confighelper.get_config_helper()
+        cfg.set(section='RHHelp', option='debuginfo_index_ttl',
+                value=ttl, persist=True, global_config=global_config)
+
+    @classmethod
+    def config_get_kern_debug_max_size(cls):
+        cfg = confighelper.get_config_helper()
+        return cfg.get(section='RHHelp', option='kern_debug_max_size')
+
+    @classmethod
+    def config_set_kern_debug_max_size(cls, max_size, global_config=False):
+        try:
+            if int(max_size) < 0:
+                raise ValueError
+        except ValueError:
+            raise EmptyValueError(_('%s is not a valid number of bytes.') %
+                                  max_size)
+        cfg = confighelper.get_config_helper()
+        cfg.set(section='RHHelp', option='kern_debug_max_size',
+                value=max_size, persist=True, global_config=global_config)
+
+    @classmethod
+    def config_get_kern_debug_max_count(cls):
+        cfg = confighelper.get_config_helper()
+        return cfg.get(section='RHHelp', option='kern_debug_max_count')
+
+    @classmethod
+    def config_set_kern_debug_max_count(cls, max_count, global_config=False):
+        try:
+            if int(max_count) < 0:
+                raise ValueError
+        except ValueError:
+            raise EmptyValueError(_('%s is not a valid number of images.') %
+                                  max_count)
+        cfg = confighelper.get_config_helper()
+        cfg.set(section='RHHelp', option='kern_debug_max_count',
+                value=max_count, persist=True, global_config=global_config)
+
+    @classmethod
+    def config_get_reference_cache_ttl(cls):
+        cfg = confighelper.get_config_helper()
+        return cfg.get(section='RHHelp', option='reference_cache_ttl')
+
+    @classmethod
+    def config_set_reference_cache_ttl(cls, ttl, global_config=False):
+        try:
+            if int(ttl) < 0:
+                raise ValueError
+        except ValueError:
+            raise EmptyValueError(_('%s is not a valid number of seconds.') %
+                                  ttl)
+        cfg = confighelper.get_config_helper()
+        cfg.set(section='RHHelp', option='reference_cache_ttl',
+                value=ttl, persist=True, global_config=global_config)
+        # Setting the option, even to its current value, refreshes the
+        # cached reference data.
+        common.clear_reference_cache()
+
+    @classmethod
+    def config_get_page_fetch_jobs(cls):
+        cfg = confighelper.get_config_helper()
+        return cfg.get(section='RHHelp', option='page_fetch_jobs')
+
+    @classmethod
+    def config_set_page_fetch_jobs(cls, jobs, global_config=False):
+        try:
+            if int(jobs) < 1:
+                raise ValueError
+        except ValueError:
+            raise EmptyValueError(_('%s is not a valid number of pages.') %
+                                  jobs)
+        cfg = confighelper.get_config_helper()
+        cfg.set(section='RHHelp', option='page_fetch_jobs',
+                value=jobs, persist=True, global_config=global_config)
+
+    @classmethod
+    def config_get_api_pool_size(cls):
+        cfg = confighelper.get_config_helper()
+        return cfg.get(section='RHHelp', option='api_pool_size')
+
+    @classmethod
+    def config_set_api_pool_size(cls, size, global_config=False):
+        try:
+            if int(size) < 0:
+                raise ValueError
+        except ValueError:
+            raise EmptyValueError(_('%s is not a valid number of '
+                                    'connections.') % size)
+        cfg = confighelper.get_config_helper()
+        cfg.set(section='RHHelp', option='api_pool_size',
+                value=size, persist=True, global_config=global_config)
+
 
 
     #
@@ -159,7 +159,6 @@ class ListKernelDebugs(InteractivePlugin):
                 raise Exception(_('This command requires root user '
                                   'privileges.'))
             self.yumhelper = YumDownloadHelper()
-            self.yumhelper.setup_debug_repos()
             self.pkgAry = self.yumhelper.find_package(self.yumquery)
             if not self.pkgAry:
                 raise EmptyValueError(
@@ -168,10 +167,7 @@ class ListKernelDebugs(InteractivePlugin):
                                     ', '.join(self.yumhelper.get_repoids())))
 
             for pkg in self.pkgAry:
-                if hasattr(pkg, 'evr'):
-                    pkgevr = pkg.evr
-                else:
-                    pkgevr = "%s:%s-%s" % (pkg.epoch, pkg.version, pkg.release)
+                pkgevr = self._get_evr(pkg)
                 doc = u''
                 doc += '%-40s %-20s %-16s' % (pkg.name, pkgevr, pkg.repoid)
                 disp_opt_doc = u'%s-%s (%s)' % (pkg.name, pkgevr, pkg.repoid)
@@ -194,7 +190,23 @@ class ListKernelDebugs(InteractivePlugin):
             logger.log(logging.ERROR, msg)
             raise
 
+    def _get_evr(self, pkg):
+        if hasattr(pkg, 'evr'):
+            return pkg.evr
+        else:
+            return "%s:%s-%s" % (pkg.epoch, pkg.version, pkg.release)
+
     def non_interactive_action(self):
+        if common.is_jsonl_output():
+            for opt in self._submenu_opts:
+                pkg = opt.stored_obj['package']
+                common.write_jsonl({'name': pkg.name,
+                                    'evr': self._get_evr(pkg),
+                                    'arch': pkg.arch,
+                                    'repoid': pkg.repoid,
+                                    'size': pkg.size})
+            return
+
         doc = u''
         doc += '%-40s %-20s %-16s\n' % ("Name", "Version", "Repository")
 
@@ -19,7 +19,8 @@ from optparse import Option
 from redhat_support_tool.helpers.confighelper import EmptyValueError, _
 from redhat_support_tool.plugins import Plugin
 from redhat_support_tool.helpers.yumdownloadhelper import YumDownloadHelper, \
-                                                          NoReposError
+                                                          NoReposError, \
+                                                          DEFAULT_DOWNLOAD_JOBS
 import logging
 import redhat_support_tool.helpers.confighelper as confighelper
 import os
@@ -74,8 +75,9 @@ class GetKernelDebugPackages(Plugin):
         return _("""Examples:
   - %s 2.6.32-343.el6
   - %s 2.6.18-128.*
-  - %s -t xen 2.6.18-348.el5""") \
-  % (cls.plugin_name, cls.plugin_name, cls.plugin_name)
+  - %s -t xen 2.6.18-348.el5
+  - %s -j 8 2.6.32-*.el6""") \
+  % (cls.plugin_name, cls.plugin_name, cls.plugin_name, cls.plugin_name)
 
     @classmethod
     def get_options(cls):
@@ -112,7 +114,12 @@ class GetKernelDebugPackages(Plugin):
                     default=False),
                 Option("-t", "--variant", dest="variant",
                        help=_('Select an alternative kernel variant'),
-                       metavar=_('VARIANT'))]
+                       metavar=_('VARIANT')),
+                Option("-j", "--jobs", dest="jobs", type="int",
+                       help=_('The number of packages to download at once. '
+                              '(default=%d)') %
+                       DEFAULT_DOWNLOAD_JOBS,
+                       default=None)]
 
     def insert_obj(self, yumdict):
         '''
@@ -134,6 +141,8 @@ class GetKernelDebugPackages(Plugin):
                 raise Exception(msg)
         # Otherwise, build a search string:
         else:
+            # The rest of the line, without the options, is the version.
+            self._line = ' '.join(self._args)
             if self._options['variant']:
                 self.yumquery = 'kernel-%s-debuginfo-%s' % \
                     (self._options['variant'], self._line)
@@ -147,7 +156,6 @@ class GetKernelDebugPackages(Plugin):
                                   'privileges.'))
             if len(self.pkgAry) == 0:
                 self.yumhelper = YumDownloadHelper()
-                self.yumhelper.setup_debug_repos()
                 self.pkgAry = self.yumhelper.find_package(self.yumquery)
                 if not self.pkgAry:
                     raise EmptyValueError(
@@ -181,7 +189,8 @@ class GetKernelDebugPackages(Plugin):
                         print _('Canceling')
                         return
                 # Start installing'
-                extpaths = self.yumhelper.extractKernelDebugs(self.pkgAry)
+                extpaths = self.yumhelper.extractKernelDebugs(
+                                        self.pkgAry, self._options['jobs'])
                 for extractedpkg in extpaths:
                     print _('Kernel vmlinux file for %s was '
                             'extracted to %s') % (extractedpkg['package'],
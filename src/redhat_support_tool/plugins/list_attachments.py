@@ -39,6 +39,10 @@ class ListAttachments(InteractivePlugin):
     ALL = _("Display all attachments")
     _submenu_opts = None
     _sections = None
+
+    # The fields of each attachment written by --format jsonl.
+    RECORD_FIELDS = ('uuid', 'fileName', 'description', 'length',
+                     'createdBy', 'createdDate', 'uri')
     case = None
     aAry = None
 
@@ -118,7 +122,9 @@ class ListAttachments(InteractivePlugin):
         try:
             api = apihelper.get_api()
             self.aAry = api.attachments.list(self.case)
-            if not self._parse_cases():
+            # In --format jsonl the records are written straight from the
+            # attachments.
+            if not common.is_jsonl_output() and not self._parse_cases():
                 raise Exception()
         except EmptyValueError, eve:
             msg = _('ERROR: %s') % str(eve)
@@ -144,6 +150,11 @@ class ListAttachments(InteractivePlugin):
             raise
 
     def non_interactive_action(self):
+        if common.is_jsonl_output():
+            for val in self.aAry:
+                common.write_jsonl(common.get_record(val, self.RECORD_FIELDS))
+            return
+
         doc = u''
         for opt in self._submenu_opts:
             if opt.display_text != self.ALL:
@@ -18,6 +18,7 @@
 from redhat_support_tool.plugins import Plugin
 from redhat_support_tool.helpers.common import get_groups
 from redhat_support_tool.helpers.confighelper import _
+import redhat_support_tool.helpers.common as common
 
 __author__ = 'Keith Robertson <kroberts@redhat.com>'
 
@@ -66,4 +67,8 @@ class ListCaseGroup(Plugin):
     def non_interactive_action(self):
         ary = get_groups()
         for p in ary:
-            print p.get_name()
+            if common.is_jsonl_output():
+                common.write_jsonl({'number': p.get_number(),
+                                    'name': p.get_name()})
+            else:
+                print p.get_name()
@@ -30,7 +30,9 @@ import pydoc
 import redhat_support_tool.helpers.common as common
 import redhat_support_tool.helpers.apihelper as apihelper
 import redhat_support_tool.helpers.confighelper as confighelper
+import redhat_support_tool.helpers.pagefetcher as pagefetcher
 import logging
+import sys
 
 __author__ = 'Keith Robertson <kroberts@redhat.com>'
 logger = logging.getLogger("redhat_support_tool.plugins.list_cases")
@@ -44,14 +46,18 @@ class ListCases(InteractivePlugin):
 
     _submenu_opts = None
     _sections = None
+    _fetcher = None
     casesAry = None
 
     # Help should not print the option list
     help_is_options = False
 
-    # Record the last offset value used with the API, and the maximum results
-    # we should display for one search query.
-    _nextOffset = 0
+    # The fields of each case written by --format jsonl.
+    RECORD_FIELDS = ('caseNumber', 'summary', 'status', 'severity', 'product',
+                     'version', 'type', 'owner', 'createdDate',
+                     'lastModifiedDate', 'uri', 'view_uri')
+
+    # The maximum results we should display for one search query.
     _MAX_OFFSET = confighelper.get_config_helper().get(option='max_results')
     _MAX_OFFSET = 1500 if not _MAX_OFFSET else int(_MAX_OFFSET)
     _limit = 50 if _MAX_OFFSET >= 50 else _MAX_OFFSET
@@ -266,26 +272,13 @@ class ListCases(InteractivePlugin):
         return self._submenu_opts
 
     def get_more_options(self, num_options):
-        if (len(self.casesAry) < self._nextOffset or
-            len(self.casesAry) == 0 or
-            self._nextOffset > self._MAX_OFFSET):
-            # Either we did not max out on results last time, there were
-            # no results last time, or we have seen more than _MAX_OFFSET
-            # results.
-            # In the instance of cases, the maximum a single query can
-            # retrieve is 1500 cases, hence MAX_OFFSET is set to 1450
+        # The next page is fetched in the background while the previous one
+        # is displayed, so it's always a full page rather than num_options.
+        # In the instance of cases, the maximum a single query can retrieve
+        # is 1500 cases.
+        if not self._fetcher:
             return False
-
-        # Strata introduces an issue where if the limit > 50, it will only
-        # return 50 results. This creates a potential issue if the terminal
-        # size is greater than 53.
-        limit = self._get_limit()
-        if num_options > limit:
-            num_options = limit
-
-        searchopts = {'count': num_options, 'start': self._nextOffset}
-        self._nextOffset += num_options
-        newresults = self._get_cases(searchopts)
+        newresults = self._fetcher.next_page()
 
         if len(newresults) == 0:
             return False
@@ -300,36 +293,87 @@ class ListCases(InteractivePlugin):
 
         searchopts = {'count': self._limit, 'start': 0}
         self.casesAry = self._get_cases(searchopts)
-        self._nextOffset = self._limit
 
-        if not self._parse_cases(self.casesAry):
+        if common.is_jsonl_output():
+            # The records are written straight from the cases.
+            parsed = len(self.casesAry) > 0
+        else:
+            parsed = self._parse_cases(self.casesAry)
+        if not parsed:
             msg = _("Unable to find cases")
             print msg
             logger.log(logging.WARNING, msg)
             raise Exception()
 
-        if not common.is_interactive():
-            while self.get_more_options(self._limit):
-                continue
+        # Strata introduces an issue where if the limit > 50, it will only
+        # return 50 results, so the rest are fetched a page of _limit at a
+        # time: one page ahead of the user in interactive mode, otherwise
+        # several at once, and written by non_interactive_action as they
+        # arrive.
+        if len(self.casesAry) < self._limit:
+            self._fetcher = None
+        elif common.is_interactive():
+            self._fetcher = pagefetcher.PageFetcher(
+                        self._fetch_page, self._limit, self._limit,
+                        self._MAX_OFFSET)
+        else:
+            self._fetcher = pagefetcher.PageFetcher(
+                        self._fetch_page, self._limit, self._limit,
+                        self._MAX_OFFSET, pagefetcher.get_jobs())
 
     def non_interactive_action(self):
-        doc = u''
+        if common.is_jsonl_output():
+            self._write_records()
+            return
+
+        # Each page of cases is written as soon as it has arrived, rather
+        # than keeping them all to write at the end.
+        while True:
+            self._write_sections()
+            if not self._fetcher:
+                break
+            newresults = self._fetcher.next_page()
+            if not newresults or not self._parse_cases(newresults):
+                break
+        print
+
+    def _write_records(self):
+        '''
+        Writes each case as a line of JSON, a page at a time as they arrive.
+        '''
+        newresults = self.casesAry
+        while newresults:
+            for val in newresults:
+                common.write_jsonl(common.get_record(val, self.RECORD_FIELDS))
+            sys.stdout.flush()
+            if not self._fetcher:
+                break
+            newresults = self._fetcher.next_page()
+
+    def _write_sections(self):
+        '''
+        Writes the sections of the parsed cases, then forgets them.
+        '''
         for opt in self._submenu_opts:
-            if opt.display_text != self.ALL:
-                doc += self._sections[opt]
-        try:
-            print doc.encode("UTF-8", 'replace')
-        except Exception, e:
-            # There are some truly bizarre errors when you pipe
-            # the output from python's 'print' function with sys encoding
-            # set to ascii. These errors seem to manifes when you pipe
-            # to something like 'more' or 'less'.  You'll get encoding errors.
-            # Curiously, you don't see them with 'grep' or even simply piping
-            # to terminal.  WTF :(
-            logger.log(logging.WARNING, e)
-            import sys
-            print doc.encode(sys.getdefaultencoding(),
-                             'replace')
+            if opt.display_text == self.ALL:
+                continue
+            doc = self._sections[opt]
+            try:
+                sys.stdout.write(doc.encode("UTF-8", 'replace'))
+            # pylint: disable=W0703
+            except Exception, e:
+                # There are some truly bizarre errors when you pipe
+                # the output from python's 'print' function with sys encoding
+                # set to ascii. These errors seem to manifes when you pipe
+                # to something like 'more' or 'less'.  You'll get encoding
+                # errors. Curiously, you don't see them with 'grep' or even
+                # simply piping to terminal.  WTF :(
+                logger.log(logging.WARNING, e)
+                sys.stdout.write(doc.encode(sys.getdefaultencoding(),
+                                            'replace'))
+        sys.stdout.flush()
+        self._submenu_opts.clear()
+        self._sections.clear()
 
     def interactive_action(self, display_option=None):
         if display_option.display_text == self.ALL:
@@ -430,7 +474,5 @@ class ListCases(InteractivePlugin):
             logger.log(logging.WARNING, msg)
             raise
 
-    def _get_limit(self):
-        limit = self._limit
-        remaining = self._MAX_OFFSET - self._nextOffset
-        return limit if remaining >= limit else remaining % limit
+    def _fetch_page(self, offset, count):
+        return self._get_cases({'count': count, 'start': offset})
@@ -22,6 +22,7 @@ from redhat_support_tool.helpers.confighelper import _
 from redhat_support_tool.helpers.confighelper import EmptyValueError
 from redhat_support_tool.plugins import InteractivePlugin, DisplayOption
 from redhat_support_tool.helpers.constants import Constants
+from redhat_support_tool.helpers import common
 import pydoc
 import redhat_support_tool.helpers.apihelper as apihelper
 import logging
@@ -35,6 +36,10 @@ class ListEntitlements(InteractivePlugin):
     ALL = _("Display all entitlements")
     _submenu_opts = None
     _sections = None
+
+    # The fields of each entitlement written by --format jsonl.
+    RECORD_FIELDS = ('name', 'serviceLevel', 'sla', 'supportLevel',
+                     'startDate', 'endDate')
     _entitlementsAry = None
 
     @classmethod
@@ -91,7 +96,11 @@ class ListEntitlements(InteractivePlugin):
         try:
             api = apihelper.get_api()
             self._entitlementsAry = api.entitlements.list()
-            if not self._parse_entitlements():
+            if common.is_jsonl_output():
+                # The records are written straight from the entitlements.
+                if not self._entitlementsAry:
+                    raise Exception()
+            elif not self._parse_entitlements():
                 raise Exception()
 
         except EmptyValueError, eve:
@@ -118,6 +127,11 @@ class ListEntitlements(InteractivePlugin):
             raise
 
     def non_interactive_action(self):
+        if common.is_jsonl_output():
+            for val in self._entitlementsAry:
+                common.write_jsonl(common.get_record(val, self.RECORD_FIELDS))
+            return
+
         doc = u''
         for opt in self._submenu_opts:
             if opt.display_text != self.ALL:
@@ -18,11 +18,14 @@
 from collections import deque
 from redhat_support_tool.helpers.confighelper import _
 from redhat_support_tool.helpers.vmcorehelper import VMLinux, \
-    list_extracted_vmlinuxes
-from redhat_support_tool.plugins import InteractivePlugin, DisplayOption
+    get_vmlinux_usage
+from redhat_support_tool.plugins import InteractivePlugin, \
+    ObjectDisplayOption
 import logging
 import os
+import redhat_support_tool.helpers.common as common
 import redhat_support_tool.helpers.confighelper as confighelper
+import time
 
 
 __author__ = 'Nigel Jones <nigjones@redhat.com>'
@@ -94,17 +97,37 @@ class ListKernelDebugs(InteractivePlugin):
         kernelext_dir = confighelper.get_config_helper().get(
                                             option='kern_debug_dir')
 
-        image_list = list_extracted_vmlinuxes(kernelext_dir)
+        image_list = get_vmlinux_usage(kernelext_dir)
 
         if len(image_list) == 0:
             msg = _('No vmlinux images were found in %s' % (kernelext_dir))
             print msg
             raise Exception(msg)
 
-        for pkg in image_list:
-            self._submenu_opts.append(DisplayOption(pkg, 'interactive_action'))
+        # Most recently used first, the least recently used are the first
+        # to be removed when kern_debug_dir is over its quota.
+        image_list.reverse()
+        for pkg, size, last_used in image_list:
+            disp_opt_doc = '%-50s %6d MB  %s' % \
+                (pkg, size / 1024 / 1024, _format_time(last_used))
+            self._submenu_opts.append(ObjectDisplayOption(
+                                disp_opt_doc, 'interactive_action',
+                                (pkg, size, last_used)))
 
     def non_interactive_action(self):
+        if common.is_jsonl_output():
+            kernelext_dir = confighelper.get_config_helper().get(
+                                            option='kern_debug_dir')
+            for image in self._submenu_opts:
+                pkg, size, last_used = image.stored_obj
+                common.write_jsonl({'package': pkg,
+                                    'path': os.path.join(kernelext_dir, pkg,
+                                                         'vmlinux'),
+                                    'size': size,
+                                    'last_used': last_used})
+            return
+
+        print '%-50s %9s  %s' % (_('Image'), _('Size'), _('Last used'))
         for image in self._submenu_opts:
             try:
                 print image.display_text.encode("UTF-8", 'replace')
@@ -122,7 +145,7 @@ class ListKernelDebugs(InteractivePlugin):
                                    'replace')
 
     def interactive_action(self, display_option=None):
-        pkgname = display_option.display_text
+        pkgname, size, last_used = display_option.stored_obj
         kernelext_dir = confighelper.get_config_helper().get(
                                             option='kern_debug_dir')
         doc = u''
@@ -134,7 +157,8 @@ class ListKernelDebugs(InteractivePlugin):
                 doc += _('Information for %s\n' % (pkgname))
                 doc += _(' uname -r string: %s\n' % (vmlinux.get_version()))
                 doc += _(' Location: %s\n' % (vmlinuxpath))
-                doc += _(' Size: %d bytes' % (os.stat(vmlinuxpath).st_size))
+                doc += _(' Size: %d bytes\n' % (size))
+                doc += _(' Last used: %s' % (_format_time(last_used)))
                 try:
                     print doc.encode("UTF-8", 'replace')
                 # pylint: disable=W0703
@@ -147,3 +171,7 @@ class ListKernelDebugs(InteractivePlugin):
                 raise Exception()
         else:
             raise Exception()
+
+
+def _format_time(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp))
@@ -18,6 +18,7 @@
 from redhat_support_tool.plugins import Plugin
 from redhat_support_tool.helpers.common import get_products
 from redhat_support_tool.helpers.confighelper import _
+import redhat_support_tool.helpers.common as common
 
 __author__ = 'Spenser Shumaker <sshumake@redhat.com>'
 
@@ -66,4 +67,7 @@ class ListCaseGroup(Plugin):
     def non_interactive_action(self):
         ary = get_products()
         for p in ary:
-            print p.get_name()
+            if common.is_jsonl_output():
+                common.write_jsonl({'name': p.get_name()})
+            else:
+                print p.get_name()
@@ -93,7 +93,11 @@ class ListVersions(Plugin):
                 if product.get_name().lower() == self._line.lower():
                     inArray = True
                     for version in product.get_versions():
-                        print version
+                        if common.is_jsonl_output():
+                            common.write_jsonl({'product': product.get_name(),
+                                                'version': version})
+                        else:
+                            print version
                     break
             if not inArray:
                 print msg
@@ -20,7 +20,8 @@ from fnmatch import fnmatch
 from optparse import Option
 from redhat_support_tool.helpers import common
 from redhat_support_tool.helpers.confighelper import _
-from redhat_support_tool.helpers.vmcorehelper import list_extracted_vmlinuxes
+from redhat_support_tool.helpers.vmcorehelper import \
+    list_extracted_vmlinuxes, unindex_vmlinuxes
 from redhat_support_tool.plugins import InteractivePlugin, DisplayOption
 import logging
 import os
@@ -196,6 +197,7 @@ class RemKernelDebugs(InteractivePlugin):
             if kpath != kernelext_dir and os.path.exists(kpath):
                 try:
                     shutil.rmtree(kpath)
+                    unindex_vmlinuxes(kernelext_dir, kpath)
                 # pylint: disable=W0702
                 except:
                     failedkernels.append(kernel.display_text)
@@ -25,11 +25,13 @@ from redhat_support_tool.plugins import InteractivePlugin, ObjectDisplayOption
 from redhat_support_tool.helpers.constants import Constants
 from redhat_support_tool.helpers import common
 from redhat_support_tool.helpers import confighelper
+from redhat_support_tool.helpers import pagefetcher
 from redhat_support_tool.helpers.launchhelper import LaunchHelper
 from redhat_support_tool.plugins.kb import Kb
 import redhat_support_tool.helpers.apihelper as apihelper
 import logging
 import re
+import sys
 
 
 __author__ = 'Keith Robertson <kroberts@redhat.com>'
@@ -63,10 +65,12 @@ class Search(InteractivePlugin):
     _submenu_opts = None
     _sections = None
     _solAry = None
+    _fetcher = None
 
-    # Record the last offset value used with the API, and the maximum results
-    # we should display for one search query.
-    _nextOffset = 0
+    # The fields of each solution written by --format jsonl.
+    RECORD_FIELDS = ('id', 'title', 'abstract', 'kcsState', 'uri', 'view_uri')
+
+    # The maximum results we should display for one search query.
     _MAX_OFFSET = confighelper.get_config_helper().get(option='max_results')
     _MAX_OFFSET = 500 if not _MAX_OFFSET else int(_MAX_OFFSET)
     _limit = 50 if _MAX_OFFSET >= 50 else _MAX_OFFSET
@@ -145,24 +149,11 @@ class Search(InteractivePlugin):
         return self._submenu_opts
 
     def get_more_options(self, num_options):
-        if (len(self._solAry) < self._nextOffset or
-            len(self._solAry) == 0 or
-            self._nextOffset >= self._MAX_OFFSET):
-            # Either we did not max out on results last time, there were
-            # no results last time, or we have seen more than _MAX_OFFSET
-            # results.
+        # The next page is fetched in the background while the previous one
+        # is displayed, so it's always a full page rather than num_options.
+        if not self._fetcher:
             return False
-
-        # Strata introduces an issue where if the limit > 50, it will only
-        # return 50 results. This creates a potential issue if the terminal
-        # size is greater than 53.
-        limit = self._get_limit()
-        if num_options > limit:
-            num_options = limit
-
-        searchopts = {'limit': num_options, 'offset': self._nextOffset}
-        self._nextOffset += num_options
-        newresults = self._get_solutions(searchopts)
+        newresults = self._fetcher.next_page()
 
         if len(newresults) == 0:
             return False
@@ -190,36 +181,87 @@ class Search(InteractivePlugin):
         self._sections = {}
 
         searchopts = {'limit': self._limit, 'offset': 0}
-        self._nextOffset = self._limit
         self._solAry = self._get_solutions(searchopts)
 
-        if not self._parse_solutions(self._solAry):
+        if common.is_jsonl_output():
+            # The records are written straight from the solutions.
+            parsed = len(self._solAry) > 0
+        else:
+            parsed = self._parse_solutions(self._solAry)
+        if not parsed:
             msg = _("Unable to find solutions")
             print msg
             logger.log(logging.WARNING, msg)
             raise Exception()
 
-        if not common.is_interactive():
-            while self.get_more_options(self._limit):
-                continue
+        # Strata introduces an issue where if the limit > 50, it will only
+        # return 50 results, so the rest are fetched a page of _limit at a
+        # time: one page ahead of the user in interactive mode, otherwise
+        # several at once, and written by non_interactive_action as they
+        # arrive.
+        if len(self._solAry) < self._limit:
+            self._fetcher = None
+        elif common.is_interactive():
+            self._fetcher = pagefetcher.PageFetcher(
+                        self._fetch_page, self._limit, self._limit,
+                        self._MAX_OFFSET)
+        else:
+            self._fetcher = pagefetcher.PageFetcher(
+                        self._fetch_page, self._limit, self._limit,
+                        self._MAX_OFFSET, pagefetcher.get_jobs())
 
     def non_interactive_action(self):
-        doc = u''
+        if common.is_jsonl_output():
+            self._write_records()
+            return
+
+        # Each page of solutions is written as soon as it has arrived,
+        # rather than keeping them all to write at the end.
+        while True:
+            self._write_sections()
+            if not self._fetcher:
+                break
+            newresults = self._fetcher.next_page()
+            if not newresults or not self._parse_solutions(newresults):
+                break
+        print
+
+    def _write_records(self):
+        '''
+        Writes each solution as a line of JSON, a page at a time as they
+        arrive.
+        '''
+        newresults = self._solAry
+        while newresults:
+            for val in newresults:
+                common.write_jsonl(common.get_record(val, self.RECORD_FIELDS))
+            sys.stdout.flush()
+            if not self._fetcher:
+                break
+            newresults = self._fetcher.next_page()
+
+    def _write_sections(self):
+        '''
+        Writes the sections of the parsed solutions, then forgets them.
+        '''
         for opt in self._submenu_opts:
-            doc += self._sections[opt]
-        try:
-            print doc.encode("UTF-8", 'replace')
-        # pylint: disable=W0703
-        except Exception, e:
-            # There are some truly bizarre errors when you pipe
-            # the output from python's 'print' function with sys encoding
-            # set to ascii. These errors seem to manifes when you pipe
-            # to something like 'more' or 'less'.  You'll get encoding
-            # errors. Curiously, you don't see them with 'grep' or even
-            # simply piping to terminal.  WTF :(
-            logger.log(logging.WARNING, e)
-            import sys
-            print doc.encode(sys.getdefaultencoding(), 'replace')
+            doc = self._sections[opt]
+            try:
+                sys.stdout.write(doc.encode("UTF-8", 'replace'))
+            # pylint: disable=W0703
+            except Exception, e:
+                # There are some truly bizarre errors when you pipe
+                # the output from python's 'print' function with sys encoding
+                # set to ascii. These errors seem to manifes when you pipe
+                # to something like 'more' or 'less'.  You'll get encoding
+                # errors. Curiously, you don't see them with 'grep' or even
+                # simply piping to terminal.  WTF :(
+                logger.log(logging.WARNING, e)
+                sys.stdout.write(doc.encode(sys.getdefaultencoding(),
+                                            'replace'))
+        sys.stdout.flush()
+        self._submenu_opts.clear()
+        self._sections.clear()
 
     def interactive_action(self, display_option=None):
         solution_id = None
@@ -319,7 +361,5 @@ class Search(InteractivePlugin):
             return True
         return False
 
-    def _get_limit(self):
-        limit = self._limit
-        remaining = self._MAX_OFFSET - self._nextOffset
-        return limit if (remaining) >= limit else (remaining) % limit
\ No newline at end of file
+    def _fetch_page(self, offset, count):
+        return self._get_solutions({'limit': count, 'offset': offset})
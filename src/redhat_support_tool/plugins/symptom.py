@@ -30,7 +30,6 @@ import pydoc
 # pylint: disable=W0402
 import string
 import tempfile
-import redhat_support_tool.symptoms as symptoms
 import redhat_support_tool.helpers.apihelper as apihelper
 
 __author__ = 'Dan Varga <dvarga@redhat.com>'
@@ -66,7 +65,7 @@ class Symptom(InteractivePlugin, HiddenCommand):
     # Let's make sure we have symptoms to do some work on though
     def validate_args(self):
         # Check for required arguments.
-        if symptoms.AnalyzerPlugin.symptoms:
+        if self.symptom:
             return True
         else:
             raise Exception("No symptoms found, run analyze first")
@@ -19,7 +19,12 @@ try:
     from pyparsing import line, lineno, col
 except ImportError:
     from redhat_support_tool.tools.pyparsing import line, lineno, col
+import bisect
 import inspect
+try:
+    from hashlib import sha1
+except ImportError:
+    from sha import new as sha1
 
 __author__ = 'Dan Varga <dvarga@redhat.com>'
 __author__ = 'Keith Robertson <kroberts@redhat.com>'
@@ -31,8 +36,6 @@ class AnalyzerPlugin(object):
     Defines the methods all Analyzer plugins must implement
     '''
 
-    symptoms = []
-    deduper = None
     # Display name for symptom plugin
 
     @classmethod
@@ -53,6 +56,17 @@ class AnalyzerPlugin(object):
     def get_sample(cls):
         return None
 
+    @classmethod
+    def get_anchor(cls):
+        '''
+        Optionally returns a literal string which appears on the first line
+        of every match of the symptom, at or after the point where the
+        match starts.  The analyzer then only tries the symptom's
+        expression on lines containing the anchor, which is much quicker
+        than trying it throughout the text.
+        '''
+        return None
+
     @classmethod
     def get_symptom_source(cls):
         '''
@@ -61,40 +75,136 @@ class AnalyzerPlugin(object):
         return inspect.getsource(cls.get_symptom)
 
     @classmethod
-    def createTokenObject(cls, st, locn, toks):
+    def get_version(cls):
+        '''
+        Returns a string which changes whenever the symptom does, so that
+        cached analysis results can be told apart.  By default this is a
+        digest of the source code of get_symptom.
+        '''
+        try:
+            return sha1(cls.get_symptom_source()).hexdigest()
+        except (IOError, TypeError):
+            return 'unknown'
+
+
+class AnalysisContext(object):
+    '''
+    Collects the Tokens found by a single analysis.  Each analysis has its
+    own context, so analyses in different threads don't see each other's
+    results.
+    '''
+    def __init__(self):
+        self.symptoms = []
+        self.deduper = set()
+
+    def createTokenObject(self, st, locn, toks):
         '''
         parseString throws an exception immediately if the text does not match,
         but would have returned these tokens
         searchString will keep searching, but wont return the tokens,
-        so just gather them all up here and make them available
-        after returning from searchString, check
-        redhat_support_tool.symptoms.AnalyzerPlugin.symptoms for the actual
-        results
+        so use this method as the parse action of a symptom expression to
+        gather them all up here, then check the context's symptoms for the
+        actual results after returning from searchString
 
         This method will be called for each match found when parsing the file
-        Returns: Token object (defined below)
         '''
-        if not cls.deduper:
-            cls.deduper = dict()
+        self.collectToken(Token(st, locn, toks[0]))
 
-        token = Token(st, locn, toks[0])
+    def collectToken(self, token):
+        '''
+        Add a Token to symptoms unless one with the same token string has
+        already been collected.
+        '''
         # Only add the token to the list if we haven't seen it before
-        if token.token_string in cls.deduper:
+        if token.token_string in self.deduper:
             return
-        else:
-            cls.deduper[token.token_string] = ""
-            cls.symptoms.append(token)
+        self.deduper.add(token.token_string)
+        self.symptoms.append(token)
+
+
+class LineIndex(object):
+    '''
+    The offsets of every newline in a string, so that the line and column
+    of a location can be found by bisection rather than by rescanning the
+    string from the start as pyparsing's line, lineno and col do.  The
+    results are the same as those functions'.
+    '''
+    def __init__(self, st):
+        self.st = st
+        self.newlines = []
+        append = self.newlines.append
+        find = st.find
+        pos = find('\n')
+        while pos != -1:
+            append(pos)
+            pos = find('\n', pos + 1)
+
+    def lineno(self, loc):
+        return bisect.bisect_left(self.newlines, loc) + 1
+
+    def col(self, loc):
+        if loc < len(self.st) and self.st[loc] == '\n':
+            return 1
+        i = bisect.bisect_left(self.newlines, loc)
+        if i:
+            return loc - self.newlines[i - 1]
+        return loc + 1
+
+    def line(self, loc):
+        if loc < 0:
+            # pyparsing wraps negative locations around, keep its answer.
+            return line(loc, self.st)
+        i = bisect.bisect_left(self.newlines, loc)
+        start = 0
+        if i:
+            start = self.newlines[i - 1] + 1
+        if i < len(self.newlines):
+            return self.st[start:self.newlines[i]]
+        return self.st[start:]
 
 
 class Token(object):
     '''
     This class defines the Token that will contain information about
     each match when parsing a file looking for symptoms
+
+    When st is only part of the input (see helpers/analyzer.py),
+    loc_offset and line_offset give the position and number of lines of
+    the input which precede st.  Callers creating many Tokens from the
+    same string should pass a LineIndex of it as line_index.  source is
+    the path of the file the Token was found in, if any.
     '''
-    def __init__(self, st, locn, tokString):
+    def __init__(self, st, locn, tokString, loc_offset=0, line_offset=0,
+                 line_index=None, source=None):
         self.token_string = tokString
-        self.loc = locn
-        self.before_line = line(locn - 1, st)
-        self.source_line = line(locn, st)
-        self.line_num = lineno(locn, st)
-        self.col = col(locn, st)
+        self.source = source
+        self.loc = locn + loc_offset
+        if line_index:
+            self.before_line = line_index.line(locn - 1)
+            self.source_line = line_index.line(locn)
+            self.line_num = line_index.lineno(locn) + line_offset
+            self.col = line_index.col(locn)
+        else:
+            self.before_line = line(locn - 1, st)
+            self.source_line = line(locn, st)
+            self.line_num = lineno(locn, st) + line_offset
+            self.col = col(locn, st)
+
+    def to_tuple(self):
+        '''
+        Returns the Token's fields, less its source, as a tuple for
+        serialization.
+        '''
+        return (self.token_string, self.loc, self.line_num, self.col,
+                self.before_line, self.source_line)
+
+    @classmethod
+    def from_tuple(cls, fields, source=None):
+        '''
+        Returns a Token rebuilt from the tuple returned by to_tuple.
+        '''
+        token = cls.__new__(cls)
+        (token.token_string, token.loc, token.line_num, token.col,
+         token.before_line, token.source_line) = fields
+        token.source = source
+        return token
@@ -40,6 +40,10 @@ class BtMinusA(AnalyzerPlugin):
                                      SkipTo(Suppress(quitline), include=True))
         return analyze_expression
 
+    @classmethod
+    def get_anchor(cls):
+        return 'KERNEL:'
+
     @classmethod
     def get_desc(cls):
         '''
@@ -41,6 +41,10 @@ class JavaStackTraceAnalyzer(AnalyzerPlugin):
                                      SkipTo(Suppress(loglevel), include=True))
         return analyze_expression
 
+    @classmethod
+    def get_anchor(cls):
+        return 'Exception:'
+
     @classmethod
     def get_desc(cls):
         '''
@@ -42,6 +42,10 @@ class PythonTraceBackAnalyzer(AnalyzerPlugin):
                                             include=True))
         return analyze_expression
 
+    @classmethod
+    def get_anchor(cls):
+        return 'Traceback'
+
     @classmethod
     def get_desc(cls):
         '''